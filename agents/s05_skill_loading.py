@@ -7,15 +7,21 @@ This chapter teaches a two-layer skill model:
 
 1. Put a cheap skill catalog in the system prompt.
 2. Load the full skill body only when the model asks for it.
+3. For large skills, load only the sections the task needs, plus a
+   contents list so the model can ask for more.
 
 That keeps the prompt small while still giving the model access to reusable,
 task-specific guidance.
 """
 
+import json
+import math
 import os
 import re
 import subprocess
-from dataclasses import dataclass
+import tempfile
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from pathlib import Path
 
 from anthropic import Anthropic
@@ -30,6 +36,10 @@ WORKDIR = Path.cwd()
 client = Anthropic(base_url=os.getenv("ANTHROPIC_BASE_URL"))
 MODEL = os.environ["MODEL_ID"]
 SKILLS_DIR = WORKDIR / "skills"
+SKILL_MANIFEST = ".manifest.json"  # (mtime, size) -> frontmatter, per SKILL.md
+SKILL_BODY_CACHE_SIZE = 8  # skill bodies kept in memory after load_skill
+SKILL_INLINE_CHARS = 3000  # smaller skills load whole; larger ones as TOC + sections
+SKILL_QUERY_SECTIONS = 2  # sections returned for a load_skill query
 
 
 @dataclass
@@ -39,28 +49,108 @@ class SkillManifest:
     path: Path
 
 
+@dataclass
+class SkillSection:
+    path: str  # heading titles from the top, joined with " > "
+    level: int
+    text: str  # heading line through the end of its last subsection
+    intro: str  # heading line up to its first subsection
+
+
 @dataclass
 class SkillDocument:
     manifest: SkillManifest
     body: str
+    sections: list[SkillSection] = field(default_factory=list)
+
+
+def index_sections(body: str) -> list[SkillSection]:
+    """Split a markdown body at its headings, ignoring `#` lines inside code fences."""
+    lines = body.splitlines()
+    headings, in_fence = [], False
+    for number, line in enumerate(lines):
+        if line.lstrip().startswith("```"):
+            in_fence = not in_fence
+        match = None if in_fence else re.match(r"^(#{1,6})\s+(.+?)\s*#*$", line)
+        if match:
+            headings.append((number, len(match.group(1)), match.group(2)))
+    sections, trail = [], []
+    for i, (start, level, title) in enumerate(headings):
+        trail = [t for t in trail if t[0] < level] + [(level, title)]
+        end = next((n for n, lvl, _ in headings[i + 1:] if lvl <= level), len(lines))
+        intro_end = headings[i + 1][0] if i + 1 < len(headings) else len(lines)
+        sections.append(SkillSection(path=" > ".join(t for _, t in trail), level=level,
+                                     text="\n".join(lines[start:end]).strip(),
+                                     intro="\n".join(lines[start:intro_end]).strip()))
+    return sections
 
 
 class SkillRegistry:
-    def __init__(self, skills_dir: Path):
+    """
+    Skill catalog that never reads a body it does not need.
+
+    Startup reads only the frontmatter of SKILL.md files whose (mtime, size)
+    changed since the manifest in skills/.manifest.json was written. Bodies
+    are read on load_skill and kept in a small LRU keyed by path and mtime.
+    """
+
+    def __init__(self, skills_dir: Path, cache_size: int = SKILL_BODY_CACHE_SIZE):
         self.skills_dir = skills_dir
-        self.documents: dict[str, SkillDocument] = {}
+        self.manifest_file = skills_dir / SKILL_MANIFEST
+        self.manifests: dict[str, SkillManifest] = {}
+        self.cache_size = cache_size
+        self._bodies: OrderedDict[tuple, SkillDocument] = OrderedDict()
         self._load_all()
 
     def _load_all(self) -> None:
         if not self.skills_dir.exists():
             return
 
+        try:
+            cached = json.loads(self.manifest_file.read_text())
+        except (OSError, json.JSONDecodeError):
+            cached = {}
+        records = {}
         for path in sorted(self.skills_dir.rglob("SKILL.md")):
-            meta, body = self._parse_frontmatter(path.read_text())
-            name = meta.get("name", path.parent.name)
-            description = meta.get("description", "No description")
-            manifest = SkillManifest(name=name, description=description, path=path)
-            self.documents[name] = SkillDocument(manifest=manifest, body=body.strip())
+            key = path.relative_to(self.skills_dir).as_posix()
+            st = path.stat()
+            signature = [st.st_mtime_ns, st.st_size]
+            record = cached.get(key)
+            if not record or record.get("sig") != signature:
+                record = {"sig": signature, "meta": self._read_frontmatter(path)}
+            records[key] = record
+            name = record["meta"].get("name", path.parent.name)
+            description = record["meta"].get("description", "No description")
+            self.manifests[name] = SkillManifest(name=name, description=description, path=path)
+        if records != cached:
+            self._write_manifest(records)
+
+    def _write_manifest(self, records: dict) -> None:
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.skills_dir, prefix=".manifest-")
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(records, f, ensure_ascii=False)
+            os.replace(tmp, self.manifest_file)
+        except OSError:
+            Path(tmp).unlink(missing_ok=True)
+
+    @staticmethod
+    def _read_frontmatter(path: Path) -> dict:
+        """Parse the leading --- block, reading no further than its closing fence."""
+        meta = {}
+        with path.open() as f:
+            if f.readline().rstrip("\n") != "---":
+                return {}
+            for line in f:
+                if line.rstrip("\n") == "---":
+                    return meta
+                if ":" in line:
+                    key, value = line.split(":", 1)
+                    meta[key.strip()] = value.strip()
+        return {}  # no closing fence: not frontmatter
 
     def _parse_frontmatter(self, text: str) -> tuple[dict, str]:
         match = re.match(r"^---\n(.*?)\n---\n(.*)", text, re.DOTALL)
@@ -76,18 +166,110 @@ class SkillRegistry:
         return meta, match.group(2)
 
     def describe_available(self) -> str:
-        if not self.documents:
+        if not self.manifests:
             return "(no skills available)"
         lines = []
-        for name in sorted(self.documents):
-            manifest = self.documents[name].manifest
+        for name in sorted(self.manifests):
+            manifest = self.manifests[name]
             lines.append(f"- {manifest.name}: {manifest.description}")
         return "\n".join(lines)
 
+    def document(self, name: str) -> SkillDocument | None:
+        """The skill's body, read on first use and on every edit after that."""
+        manifest = self.manifests.get(name)
+        if not manifest:
+            return None
+        key = (manifest.path, manifest.path.stat().st_mtime_ns)
+        document = self._bodies.get(key)
+        if document:
+            self._bodies.move_to_end(key)
+            return document
+        _, body = self._parse_frontmatter(manifest.path.read_text())
+        document = SkillDocument(manifest=manifest, body=body.strip(), sections=index_sections(body))
+        self._bodies[key] = document
+        while len(self._bodies) > self.cache_size:
+            self._bodies.popitem(last=False)
+        return document
+
+    def load(self, name: str, section: str = None, query: str = None, file: str = None) -> str:
+        """
+        Small skills load whole. Larger ones return their table of contents
+        plus only the sections asked for, by heading path or by query;
+        reference files next to SKILL.md are read only when named.
+        """
+        document = self.document(name)
+        if not document:
+            return self.load_full_text(name)
+        if file:
+            return self._reference(document, file)
+        if not (section or query) and len(document.body) <= SKILL_INLINE_CHARS:
+            return self.load_full_text(name)
+
+        if section:
+            picked = self._find_sections(document, section)
+        elif query:
+            picked = self._rank_sections(document, query)[:SKILL_QUERY_SECTIONS]
+        else:
+            picked = []
+        # A section already includes its subsections
+        picked = [s for s in picked if not any(
+            o is not s and s.path.startswith(o.path + " > ") for o in picked)]
+
+        top = min((s.level for s in document.sections), default=1)
+        parts = ["Contents:\n" + "\n".join(
+            f"{'  ' * (s.level - top)}- {s.path.split(' > ')[-1]}" for s in document.sections)]
+        if picked:
+            parts += [s.text for s in picked]
+        elif section or query:
+            parts.append(f"(no section matches {section or query!r})")
+        else:
+            parts.append(document.sections[0].intro if document.sections else document.body)
+            parts.append("Load more with section=<heading path> or query=<keywords>.")
+        references = self._references(document)
+        if references:
+            parts.append("Reference files (load with file=<path>): " + ", ".join(references))
+        return f"<skill name=\"{document.manifest.name}\">\n" + "\n\n".join(parts) + "\n</skill>"
+
+    @staticmethod
+    def _find_sections(document: SkillDocument, section: str) -> list[SkillSection]:
+        wanted = " > ".join(part.strip() for part in section.lower().split(">"))
+        exact = [s for s in document.sections
+                 if s.path.lower() == wanted or s.path.lower().endswith(" > " + wanted)]
+        return exact or [s for s in document.sections if wanted in s.path.split(" > ")[-1].lower()]
+
+    @staticmethod
+    def _rank_sections(document: SkillDocument, query: str) -> list[SkillSection]:
+        """Sections by keyword score: title terms count 3x, rarer terms count more."""
+        def terms(text):
+            return re.findall(r"[a-z0-9]+", text.lower())
+
+        docs = [terms(s.path.split(" > ")[-1]) * 3 + terms(s.intro) for s in document.sections]
+        scores = {}
+        for term in set(terms(query)):
+            matching = [i for i, d in enumerate(docs) if term in d]
+            idf = math.log(1 + len(docs) / (1 + len(matching)))
+            for i in matching:
+                scores[i] = scores.get(i, 0.0) + idf * docs[i].count(term) / math.sqrt(len(docs[i]))
+        return [document.sections[i] for i in sorted(scores, key=lambda i: (-scores[i], i))]
+
+    @staticmethod
+    def _references(document: SkillDocument) -> list[str]:
+        skill_dir = document.manifest.path.parent
+        return sorted(p.relative_to(skill_dir).as_posix() for p in skill_dir.rglob("*")
+                      if p.is_file() and p.name != "SKILL.md")
+
+    @staticmethod
+    def _reference(document: SkillDocument, file: str) -> str:
+        skill_dir = document.manifest.path.parent.resolve()
+        path = (skill_dir / file).resolve()
+        if not path.is_relative_to(skill_dir) or not path.is_file():
+            return f"Error: No reference file '{file}' in skill '{document.manifest.name}'"
+        return f"<skill-file name=\"{document.manifest.name}/{file}\">\n{path.read_text()[:50000]}\n</skill-file>"
+
     def load_full_text(self, name: str) -> str:
-        document = self.documents.get(name)
+        document = self.document(name)
         if not document:
-            known = ", ".join(sorted(self.documents)) or "(none)"
+            known = ", ".join(sorted(self.manifests)) or "(none)"
             return f"Error: Unknown skill '{name}'. Available skills: {known}"
 
         return (
@@ -171,7 +353,7 @@ TOOL_HANDLERS = {
     "read_file": lambda **kw: run_read(kw["path"], kw.get("limit")),
     "write_file": lambda **kw: run_write(kw["path"], kw["content"]),
     "edit_file": lambda **kw: run_edit(kw["path"], kw["old_text"], kw["new_text"]),
-    "load_skill": lambda **kw: SKILL_REGISTRY.load_full_text(kw["name"]),
+    "load_skill": lambda **kw: SKILL_REGISTRY.load(kw["name"], kw.get("section"), kw.get("query"), kw.get("file")),
 }
 
 TOOLS = [
@@ -223,10 +405,19 @@ TOOLS = [
     },
     {
         "name": "load_skill",
-        "description": "Load the full body of a named skill into the current context.",
+        "description": (
+            "Load a named skill into the current context. Large skills return their contents "
+            "list plus the sections picked by section (heading path) or query (keywords); "
+            "file loads one of the skill's reference files."
+        ),
         "input_schema": {
             "type": "object",
-            "properties": {"name": {"type": "string"}},
+            "properties": {
+                "name": {"type": "string"},
+                "section": {"type": "string"},
+                "query": {"type": "string"},
+                "file": {"type": "string"},
+            },
             "required": ["name"],
         },
     },
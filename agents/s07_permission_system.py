@@ -22,11 +22,18 @@ burying readers under every advanced policy branch on day one.
 Key insight: "Safety is a pipeline, not a boolean."
 """
 
+import heapq
 import json
 import os
 import re
+import shlex
 import subprocess
-from fnmatch import fnmatch
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import translate
+from glob import escape as glob_escape
 from pathlib import Path
 
 from anthropic import Anthropic
@@ -50,6 +57,9 @@ READ_ONLY_TOOLS = {"read_file", "bash_readonly"}
 # Tools that modify state
 WRITE_TOOLS = {"write_file", "edit_file", "bash"}
 
+# Approved read-only calls from one turn run in parallel, up to this many.
+MAX_PARALLEL_TOOLS = 8
+
 
 # -- Bash security validation --
 class BashSecurityValidator:
@@ -68,8 +78,13 @@ class BashSecurityValidator:
         ("cmd_substitution", r"\$\("),          # command substitution
         ("ifs_injection", r"\bIFS\s*="),        # IFS manipulation
     ]
+    # Compiled once at import instead of going through the re module cache per call.
+    COMPILED = [(name, pattern, re.compile(pattern)) for name, pattern in VALIDATORS]
+
+    # Structure-level checks that the shell parser below replaces per segment.
+    STRUCTURAL = {"shell_metachar", "cmd_substitution"}
 
-    def validate(self, command: str) -> list:
+    def validate(self, command: str, skip: set = frozenset()) -> list:
         """
         Check a bash command against all validators.
 
@@ -77,8 +92,8 @@ class BashSecurityValidator:
         An empty list means the command passed all validators.
         """
         failures = []
-        for name, pattern in self.VALIDATORS:
-            if re.search(pattern, command):
+        for name, pattern, regex in self.COMPILED:
+            if name not in skip and regex.search(command):
                 failures.append((name, pattern))
         return failures
 
@@ -95,6 +110,147 @@ class BashSecurityValidator:
         return "Security flags: " + ", ".join(parts)
 
 
+# -- Bash command structure --
+# Instead of flagging any ;&|$ in the whole string, break the command into
+# simple commands (pipelines, sequences, subshells, substitutions) and judge
+# each one on its own.
+SEPARATORS = {";", "&&", "||", "|", "|&", "&", "(", ")"}
+REDIRECT_RE = re.compile(r"^(&>>?|[<>]+&?|>\|)$")
+# shlex glues adjacent punctuation into one token (";;", "&;", ">&;");
+# such runs are split into these, longest first. Anything left over asks.
+OPERATORS = sorted(SEPARATORS | {"<(", ">(", "<", ">", ">>", ">|", ">&", "<&", "<>",
+                                 "&>", "&>>", "<<", "<<<"}, key=len, reverse=True)
+PUNCTUATION = set("();<>|&")
+SAFE_REDIRECT_TARGETS = {"/dev/null", "/dev/stdout", "/dev/stderr"}
+# A leading VAR=value can change what a read-only command runs (PAGER,
+# GIT_EXTERNAL_DIFF, LD_PRELOAD), so any other assignment asks.
+SAFE_ENV_ASSIGNMENTS = {"LANG", "LC_ALL", "TZ", "NO_COLOR", "TERM"}
+
+
+def _extract_substitutions(command: str) -> tuple:
+    """
+    Replace $(...) and `...` outside single quotes with placeholders and turn
+    unquoted newlines into ';'. Returns (flat_command, inner_commands).
+    """
+    out, inner = [], []
+    i, quote = 0, None
+    while i < len(command):
+        ch = command[i]
+        if ch == "\\" and quote != "'":
+            out.append(command[i:i + 2])
+            i += 2
+            continue
+        if quote == "'":
+            quote = None if ch == "'" else quote
+        elif ch in "'\"" and quote in (None, ch):
+            quote = None if quote else ch
+        elif command.startswith("$(", i):
+            depth, j = 1, i + 2
+            while j < len(command) and depth:
+                depth += {"(": 1, ")": -1}.get(command[j], 0)
+                j += 1
+            if depth:
+                raise ValueError("unterminated $(")
+            inner.append(command[i + 2:j - 1])
+            out.append(f"__subst{len(inner) - 1}__")
+            i = j
+            continue
+        elif ch == "`":
+            j = command.find("`", i + 1)
+            if j < 0:
+                raise ValueError("unterminated backtick")
+            inner.append(command[i + 1:j])
+            out.append(f"__subst{len(inner) - 1}__")
+            i = j + 1
+            continue
+        elif ch == "\n" and quote is None:
+            ch = ";"
+        out.append(ch)
+        i += 1
+    if quote:
+        raise ValueError(f"unterminated {quote}")
+    return "".join(out), inner
+
+
+def _split_operators(token: str) -> list:
+    """Split a run of shell punctuation into operators; None if a piece is unknown."""
+    parts, i = [], 0
+    while i < len(token):
+        op = next((op for op in OPERATORS if token.startswith(op, i)), None)
+        if op is None:
+            return None
+        parts.append(op)
+        i += len(op)
+    return parts
+
+
+def split_simple_commands(command: str) -> list:
+    """
+    Split a shell command into simple commands.
+
+    Each entry is {"text": str, "argv": list, "flags": list}. `text` is the
+    command as written, for reasons shown to the user; `argv` drops leading
+    VAR=value words and is what rules match. Flags name the things a
+    per-command rule cannot vouch for: writing redirections, heredocs,
+    process substitution, a dynamic command name, unknown operators,
+    environment assignments outside SAFE_ENV_ASSIGNMENTS.
+    Raises ValueError when the command cannot be tokenized.
+    """
+    flat, inner = _extract_substitutions(command)
+    lexer = shlex.shlex(flat, posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    tokens = []
+    for token in lexer:
+        parts = _split_operators(token) if set(token) <= PUNCTUATION else [token]
+        tokens.extend(parts if parts is not None else [None])  # None: unknown operator
+
+    segments, argv, flags = [], [], []
+
+    def close():
+        if argv or flags:
+            words = list(argv)
+            while words and re.match(r"^[A-Za-z_][A-Za-z0-9_]*=", words[0]):
+                name = words.pop(0).split("=", 1)[0]  # leading VAR=value assignment
+                if name not in SAFE_ENV_ASSIGNMENTS:
+                    flags.append(f"env_assignment:{name}")
+            if words and words[0].startswith("$"):
+                flags.append("dynamic_command")
+            segments.append({"text": shlex.join(argv), "argv": words, "flags": list(flags)})
+        argv.clear()
+        flags.clear()
+
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token is None:
+            flags.append("unknown_operator")
+        elif token in SEPARATORS:
+            close()
+        elif token in ("<(", ">("):
+            flags.append("process_substitution")
+        elif REDIRECT_RE.match(token):
+            if argv and argv[-1].isdigit():
+                argv.pop()  # the "2" in 2>&1
+            target = tokens[i + 1] if i + 1 < len(tokens) else ""
+            i += 1
+            if target is None or set(target) <= PUNCTUATION:
+                flags.append(f"redirect_write:{target or ''}")  # missing or odd target
+            elif token.startswith("<<"):
+                flags.append("heredoc")
+            elif token in (">&", "<&") and (target.isdigit() or target == "-"):
+                pass  # fd duplication (2>&1) or close (>&-)
+            elif ">" in token or token == "<&":
+                if target not in SAFE_REDIRECT_TARGETS:
+                    flags.append(f"redirect_write:{target}")
+        else:
+            argv.append(token)
+        i += 1
+    close()
+    for sub in inner:
+        segments.extend(split_simple_commands(sub))
+    return [seg for seg in segments if seg["argv"] or seg["flags"]]
+
+
 # -- Workspace trust --
 def is_workspace_trusted(workspace: Path = None) -> bool:
     """
@@ -115,15 +271,175 @@ bash_validator = BashSecurityValidator()
 # -- Permission rules --
 # Rules are checked in order: first match wins.
 # Format: {"tool": "<tool_name_or_*>", "path": "<glob_or_*>", "behavior": "allow|deny|ask"}
+# Bash "content" globs are matched against each simple command separately.
+# Only commands that cannot write files: sort -o and uniq's output operand
+# can, so they are not here.
+READ_ONLY_COMMANDS = ["ls", "cat", "head", "tail", "grep", "wc", "pwd", "echo",
+                      "cd", "which", "git status", "git diff", "git log"]
 DEFAULT_RULES = [
     # Always deny dangerous patterns
     {"tool": "bash", "content": "rm -rf /", "behavior": "deny"},
     {"tool": "bash", "content": "sudo *", "behavior": "deny"},
+    # git diff/log write a file with --output; the allow rules below must not cover it
+    {"tool": "bash", "content": "git diff *--output*", "behavior": "deny"},
+    {"tool": "bash", "content": "git log *--output*", "behavior": "deny"},
     # Allow reading anything
     {"tool": "read_file", "path": "*", "behavior": "allow"},
+] + [
+    {"tool": "bash", "content": pattern, "behavior": "allow"}
+    for cmd in READ_ONLY_COMMANDS for pattern in (cmd, f"{cmd} *")
 ]
 
 
+# -- Learned rules on disk --
+# "always" answers are saved here and loaded on the next start.
+# Format: {"rules": [<rule>, ...]} using the same rule dicts as DEFAULT_RULES.
+PROJECT_RULES_PATH = WORKDIR / ".claude" / "permissions.json"
+USER_RULES_PATH = Path.home() / ".claude" / "permissions.json"
+RULES_RELOAD_INTERVAL = 1.0  # seconds between stat() checks of permissions.json
+# For these, "always" covers the subcommand ("git commit *"), not the whole tool.
+# Subcommands that run arbitrary code ("uv run", "npm exec") are learned exactly,
+# as is every other command: an interpreter never gets a "python *" rule.
+SUBCOMMAND_TOOLS = {"git", "npm", "pnpm", "yarn", "cargo", "go", "docker", "uv", "pip"}
+CODE_SUBCOMMANDS = {"run", "exec", "x", "dlx"}
+# Arguments only pick which tests to run, so "always" covers the tool.
+PREFIX_TOOLS = {"pytest"}
+
+
+def _rule_key(rule: dict) -> str:
+    return json.dumps(rule, sort_keys=True)
+
+
+def merge_rules(*rule_lists: list) -> list:
+    """Concatenate rule lists, dropping exact duplicates, keeping first-seen order."""
+    seen, merged = set(), []
+    for rules in rule_lists:
+        for rule in rules:
+            if _rule_key(rule) not in seen:
+                seen.add(_rule_key(rule))
+                merged.append(rule)
+    return merged
+
+
+class RuleStore:
+    """One permissions.json file. Writes merge with what is on disk, then replace atomically."""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def signature(self):
+        """(mtime_ns, size), or None when the file does not exist."""
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def load(self) -> list:
+        try:
+            data = json.loads(self.path.read_text())
+        except FileNotFoundError:
+            return []
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"  [permissions] ignoring {self.path}: {e}")
+            return []
+        return [r for r in data.get("rules", [])
+                if isinstance(r, dict) and r.get("behavior") in ("allow", "deny", "ask")]
+
+    def add(self, rules: list):
+        # Re-read first so rules saved by another session since startup survive.
+        merged = merge_rules(self.load(), rules)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=".permissions-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"rules": merged}, f, indent=2)
+            os.replace(tmp, self.path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+
+def default_rule_stores() -> dict:
+    return {"user": RuleStore(USER_RULES_PATH), "project": RuleStore(PROJECT_RULES_PATH)}
+
+
+def learned_rules(tool_name: str, tool_input: dict) -> list:
+    """
+    Rules an "always" answer creates. A bash segment is learned as written,
+    or as its subcommand for SUBCOMMAND_TOOLS / PREFIX_TOOLS; a file tool is
+    learned for the file's directory, or for the file itself at the root.
+    """
+    if tool_name == "bash":
+        command = tool_input.get("command", "")
+        try:
+            segments = split_simple_commands(command)
+        except ValueError:
+            return [{"tool": "bash", "content": glob_escape(command), "behavior": "allow"}]
+        rules = []
+        for seg in segments:
+            argv = seg["argv"]
+            if not argv:
+                continue
+            if argv[0] in PREFIX_TOOLS:
+                prefix = argv[0]
+            elif (argv[0] in SUBCOMMAND_TOOLS and len(argv) > 1
+                  and not argv[1].startswith("-") and argv[1] not in CODE_SUBCOMMANDS):
+                prefix = " ".join(argv[:2])
+            else:
+                rules.append({"tool": "bash", "content": glob_escape(shlex.join(argv)), "behavior": "allow"})
+                continue
+            rules += [{"tool": "bash", "content": prefix, "behavior": "allow"},
+                      {"tool": "bash", "content": f"{prefix} *", "behavior": "allow"}]
+        return merge_rules(rules)
+    path = Path(tool_input.get("path", ""))
+    parent = path.parent.as_posix()
+    if parent in ("", ".", "/"):
+        pattern = glob_escape(path.as_posix())
+    else:
+        pattern = f"{glob_escape(parent)}/*"
+    return [{"tool": tool_name, "path": pattern, "behavior": "allow"}]
+
+
+class CompiledRules:
+    """
+    Rules compiled once into regexes and indexed by (behavior, tool).
+
+    Lookup walks only the rules for this tool plus the "*" rules, merged back
+    into their original order so "first match wins" still holds.
+    """
+
+    def __init__(self, rules: list):
+        self.index = {}
+        for order, rule in enumerate(rules):
+            compiled = (
+                order,
+                rule,
+                self._pattern(rule.get("path")),
+                self._pattern(rule.get("content")),
+            )
+            by_tool = self.index.setdefault(rule["behavior"], {})
+            by_tool.setdefault(rule.get("tool") or "*", []).append(compiled)
+
+    @staticmethod
+    def _pattern(glob):
+        if glob is None or glob == "*":
+            return None
+        return re.compile(translate(glob))
+
+    def first_match(self, behavior: str, tool_name: str, tool_input: dict):
+        by_tool = self.index.get(behavior, {})
+        candidates = heapq.merge(by_tool.get(tool_name, []), by_tool.get("*", []),
+                                 key=lambda c: c[0])
+        for _, rule, path_re, content_re in candidates:
+            if path_re and not path_re.match(tool_input.get("path", "")):
+                continue
+            if content_re and not content_re.match(tool_input.get("command", "")):
+                continue
+            return rule
+        return None
+
+
 class PermissionManager:
     """
     Manages permission decisions for tool calls.
@@ -134,45 +450,98 @@ class PermissionManager:
     can implement it themselves before adding more advanced policy layers.
     """
 
-    def __init__(self, mode: str = "default", rules: list = None):
+    def __init__(self, mode: str = "default", rules: list = None, stores: dict = None):
         if mode not in MODES:
             raise ValueError(f"Unknown mode: {mode}. Choose from {MODES}")
         self.mode = mode
-        self.rules = rules or list(DEFAULT_RULES)
+        # LRU of (mode, tool, path, command) -> decision; cleared when rules change.
+        self.cache_size = 1024
+        # Optional {"user": RuleStore, "project": RuleStore}; learned rules load at
+        # startup and again whenever a store file changes on disk.
+        self.stores = stores or {}
+        self._base_rules = list(rules or DEFAULT_RULES)
+        self._next_reload_check = 0.0
+        self._load_stores()
         # Simple denial tracking helps surface when the agent is repeatedly
         # asking for actions the system will not allow.
         self.consecutive_denials = 0
         self.max_consecutive_denials = 3
 
+    @property
+    def rules(self) -> list:
+        return self._rules
+
+    @rules.setter
+    def rules(self, rules: list):
+        self._base_rules = list(rules)  # survives a reload of the store files
+        self._rules = rules
+        self._invalidate()
+
+    def add_rule(self, rule: dict):
+        self._base_rules.append(rule)  # survives a reload of the store files
+        self._rules.append(rule)
+        self._invalidate()
+
+    def _load_stores(self):
+        self._signatures = {scope: store.signature() for scope, store in self.stores.items()}
+        learned = [store.load() for store in self.stores.values()]
+        self._rules = merge_rules(self._base_rules, *learned)
+        self._invalidate()
+
+    def reload_if_changed(self) -> bool:
+        """Pick up permissions.json edits from other sessions or ops, at most once per interval."""
+        now = time.monotonic()
+        if not self.stores or now < self._next_reload_check:
+            return False
+        self._next_reload_check = now + RULES_RELOAD_INTERVAL
+        if all(store.signature() == self._signatures.get(scope) for scope, store in self.stores.items()):
+            return False
+        self._load_stores()
+        print(f"  [permissions reloaded: {len(self._rules)} rules]")
+        return True
+
+    def _invalidate(self):
+        self._compiled = CompiledRules(self._rules)
+        self._compiled_len = len(self._rules)
+        self._cache = OrderedDict()
+
     def check(self, tool_name: str, tool_input: dict) -> dict:
         """
         Returns: {"behavior": "allow"|"deny"|"ask", "reason": str}
         """
-        # Step 0: Bash security validation (before deny rules)
-        # Teaching version checks early for clarity.
+        self.reload_if_changed()
+        if len(self._rules) != self._compiled_len:
+            self._invalidate()  # someone appended to perms.rules directly
+        key = (self.mode, tool_name, str(tool_input.get("path", "")),
+               str(tool_input.get("command", "")).strip())
+        cached = self._cache.get(key)
+        if cached is None:
+            cached = self._decide(tool_name, {"path": key[2], "command": key[3]})
+            self._cache[key] = cached
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        decision, matched_allow_rule = cached
+        if matched_allow_rule:
+            self.consecutive_denials = 0
+        return dict(decision)
+
+    def _decide(self, tool_name: str, tool_input: dict) -> tuple:
+        """The uncached pipeline. Returns (decision, matched_allow_rule)."""
+        decision = self._pipeline(tool_name, tool_input)
+        return decision, decision["reason"].startswith("Matched allow rule")
+
+    def _pipeline(self, tool_name: str, tool_input: dict) -> dict:
+        # Step 0: Bash structure + security validation (before deny rules)
         if tool_name == "bash":
-            command = tool_input.get("command", "")
-            failures = bash_validator.validate(command)
-            if failures:
-                # Severe patterns (sudo, rm_rf) get immediate deny
-                severe = {"sudo", "rm_rf"}
-                severe_hits = [f for f in failures if f[0] in severe]
-                if severe_hits:
-                    desc = bash_validator.describe_failures(command)
-                    return {"behavior": "deny",
-                            "reason": f"Bash validator: {desc}"}
-                # Other patterns escalate to ask (user can still approve)
-                desc = bash_validator.describe_failures(command)
-                return {"behavior": "ask",
-                        "reason": f"Bash validator flagged: {desc}"}
+            return self._bash_pipeline(tool_input.get("command", ""))
 
         # Step 1: Deny rules (bypass-immune, checked first always)
-        for rule in self.rules:
-            if rule["behavior"] != "deny":
-                continue
-            if self._matches(rule, tool_name, tool_input):
-                return {"behavior": "deny",
-                        "reason": f"Blocked by deny rule: {rule}"}
+        rule = self._compiled.first_match("deny", tool_name, tool_input)
+        if rule:
+            return {"behavior": "deny",
+                    "reason": f"Blocked by deny rule: {rule}"}
 
         # Step 2: Mode-based decisions
         if self.mode == "plan":
@@ -191,60 +560,136 @@ class PermissionManager:
             pass
 
         # Step 3: Allow rules
-        for rule in self.rules:
-            if rule["behavior"] != "allow":
-                continue
-            if self._matches(rule, tool_name, tool_input):
-                self.consecutive_denials = 0
-                return {"behavior": "allow",
-                        "reason": f"Matched allow rule: {rule}"}
+        rule = self._compiled.first_match("allow", tool_name, tool_input)
+        if rule:
+            return {"behavior": "allow",
+                    "reason": f"Matched allow rule: {rule}"}
 
         # Step 4: Ask user (default behavior for unmatched tools)
         return {"behavior": "ask",
                 "reason": f"No rule matched for {tool_name}, asking user"}
 
+    def _bash_pipeline(self, command: str) -> dict:
+        """The same four steps, applied to every simple command in `command`."""
+        try:
+            segments = split_simple_commands(command)
+        except ValueError as e:
+            return {"behavior": "ask", "reason": f"Could not parse command ({e})"}
+        flagged = []
+        for seg in segments:
+            failures = bash_validator.validate(seg["text"], skip=BashSecurityValidator.STRUCTURAL)
+            # Severe patterns (sudo, rm_rf) get immediate deny
+            if any(name in ("sudo", "rm_rf") for name, _ in failures):
+                return {"behavior": "deny",
+                        "reason": f"Bash validator on `{seg['text']}`: "
+                                  f"{bash_validator.describe_failures(seg['text'])}"}
+            rule = self._compiled.first_match("deny", "bash", {"command": shlex.join(seg["argv"])})
+            if rule:
+                return {"behavior": "deny",
+                        "reason": f"Blocked by deny rule on `{seg['text']}`: {rule}"}
+            flags = [name for name, _ in failures] + seg["flags"]
+            if flags:
+                flagged.append((seg, flags))
+
+        if self.mode == "plan":
+            return {"behavior": "deny", "reason": "Plan mode: write operations are blocked"}
+
+        # Other flags escalate to ask (user can still approve)
+        if flagged:
+            seg, flags = flagged[0]
+            return {"behavior": "ask",
+                    "reason": f"Bash validator flagged `{seg['text']}`: {', '.join(flags)}"}
+        matched = []
+        for seg in segments:
+            rule = self._compiled.first_match("allow", "bash", {"command": shlex.join(seg["argv"])})
+            if not rule:
+                return {"behavior": "ask",
+                        "reason": f"No rule matched for `{seg['text']}`, asking user"}
+            matched.append(rule)
+        if not matched:
+            return {"behavior": "ask", "reason": "Empty command, asking user"}
+        return {"behavior": "allow",
+                "reason": f"Matched allow rule: {matched[0]}"
+                          + (f" (+{len(matched) - 1} more segments)" if len(matched) > 1 else "")}
+
     def ask_user(self, tool_name: str, tool_input: dict) -> bool:
         """Interactive approval prompt. Returns True if approved."""
         preview = json.dumps(tool_input, ensure_ascii=False)[:200]
         print(f"\n  [Permission] {tool_name}: {preview}")
         try:
-            answer = input("  Allow? (y/n/always): ").strip().lower()
+            answer = input("  Allow? (y/n/always/always-user): ").strip().lower()
         except (EOFError, KeyboardInterrupt):
             return False
 
-        if answer == "always":
-            # Add permanent allow rule for this tool
-            self.rules.append({"tool": tool_name, "path": "*", "behavior": "allow"})
+        if answer in ("always", "always-user"):
+            # Add a permanent allow rule scoped to this command / directory
+            self._learn([(tool_name, tool_input)], "user" if answer == "always-user" else "project")
             self.consecutive_denials = 0
             return True
         if answer in ("y", "yes"):
             self.consecutive_denials = 0
             return True
 
+        self._record_denial()
+        return False
+
+    def ask_batch(self, calls: list) -> list:
+        """
+        One prompt for every "ask" call in a turn.
+
+        `calls` is a list of (tool_name, tool_input, reason). Returns one bool
+        per call, in order.
+        """
+        if len(calls) == 1:
+            return [self.ask_user(calls[0][0], calls[0][1])]
+        print(f"\n  [Permission] {len(calls)} tool calls need approval:")
+        for i, (tool_name, tool_input, reason) in enumerate(calls, 1):
+            preview = json.dumps(tool_input, ensure_ascii=False)[:160]
+            print(f"    {i}. {tool_name}: {preview}\n       ({reason})")
+        try:
+            answer = input("  Approve? (a=all / n=none / 1,3=selected / always): ").strip().lower()
+        except (EOFError, KeyboardInterrupt):
+            return [False] * len(calls)
+
+        if answer in ("always", "always-user"):
+            self._learn([(name, tool_input) for name, tool_input, _ in calls],
+                        "user" if answer == "always-user" else "project")
+        approved = parse_batch_answer(answer, len(calls))
+        if any(approved):
+            self.consecutive_denials = 0
+        else:
+            self._record_denial()
+        return approved
+
+    def _learn(self, calls: list, scope: str):
+        rules = merge_rules(*(learned_rules(name, tool_input) for name, tool_input in calls))
+        for rule in rules:
+            self.add_rule(rule)
+        store = self.stores.get(scope)
+        if store:
+            store.add(rules)
+            self._signatures[scope] = store.signature()  # our own write is not a reload
+            print(f"  [saved {len(rules)} rule(s) to {store.path}]")
+
+    def _record_denial(self):
         # Track denials for circuit breaker
         self.consecutive_denials += 1
         if self.consecutive_denials >= self.max_consecutive_denials:
             print(f"  [{self.consecutive_denials} consecutive denials -- "
                   "consider switching to plan mode]")
-        return False
 
-    def _matches(self, rule: dict, tool_name: str, tool_input: dict) -> bool:
-        """Check if a rule matches the tool call."""
-        # Tool name match
-        if rule.get("tool") and rule["tool"] != "*":
-            if rule["tool"] != tool_name:
-                return False
-        # Path pattern match
-        if "path" in rule and rule["path"] != "*":
-            path = tool_input.get("path", "")
-            if not fnmatch(path, rule["path"]):
-                return False
-        # Content pattern match (for bash commands)
-        if "content" in rule:
-            command = tool_input.get("command", "")
-            if not fnmatch(command, rule["content"]):
-                return False
-        return True
+
+def parse_batch_answer(answer: str, count: int) -> list:
+    """'a'/'y'/'always' -> all, 'n'/'' -> none, '1,3' or '2-4' -> those calls (1-based)."""
+    if answer in ("a", "all", "y", "yes", "always", "always-user"):
+        return [True] * count
+    chosen = set()
+    for part in answer.replace(",", " ").split():
+        low, _, high = part.partition("-")
+        if not low.isdigit() or (high and not high.isdigit()):
+            return [False] * count  # anything unreadable counts as deny-all
+        chosen.update(range(int(low), int(high or low) + 1))
+    return [i + 1 in chosen for i in range(count)]
 
 
 # -- Tool implementations --
@@ -315,6 +760,40 @@ TOOLS = [
      "input_schema": {"type": "object", "properties": {"path": {"type": "string"}, "old_text": {"type": "string"}, "new_text": {"type": "string"}}, "required": ["path", "old_text", "new_text"]}},
 ]
 
+def run_tool(block) -> str:
+    handler = TOOL_HANDLERS.get(block.name)
+    return handler(**(block.input or {})) if handler else f"Unknown: {block.name}"
+
+
+def execute_allowed(calls: list, allowed: list) -> list:
+    """
+    Run the allowed calls and return outputs in call order (None for skipped).
+
+    Consecutive read-only calls run together on a thread pool; any write
+    flushes them first and then runs alone, so later calls still see
+    earlier writes.
+    """
+    outputs = [None] * len(calls)
+    reads = []
+
+    def flush(pool):
+        for i, future in [(i, pool.submit(run_tool, calls[i])) for i in reads]:
+            outputs[i] = future.result()
+        reads.clear()
+
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_TOOLS) as pool:
+        for i, block in enumerate(calls):
+            if not allowed[i]:
+                continue
+            if block.name in READ_ONLY_TOOLS:
+                reads.append(i)
+                continue
+            flush(pool)
+            outputs[i] = run_tool(block)
+        flush(pool)
+    return outputs
+
+
 SYSTEM = f"""You are a coding agent at {WORKDIR}. Use tools to solve tasks.
 The user controls permissions. Some tool calls may be denied."""
 
@@ -323,11 +802,12 @@ def agent_loop(messages: list, perms: PermissionManager):
     """
     The permission-aware agent loop.
 
-    For each tool call:
-      1. LLM requests tool use
-      2. Permission pipeline checks: deny_rules -> mode -> allow_rules -> ask
-      3. If allowed: execute tool, return result
-      4. If denied: return rejection message to LLM
+    For each turn:
+      1. LLM requests tool use (possibly several calls)
+      2. Permission pipeline checks each call: deny_rules -> mode -> allow_rules -> ask
+      3. All "ask" calls go to the user in one batch prompt
+      4. Allowed calls execute (consecutive reads in parallel), denied ones
+         return a rejection message to the LLM
     """
     while True:
         response = client.messages.create(
@@ -339,32 +819,29 @@ def agent_loop(messages: list, perms: PermissionManager):
         if response.stop_reason != "tool_use":
             return
 
-        results = []
-        for block in response.content:
-            if block.type != "tool_use":
-                continue
+        calls = [block for block in response.content if block.type == "tool_use"]
 
-            # -- Permission check --
-            decision = perms.check(block.name, block.input or {})
+        # -- Permission check, then one batch prompt for everything that asks --
+        decisions = [perms.check(block.name, block.input or {}) for block in calls]
+        pending = [i for i, d in enumerate(decisions) if d["behavior"] == "ask"]
+        if pending:
+            answers = perms.ask_batch([(calls[i].name, calls[i].input or {}, decisions[i]["reason"])
+                                       for i in pending])
+            for i, approved in zip(pending, answers):
+                decisions[i] = {"behavior": "allow" if approved else "deny",
+                                "reason": "Answered by user", "by_user": True}
 
-            if decision["behavior"] == "deny":
+        outputs = execute_allowed(calls, [d["behavior"] == "allow" for d in decisions])
+        results = []
+        for block, decision, output in zip(calls, decisions, outputs):
+            if decision["behavior"] == "deny" and decision.get("by_user"):
+                output = f"Permission denied by user for {block.name}"
+                print(f"  [USER DENIED] {block.name}")
+            elif decision["behavior"] == "deny":
                 output = f"Permission denied: {decision['reason']}"
                 print(f"  [DENIED] {block.name}: {decision['reason']}")
-
-            elif decision["behavior"] == "ask":
-                if perms.ask_user(block.name, block.input or {}):
-                    handler = TOOL_HANDLERS.get(block.name)
-                    output = handler(**(block.input or {})) if handler else f"Unknown: {block.name}"
-                    print(f"> {block.name}: {str(output)[:200]}")
-                else:
-                    output = f"Permission denied by user for {block.name}"
-                    print(f"  [USER DENIED] {block.name}")
-
-            else:  # allow
-                handler = TOOL_HANDLERS.get(block.name)
-                output = handler(**(block.input or {})) if handler else f"Unknown: {block.name}"
+            else:
                 print(f"> {block.name}: {str(output)[:200]}")
-
             results.append({
                 "type": "tool_result",
                 "tool_use_id": block.id,
@@ -381,7 +858,7 @@ if __name__ == "__main__":
     if mode_input not in MODES:
         mode_input = "default"
 
-    perms = PermissionManager(mode=mode_input)
+    perms = PermissionManager(mode=mode_input, stores=default_rule_stores())
     print(f"[Permission mode: {mode_input}]")
 
     history = []
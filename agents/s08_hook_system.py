@@ -16,6 +16,23 @@ Teaching exit-code contract:
   - 1 -> block
   - 2 -> inject a message
 
+Hook types in .hooks.json:
+  - "command" (default): a shell command per event, context in HOOK_* env vars
+  - "server": one process per session; events arrive as JSON lines on stdin,
+    each answered by one JSON line {"exitCode", "message", "updatedInput",
+    "additionalContext", "permissionDecision"}
+  - "python": "callable": "pkg.module:function" (or "entry_point": name in
+    the s08.hooks group), called in-process with the same event dict and
+    returning the same reply dict (None means continue)
+
+Hooks for one event run concurrently under HOOK_EVENT_DEADLINE and are folded
+in config order. Add "async": true to an advisory hook (PostToolUse, logging)
+to run it in the background; its notes are injected on the next turn.
+
+"matcher" is "*" (or absent), a tool name, "Edit|Write", a glob such as
+"mcp__*", or a regex ("re:^mcp__github__.*"). .hooks.json is re-read when its
+mtime changes, so hooks can be edited without restarting the agent.
+
 This is intentionally simpler than a production system. The goal here is to
 teach the extension pattern clearly before introducing event-specific edge
 cases.
@@ -23,10 +40,19 @@ cases.
 Key insight: "Extend the agent without touching the loop."
 """
 
+import atexit
+import importlib
 import json
 import os
+import re
 import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from fnmatch import translate
+from importlib.metadata import entry_points
 from pathlib import Path
+from queue import Empty, Queue
 
 from anthropic import Anthropic
 from dotenv import load_dotenv
@@ -45,6 +71,13 @@ MODEL = os.environ["MODEL_ID"]
 
 HOOK_EVENTS = ("PreToolUse", "PostToolUse", "SessionStart")
 HOOK_TIMEOUT = 30  # seconds
+MAX_SERVER_RESTARTS = 3
+PYTHON_HOOK_TIMEOUT = 1.0  # seconds; policy checks should take microseconds
+HOOK_ENTRY_POINT_GROUP = "s08.hooks"
+HOOK_EVENT_DEADLINE = 30  # seconds for all blocking hooks of one event together
+HOOK_WORKERS = 8
+ASYNC_HOOK_WORKERS = 4  # separate pool so slow async hooks never delay blocking ones
+HOOK_RELOAD_INTERVAL = 1.0  # seconds between stat() checks of .hooks.json
 # Real CC timeouts:
 #   TOOL_HOOK_EXECUTION_TIMEOUT_MS = 600000 (10 minutes for tool hooks)
 #   SESSION_END_HOOK_TIMEOUT_MS = 1500 (1.5 seconds for SessionEnd hooks)
@@ -53,6 +86,171 @@ HOOK_TIMEOUT = 30  # seconds
 TRUST_MARKER = WORKDIR / ".claude" / ".claude_trusted"
 
 
+class HookServer:
+    """
+    A long-lived hook process. One JSON line in per event, one JSON line out.
+
+    Replaces a fork per event with a single pipe round trip, and the payload
+    is not truncated the way env vars are. If the process dies it is started
+    again on the next event, up to MAX_SERVER_RESTARTS times.
+    """
+
+    def __init__(self, command: str):
+        self.command = command
+        self.proc = None
+        self.replies = None
+        self.restarts = -1  # the first start is not a restart
+        self._lock = threading.Lock()
+
+    def _start(self):
+        if self.restarts >= MAX_SERVER_RESTARTS:
+            raise RuntimeError(f"hook server gave up after {self.restarts} restarts")
+        self.restarts += 1
+        self.proc = subprocess.Popen(
+            self.command, shell=True, cwd=WORKDIR, text=True, bufsize=1,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        )
+        self.replies = Queue()
+        threading.Thread(target=self._read, args=(self.proc, self.replies), daemon=True).start()
+
+    @staticmethod
+    def _read(proc, replies: Queue):
+        for line in proc.stdout:
+            replies.put(line)
+        replies.put(None)  # EOF: the server exited
+
+    def request(self, payload: dict, timeout: float) -> dict:
+        with self._lock:
+            if self.proc is None or self.proc.poll() is not None:
+                self._start()
+            try:
+                self.proc.stdin.write(json.dumps(payload, ensure_ascii=False, default=str) + "\n")
+                self.proc.stdin.flush()
+                line = self.replies.get(timeout=timeout)
+            except Empty:
+                self._reap()  # a stuck server is restarted on the next event
+                raise TimeoutError(f"no reply within {timeout}s")
+            except BrokenPipeError:
+                line = None
+            if line is None:
+                self._reap()
+                raise RuntimeError("hook server exited")
+            return json.loads(line)
+
+    def _reap(self):
+        self.proc.kill()
+        self.proc.wait()
+        self.proc = None
+
+    def close(self):
+        if self.proc and self.proc.poll() is None:
+            self.proc.stdin.close()
+            try:
+                self.proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+
+class InlineHookRunner:
+    """
+    Runs in-process hooks on daemon threads so the caller can stop waiting.
+
+    Python cannot interrupt a running function, so the watchdog abandons a
+    call that overruns its budget and adds a replacement worker; the stuck
+    thread is a daemon and never blocks interpreter exit.
+    """
+
+    def __init__(self, workers: int = 1):
+        self.jobs = Queue()
+        for _ in range(workers):
+            self._spawn()
+
+    def _spawn(self):
+        threading.Thread(target=self._loop, args=(self.jobs,), daemon=True).start()
+
+    @staticmethod
+    def _loop(jobs: Queue):
+        while True:
+            fn, payload, reply = jobs.get()
+            try:
+                reply.put((True, fn(payload)))
+            except Exception as e:
+                reply.put((False, e))
+
+    def call(self, fn, payload: dict, timeout: float):
+        reply = Queue(maxsize=1)
+        self.jobs.put((fn, payload, reply))
+        try:
+            ok, value = reply.get(timeout=timeout)
+        except Empty:
+            self._spawn()
+            raise TimeoutError(f"no return within {timeout}s")
+        if not ok:
+            raise value
+        return value
+
+
+def compile_matcher(matcher):
+    """
+    Returns ("any", None), ("names", [tool, ...]) or ("pattern", regex).
+
+    Plain names and "a|b" lists stay exact; "*", "?" and "[...]" make a glob;
+    anything else, or a "re:" prefix, is a regex matched against the full name.
+    """
+    if not matcher or matcher == "*":
+        return "any", None
+    if matcher.startswith("re:"):
+        return "pattern", re.compile(matcher[3:])
+    if re.fullmatch(r"[\w-]+(\|[\w-]+)*", matcher):
+        return "names", matcher.split("|")
+    if re.fullmatch(r"[\w\-*?\[\]|]+", matcher):
+        return "pattern", re.compile("|".join(translate(g) for g in matcher.split("|")))
+    return "pattern", re.compile(matcher)
+
+
+class HookIndex:
+    """
+    One immutable snapshot of .hooks.json with matchers precompiled.
+
+    Exact tool names are dict lookups, "*" hooks always apply, and only
+    glob/regex matchers are tested against a new tool name. The merged list
+    is memoized per (event, tool), so dispatch touches only matching hooks.
+    """
+
+    def __init__(self, config: dict):
+        self.hooks = {event: list(config.get(event, [])) for event in HOOK_EVENTS}
+        self._exact, self._always, self._patterns = {}, {}, {}
+        for event, defs in self.hooks.items():
+            exact, always, patterns = {}, [], []
+            for pos, hook_def in enumerate(defs):
+                kind, value = compile_matcher(hook_def.get("matcher"))
+                if kind == "any":
+                    always.append(pos)
+                elif kind == "names":
+                    for name in value:
+                        exact.setdefault(name, []).append(pos)
+                else:
+                    patterns.append((pos, value))
+            self._exact[event], self._always[event], self._patterns[event] = exact, always, patterns
+        self._memo = {}
+
+    def for_tool(self, event: str, tool_name: str = None) -> list:
+        """Hooks for this event and tool, in config order. None means no tool filter."""
+        defs = self.hooks.get(event, [])
+        if tool_name is None:
+            return defs
+        key = (event, tool_name)
+        matched = self._memo.get(key)
+        if matched is None:
+            positions = set(self._always[event]) | set(self._exact[event].get(tool_name, ()))
+            positions.update(pos for pos, rx in self._patterns[event] if rx.fullmatch(tool_name))
+            matched = self._memo[key] = [defs[pos] for pos in sorted(positions)]
+        return matched
+
+    def server_commands(self) -> set:
+        return {h.get("command") for defs in self.hooks.values() for h in defs if h.get("type") == "server"}
+
+
 class HookManager:
     """
     Load and execute hooks from .hooks.json configuration.
@@ -64,17 +262,62 @@ class HookManager:
     """
 
     def __init__(self, config_path: Path = None, sdk_mode: bool = False):
-        self.hooks = {"PreToolUse": [], "PostToolUse": [], "SessionStart": []}
+        self._index = HookIndex({})
         self._sdk_mode = sdk_mode
-        config_path = config_path or (WORKDIR / ".hooks.json")
-        if config_path.exists():
-            try:
-                config = json.loads(config_path.read_text())
-                for event in HOOK_EVENTS:
-                    self.hooks[event] = config.get("hooks", {}).get(event, [])
-                print(f"[Hooks loaded from {config_path}]")
-            except Exception as e:
-                print(f"[Hook config error: {e}]")
+        self._servers = {}  # command -> HookServer, started lazily
+        self._callables = {}  # "module:function" / entry point -> function
+        self._inline = None  # InlineHookRunner, started on first python hook
+        self._start_lock = threading.Lock()  # guards lazy _servers / _inline starts
+        self.stats = {}  # hook label -> {"calls", "total_ms", "max_ms", "timeouts", "errors"}
+        self._stats_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=HOOK_WORKERS, thread_name_prefix="hook")
+        self._async_pool = ThreadPoolExecutor(max_workers=ASYNC_HOOK_WORKERS,
+                                              thread_name_prefix="hook-async")
+        self._pending = []  # notes from async hooks, drained on the next turn
+        self._pending_lock = threading.Lock()
+        atexit.register(self.close)
+        self.config_path = config_path or (WORKDIR / ".hooks.json")
+        self._signature = None  # (mtime_ns, size) of the loaded config
+        self._next_reload_check = 0.0
+        self.reload_if_changed()
+
+    @property
+    def hooks(self) -> dict:
+        return self._index.hooks
+
+    def reload_if_changed(self) -> bool:
+        """
+        Re-read .hooks.json if its mtime or size changed, at most once per
+        HOOK_RELOAD_INTERVAL. The new index is built first and swapped in as
+        one assignment; a broken file keeps the previous hooks.
+        """
+        now = time.monotonic()
+        if now < self._next_reload_check:
+            return False
+        self._next_reload_check = now + HOOK_RELOAD_INTERVAL
+        try:
+            st = self.config_path.stat()
+            signature = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            signature = None
+        if signature == self._signature:
+            return False
+        loaded = self._signature is not None
+        self._signature = signature
+        try:
+            config = json.loads(self.config_path.read_text()) if signature else {}
+            index = HookIndex(config.get("hooks", {}))
+        except Exception as e:
+            print(f"[Hook config error: {e}]")
+            return False
+        self._index = index
+        if signature:
+            print(f"[Hooks {'reloaded' if loaded else 'loaded'} from {self.config_path}]")
+        with self._start_lock:
+            stale = [self._servers.pop(c) for c in set(self._servers) - index.server_commands()]
+        for server in stale:
+            server.close()
+        return True
 
     def _check_workspace_trust(self) -> bool:
         """
@@ -94,6 +337,11 @@ class HookManager:
         Returns: {"blocked": bool, "messages": list[str]}
           - blocked: True if any hook returned exit code 1
           - messages: stderr content from exit-code-2 hooks (to inject)
+
+        Blocking hooks run concurrently and all see the original context;
+        their outcomes are applied in config order, so a later updatedInput
+        wins. A hook still running at HOOK_EVENT_DEADLINE is ignored.
+        Async hooks are only started here (see drain_async).
         """
         result = {"blocked": False, "messages": []}
 
@@ -101,77 +349,212 @@ class HookManager:
         if not self._check_workspace_trust():
             return result
 
-        hooks = self.hooks.get(event, [])
-
-        for hook_def in hooks:
-            # Check matcher (tool name filter for PreToolUse/PostToolUse)
-            matcher = hook_def.get("matcher")
-            if matcher and context:
-                tool_name = context.get("tool_name", "")
-                if matcher != "*" and matcher != tool_name:
-                    continue
-
-            command = hook_def.get("command", "")
-            if not command:
-                continue
+        self.reload_if_changed()
+        # Matcher filter on tool name (PreToolUse/PostToolUse); no context, no filter
+        tool_name = context.get("tool_name", "") if context else None
+
+        blocking = []
+        for hook_def in self._index.for_tool(event, tool_name):
+            # PreToolUse results gate the tool, so they are never async
+            if hook_def.get("async") and event != "PreToolUse":
+                future = self._async_pool.submit(self._execute, hook_def, event, dict(context or {}))
+                future.add_done_callback(lambda f, e=event: self._collect_async(e, f))
+            else:
+                blocking.append(hook_def)
+
+        if len(blocking) == 1:
+            outcomes = [self._execute(blocking[0], event, context)]
+        else:
+            futures = [self._pool.submit(self._execute, h, event, context) for h in blocking]
+            done, late = wait(futures, timeout=HOOK_EVENT_DEADLINE)
+            if late:
+                print(f"  [hook:{event}] {len(late)} hook(s) missed the {HOOK_EVENT_DEADLINE}s deadline")
+            outcomes = [f.result() if f in done else None for f in futures]
+
+        for outcome in outcomes:
+            if outcome:
+                self._apply(outcome, event, context, result)
 
-            # Build environment with hook context
-            env = dict(os.environ)
-            if context:
-                env["HOOK_EVENT"] = event
-                env["HOOK_TOOL_NAME"] = context.get("tool_name", "")
-                env["HOOK_TOOL_INPUT"] = json.dumps(
-                    context.get("tool_input", {}), ensure_ascii=False)[:10000]
-                if "tool_output" in context:
-                    env["HOOK_TOOL_OUTPUT"] = str(
-                        context["tool_output"])[:10000]
+        return result
 
-            try:
-                r = subprocess.run(
-                    command, shell=True, cwd=WORKDIR, env=env,
-                    capture_output=True, text=True, timeout=HOOK_TIMEOUT,
-                )
-
-                if r.returncode == 0:
-                    # Continue silently
-                    if r.stdout.strip():
-                        print(f"  [hook:{event}] {r.stdout.strip()[:100]}")
-
-                    # Optional structured stdout: small extension point that
-                    # keeps the teaching contract simple.
-                    try:
-                        hook_output = json.loads(r.stdout)
-                        if "updatedInput" in hook_output and context:
-                            context["tool_input"] = hook_output["updatedInput"]
-                        if "additionalContext" in hook_output:
-                            result["messages"].append(
-                                hook_output["additionalContext"])
-                        if "permissionDecision" in hook_output:
-                            result["permission_override"] = (
-                                hook_output["permissionDecision"])
-                    except (json.JSONDecodeError, TypeError):
-                        pass  # stdout was not JSON -- normal for simple hooks
-
-                elif r.returncode == 1:
-                    # Block execution
-                    result["blocked"] = True
-                    reason = r.stderr.strip() or "Blocked by hook"
-                    result["block_reason"] = reason
-                    print(f"  [hook:{event}] BLOCKED: {reason[:200]}")
-
-                elif r.returncode == 2:
-                    # Inject message
-                    msg = r.stderr.strip()
-                    if msg:
-                        result["messages"].append(msg)
-                        print(f"  [hook:{event}] INJECT: {msg[:200]}")
+    def _collect_async(self, event: str, future):
+        """Keep only the advisory part of an async hook: its messages."""
+        if future.cancelled() or not future.result():
+            return
+        outcome = future.result()
+        result = {"blocked": False, "messages": []}
+        self._apply(outcome, event, None, result)
+        with self._pending_lock:
+            self._pending.extend(result["messages"])
 
-            except subprocess.TimeoutExpired:
-                print(f"  [hook:{event}] Timeout ({HOOK_TIMEOUT}s)")
-            except Exception as e:
-                print(f"  [hook:{event}] Error: {e}")
+    def drain_async(self) -> list:
+        """Notes from async hooks that finished since the last call."""
+        with self._pending_lock:
+            notes, self._pending = self._pending, []
+        return notes
 
-        return result
+    def _execute(self, hook_def: dict, event: str, context: dict) -> dict:
+        """
+        Run one hook. Returns a normalized outcome
+        {"code": 0|1|2, "stdout": str, "message": str, "data": dict|None},
+        or None when the hook failed to produce one.
+        """
+        kind = hook_def.get("type", "command")
+        runner = {"server": self._run_server, "python": self._run_python}.get(kind, self._run_command)
+        started = time.perf_counter()
+        outcome, failure = None, None
+        try:
+            outcome = runner(hook_def, event, context)
+        except (subprocess.TimeoutExpired, TimeoutError) as e:
+            failure = "timeouts"
+            print(f"  [hook:{event}] Timeout: {e}")
+        except Exception as e:
+            failure = "errors"
+            print(f"  [hook:{event}] Error: {e}")
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._stats_lock:
+            stats = self.stats.setdefault(self._label(hook_def), {
+                "calls": 0, "total_ms": 0.0, "max_ms": 0.0, "timeouts": 0, "errors": 0})
+            stats["calls"] += 1
+            stats["total_ms"] += elapsed
+            stats["max_ms"] = max(stats["max_ms"], elapsed)
+            if failure:
+                stats[failure] += 1
+        return outcome
+
+    @staticmethod
+    def _label(hook_def: dict) -> str:
+        return (hook_def.get("callable") or hook_def.get("entry_point")
+                or hook_def.get("command", "?"))
+
+    @staticmethod
+    def _event_payload(event: str, context: dict) -> dict:
+        context = context or {}
+        return {
+            "event": event,
+            "tool_name": context.get("tool_name", ""),
+            "tool_input": context.get("tool_input", {}),
+            "tool_output": context.get("tool_output"),
+        }
+
+    @staticmethod
+    def _reply_outcome(reply: dict) -> dict:
+        """Server and python hooks answer with a dict instead of an exit code."""
+        reply = reply or {}
+        return {"code": int(reply.get("exitCode", 0)), "stdout": "",
+                "message": str(reply.get("message", "")), "data": reply}
+
+    def _run_command(self, hook_def: dict, event: str, context: dict) -> dict:
+        command = hook_def.get("command", "")
+        if not command:
+            return None
+
+        # Build environment with hook context
+        env = dict(os.environ)
+        if context:
+            env["HOOK_EVENT"] = event
+            env["HOOK_TOOL_NAME"] = context.get("tool_name", "")
+            env["HOOK_TOOL_INPUT"] = json.dumps(
+                context.get("tool_input", {}), ensure_ascii=False)[:10000]
+            if "tool_output" in context:
+                env["HOOK_TOOL_OUTPUT"] = str(
+                    context["tool_output"])[:10000]
+
+        r = subprocess.run(
+            command, shell=True, cwd=WORKDIR, env=env,
+            capture_output=True, text=True, timeout=HOOK_TIMEOUT,
+        )
+        # Optional structured stdout: small extension point that
+        # keeps the teaching contract simple.
+        try:
+            data = json.loads(r.stdout)
+        except (json.JSONDecodeError, TypeError):
+            data = None  # stdout was not JSON -- normal for simple hooks
+        return {"code": r.returncode, "stdout": r.stdout.strip(),
+                "message": r.stderr.strip(), "data": data if isinstance(data, dict) else None}
+
+    def _run_server(self, hook_def: dict, event: str, context: dict) -> dict:
+        command = hook_def.get("command", "")
+        with self._start_lock:
+            server = self._servers.get(command)
+            if server is None:
+                server = self._servers[command] = HookServer(command)
+        reply = server.request(self._event_payload(event, context),
+                               timeout=hook_def.get("timeout", HOOK_TIMEOUT))
+        return self._reply_outcome(reply)
+
+    def _run_python(self, hook_def: dict, event: str, context: dict) -> dict:
+        fn = self._resolve(hook_def)
+        with self._start_lock:
+            if self._inline is None:
+                self._inline = InlineHookRunner(HOOK_WORKERS)
+        reply = self._inline.call(fn, self._event_payload(event, context),
+                                  timeout=hook_def.get("timeout", PYTHON_HOOK_TIMEOUT))
+        return self._reply_outcome(reply)
+
+    def _resolve(self, hook_def: dict):
+        """Import a "module:function" reference or entry point once per session."""
+        label = self._label(hook_def)
+        fn = self._callables.get(label)
+        if fn is None:
+            if "entry_point" in hook_def:
+                matches = entry_points(group=HOOK_ENTRY_POINT_GROUP, name=hook_def["entry_point"])
+                if not matches:
+                    raise LookupError(f"no {HOOK_ENTRY_POINT_GROUP} entry point {label!r}")
+                fn = next(iter(matches)).load()
+            else:
+                module_name, _, attr = label.partition(":")
+                fn = importlib.import_module(module_name)
+                for part in attr.split("."):
+                    fn = getattr(fn, part)
+            self._callables[label] = fn
+        return fn
+
+    def _apply(self, outcome: dict, event: str, context: dict, result: dict):
+        """Fold one hook outcome into the event result (exit-code contract)."""
+        if outcome["code"] == 0:
+            # Continue silently
+            if outcome["stdout"]:
+                print(f"  [hook:{event}] {outcome['stdout'][:100]}")
+            data = outcome["data"] or {}
+            if "updatedInput" in data and context:
+                context["tool_input"] = data["updatedInput"]
+            if data.get("additionalContext"):
+                result["messages"].append(data["additionalContext"])
+            if "permissionDecision" in data:
+                result["permission_override"] = data["permissionDecision"]
+
+        elif outcome["code"] == 1:
+            # Block execution
+            result["blocked"] = True
+            reason = outcome["message"] or "Blocked by hook"
+            result["block_reason"] = reason
+            print(f"  [hook:{event}] BLOCKED: {reason[:200]}")
+
+        elif outcome["code"] == 2:
+            # Inject message
+            msg = outcome["message"]
+            if msg:
+                result["messages"].append(msg)
+                print(f"  [hook:{event}] INJECT: {msg[:200]}")
+
+    def stats_report(self) -> str:
+        if not self.stats:
+            return "No hooks have run."
+        lines = []
+        for label, s in sorted(self.stats.items(), key=lambda kv: -kv[1]["total_ms"]):
+            avg = s["total_ms"] / s["calls"] if s["calls"] else 0.0
+            lines.append(f"{label}: {s['calls']} calls, avg {avg:.3f}ms, max {s['max_ms']:.3f}ms, "
+                         f"{s['timeouts']} timeouts, {s['errors']} errors")
+        return "\n".join(lines)
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._async_pool.shutdown(wait=False, cancel_futures=True)
+        with self._start_lock:
+            servers, self._servers = list(self._servers.values()), {}
+        for server in servers:
+            server.close()
 
 
 # -- Tool implementations (same as s02) --
@@ -248,6 +631,18 @@ TOOLS = [
 SYSTEM = f"You are a coding agent at {WORKDIR}. Use tools to solve tasks."
 
 
+def inject_async_notes(messages: list, hooks: HookManager):
+    """Attach notes from async hooks that finished since the last turn."""
+    notes = hooks.drain_async()
+    if not notes:
+        return
+    content = messages[-1]["content"]
+    if isinstance(content, str):
+        content = messages[-1]["content"] = [{"type": "text", "text": content}]
+    for note in notes:
+        content.append({"type": "text", "text": f"[Hook note]: {note}"})
+
+
 def agent_loop(messages: list, hooks: HookManager):
     """
     The hook-aware agent loop.
@@ -256,6 +651,7 @@ def agent_loop(messages: list, hooks: HookManager):
     SessionStart, PreToolUse, execute tool, PostToolUse.
     """
     while True:
+        inject_async_notes(messages, hooks)
         response = client.messages.create(
             model=MODEL, system=SYSTEM, messages=messages,
             tools=TOOLS, max_tokens=8000,
@@ -330,6 +726,9 @@ if __name__ == "__main__":
             break
         if query.strip().lower() in ("q", "exit", ""):
             break
+        if query.strip() == "/hooks":
+            print(hooks.stats_report())
+            continue
         history.append({"role": "user", "content": query})
         agent_loop(history, hooks)
         response_content = history[-1]["content"]
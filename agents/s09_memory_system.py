@@ -21,6 +21,7 @@ Do NOT use memory for:
 Storage layout:
   .memory/
     MEMORY.md
+    .manifest.json      # parsed cache keyed by file mtime + size
     prefer_tabs.md
     review_style.md
     incident_board.md
@@ -29,6 +30,15 @@ Each memory is a small Markdown file with frontmatter.
 The agent can save a memory through save_memory(), and the memory index
 is rebuilt after each write.
 
+Recall is ranked: a BM25 index over name, description and body picks the
+memories relevant to the current request, within a token budget. The rest
+are listed by name so the agent can still fetch them with search_memory.
+
+MEMORY_BACKEND=sqlite swaps the Markdown files for .memory/memory.db, an
+SQLite database in WAL mode with an FTS5 index. Several sessions can write
+at once, save_memory is a single upsert, and the Markdown layout stays
+available through /memories import and /memories export.
+
 An optional "Dream" pass can later consolidate, deduplicate, and prune
 stored memories. It is useful, but it is not the first thing readers need
 to understand.
@@ -37,10 +47,17 @@ Key insight: "Memory only stores cross-session information that is still
 worth recalling later and is not easy to re-derive from the current repo."
 """
 
+import hashlib
 import json
+import math
 import os
+import random
 import re
+import sqlite3
 import subprocess
+import tempfile
+import threading
+import time
 from pathlib import Path
 
 from anthropic import Anthropic
@@ -59,6 +76,140 @@ MEMORY_DIR = WORKDIR / ".memory"
 MEMORY_INDEX = MEMORY_DIR / "MEMORY.md"
 MEMORY_TYPES = ("user", "feedback", "project", "reference")
 MAX_INDEX_LINES = 200
+MEMORY_MANIFEST = ".manifest.json"
+MEMORY_RESCAN_SECONDS = 5  # in-place edits do not touch the dir mtime; rescan this often
+MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "markdown")  # "markdown" or "sqlite"
+MEMORY_DB = MEMORY_DIR / "memory.db"
+MEMORY_TOP_K = 8
+MEMORY_TOKEN_BUDGET = 2000  # memory tokens injected into the prompt per turn
+BM25_K1, BM25_B = 1.2, 0.75
+# Field weights are applied as repeated term counts (a simple BM25F).
+FIELD_WEIGHTS = (("name", 3), ("description", 2), ("content", 1))
+
+
+def tokenize(text: str) -> list[str]:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def memory_tokens(name: str, mem: dict) -> int:
+    return (len(name) + len(mem["description"]) + len(mem["content"])) // 4 + 8
+
+
+class BM25Index:
+    """Inverted index over memories: term -> {memory name: weighted term count}."""
+
+    def __init__(self, memories: dict):
+        self.postings = {}
+        self.lengths = {}
+        for name, mem in memories.items():
+            counts = {}
+            for field, weight in FIELD_WEIGHTS:
+                for term in tokenize(name if field == "name" else mem.get(field, "")):
+                    counts[term] = counts.get(term, 0) + weight
+            self.lengths[name] = sum(counts.values()) or 1
+            for term, count in counts.items():
+                self.postings.setdefault(term, {})[name] = count
+        self.avg_length = sum(self.lengths.values()) / len(self.lengths) if self.lengths else 1.0
+
+    def search(self, query: str) -> list[tuple[str, float]]:
+        """(name, score) for every memory sharing a term with the query, best first."""
+        total = len(self.lengths)
+        scores = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (total - len(posting) + 0.5) / (len(posting) + 0.5))
+            for name, tf in posting.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[name] / self.avg_length)
+                scores[name] = scores.get(name, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+class SQLiteMemoryStore:
+    """
+    Optional memory backend: one SQLite file with an FTS5 index.
+
+    WAL mode lets readers and one writer proceed concurrently across
+    sessions and teammates; triggers keep the FTS table in step with the
+    base table, so a save is one upsert and search uses the index.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS memories ("
+            "name TEXT PRIMARY KEY, description TEXT, type TEXT, content TEXT, updated_at REAL)")
+        try:
+            self.conn.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(
+                    name, description, content, content='memories', content_rowid='rowid');
+                CREATE TRIGGER IF NOT EXISTS memories_ai AFTER INSERT ON memories BEGIN
+                    INSERT INTO memories_fts(rowid, name, description, content)
+                    VALUES (new.rowid, new.name, new.description, new.content);
+                END;
+                CREATE TRIGGER IF NOT EXISTS memories_ad AFTER DELETE ON memories BEGIN
+                    INSERT INTO memories_fts(memories_fts, rowid, name, description, content)
+                    VALUES ('delete', old.rowid, old.name, old.description, old.content);
+                END;
+                CREATE TRIGGER IF NOT EXISTS memories_au AFTER UPDATE ON memories BEGIN
+                    INSERT INTO memories_fts(memories_fts, rowid, name, description, content)
+                    VALUES ('delete', old.rowid, old.name, old.description, old.content);
+                    INSERT INTO memories_fts(rowid, name, description, content)
+                    VALUES (new.rowid, new.name, new.description, new.content);
+                END;
+            """)
+            self.fts = True
+        except sqlite3.OperationalError:  # SQLite built without FTS5
+            self.fts = False
+
+    def upsert(self, name: str, description: str, mem_type: str, content: str):
+        self.conn.execute(
+            "INSERT INTO memories (name, description, type, content, updated_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET description=excluded.description, type=excluded.type, "
+            "content=excluded.content, updated_at=excluded.updated_at",
+            (name, description, mem_type, content, time.time()))
+
+    def all(self) -> dict:
+        rows = self.conn.execute(
+            "SELECT name, description, type, content, updated_at FROM memories ORDER BY name")
+        return {name: {"description": desc, "type": mem_type, "content": content, "file": None,
+                       "updated_at": updated_at}
+                for name, desc, mem_type, content, updated_at in rows}
+
+    def archive(self, name: str):
+        """Move a memory out of the live table (and out of search) without losing it."""
+        self.conn.execute("CREATE TABLE IF NOT EXISTS memories_archive AS SELECT * FROM memories WHERE 0")
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute("INSERT INTO memories_archive SELECT * FROM memories WHERE name = ?", (name,))
+            self.conn.execute("DELETE FROM memories WHERE name = ?", (name,))
+        except BaseException:
+            self.conn.execute("ROLLBACK")  # otherwise every later write on this connection fails
+            raise
+        self.conn.execute("COMMIT")
+
+    def search(self, query: str, limit: int = 32) -> list[tuple[str, float]]:
+        """(name, score) best first; FTS5 bm25 with name/description weighted over body."""
+        terms = tokenize(query)
+        if not terms or not self.fts:
+            return []
+        match = " OR ".join(f'"{term}"' for term in terms)
+        rows = self.conn.execute(
+            "SELECT name, bm25(memories_fts, 3.0, 2.0, 1.0) AS score FROM memories_fts "
+            "WHERE memories_fts MATCH ? ORDER BY score LIMIT ?", (match, limit))
+        return [(name, -score) for name, score in rows]
+
+    def data_version(self) -> int:
+        """Changes whenever another connection commits; cheap change detection."""
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
 
 
 class MemoryManager:
@@ -69,38 +220,160 @@ class MemoryManager:
     one Markdown file per memory, plus one compact index file.
     """
 
-    def __init__(self, memory_dir: Path = None):
+    def __init__(self, memory_dir: Path = None, store: SQLiteMemoryStore = None):
         self.memory_dir = memory_dir or MEMORY_DIR
+        self.store = store  # None: Markdown files; otherwise the SQLite backend
         self.memories = {}  # name -> {description, type, content}
+        self._index = None  # BM25Index, rebuilt lazily after changes
+        self._version = 0  # bumped whenever self.memories changes
+        self._prompt_memo = (None, "")  # ((version, query), rendered section)
+        self._dir_mtime = None
+        self._store_version = None
+        self._last_scan = 0.0
+
+    def _changed(self):
+        self._index = None
+        self._version += 1
+
+    def load_all(self, quiet: bool = False):
+        """
+        Load all individual memory files.
 
-    def load_all(self):
-        """Load MEMORY.md index and all individual memory files."""
+        Parsed entries are cached in .manifest.json under each file's
+        (mtime_ns, size); only new or modified files are read and parsed.
+        """
         self.memories = {}
+        self._changed()
+        self._last_scan = time.monotonic()
+        if self.store:
+            self._store_version = self.store.data_version()
+            self.memories = self.store.all()
+            if not self.memories and any(self.memory_dir.glob("*.md")):
+                self.import_markdown()
+            if self.memories and not quiet:
+                print(f"[Memory loaded: {len(self.memories)} memories from {self.store.path}]")
+            return
         if not self.memory_dir.exists():
+            self._dir_mtime = None
             return
 
+        manifest_path = self.memory_dir / MEMORY_MANIFEST
+        try:
+            cached = json.loads(manifest_path.read_text())
+        except (OSError, json.JSONDecodeError):
+            cached = {}
+
         # Scan all .md files except MEMORY.md
-        for md_file in sorted(self.memory_dir.glob("*.md")):
-            if md_file.name == "MEMORY.md":
-                continue
-            parsed = self._parse_frontmatter(md_file.read_text())
-            if parsed:
-                name = parsed.get("name", md_file.stem)
-                self.memories[name] = {
-                    "description": parsed.get("description", ""),
-                    "type": parsed.get("type", "project"),
-                    "content": parsed.get("content", ""),
-                    "file": md_file.name,
-                }
+        fresh, parsed_count = {}, 0
+        with os.scandir(self.memory_dir) as entries:
+            for entry in sorted(entries, key=lambda e: e.name):
+                if not entry.name.endswith(".md") or entry.name == "MEMORY.md":
+                    continue
+                st = entry.stat()
+                signature = [st.st_mtime_ns, st.st_size]
+                record = cached.get(entry.name)
+                if not record or record.get("sig") != signature:
+                    parsed = self._parse_frontmatter(Path(entry.path).read_text())
+                    record = {"sig": signature, "memory": parsed and {
+                        "name": parsed.get("name", entry.name[:-3]),
+                        "description": parsed.get("description", ""),
+                        "type": parsed.get("type", "project"),
+                        "content": parsed.get("content", ""),
+                    }}
+                    parsed_count += 1
+                fresh[entry.name] = record
+                mem = record["memory"]
+                if mem:
+                    self.memories[mem["name"]] = {
+                        "description": mem["description"],
+                        "type": mem["type"],
+                        "content": mem["content"],
+                        "file": entry.name,
+                        "updated_at": signature[0] / 1e9,
+                    }
+
+        if fresh != cached:
+            self._write_manifest(fresh)
+        self._dir_mtime = self.memory_dir.stat().st_mtime_ns
 
         count = len(self.memories)
-        if count > 0:
-            print(f"[Memory loaded: {count} memories from {self.memory_dir}]")
+        if count > 0 and not quiet:
+            print(f"[Memory loaded: {count} memories from {self.memory_dir}, {parsed_count} parsed]")
+
+    def _write_manifest(self, records: dict):
+        fd, tmp = tempfile.mkstemp(dir=self.memory_dir, prefix=".manifest-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(records, f, ensure_ascii=False)
+            os.replace(tmp, self.memory_dir / MEMORY_MANIFEST)
+        except OSError:
+            Path(tmp).unlink(missing_ok=True)
 
-    def load_memory_prompt(self) -> str:
-        """Build a memory section for injection into the system prompt."""
+    def refresh_if_changed(self) -> bool:
+        """
+        Cheap per-turn check: one stat of the directory. Files created,
+        deleted or saved by rename change its mtime; in-place edits are
+        caught by a full rescan at most every MEMORY_RESCAN_SECONDS.
+        With the SQLite backend, PRAGMA data_version tells the same thing.
+        """
+        if self.store:
+            if self.store.data_version() == self._store_version:
+                return False
+            self.load_all(quiet=True)
+            return True
+        try:
+            dir_mtime = self.memory_dir.stat().st_mtime_ns
+        except FileNotFoundError:
+            dir_mtime = None
+        if dir_mtime == self._dir_mtime and time.monotonic() - self._last_scan < MEMORY_RESCAN_SECONDS:
+            return False
+        before = self._version
+        previous = self.memories
+        self.load_all(quiet=True)
+        if self.memories == previous:
+            self._version = before  # nothing changed: keep the memoized prompt
+            return False
+        return True
+
+    def recall(self, query: str, k: int = MEMORY_TOP_K, budget: int = MEMORY_TOKEN_BUDGET) -> list[str]:
+        """Names of the memories most relevant to `query` that fit in `budget` tokens."""
+        if self.store and self.store.fts:
+            ranked = self.store.search(query, limit=max(4 * k, 32))
+        else:
+            if self._index is None:
+                self._index = BM25Index(self.memories)
+            ranked = self._index.search(query)
+        chosen, used = [], 0
+        for name, _ in ranked:
+            if len(chosen) >= k:
+                break
+            if name not in self.memories:
+                continue  # written by another session since our last refresh
+            cost = memory_tokens(name, self.memories[name])
+            if used + cost <= budget:
+                chosen.append(name)
+                used += cost
+        return chosen
+
+    def load_memory_prompt(self, query: str = "") -> str:
+        """
+        Build a memory section for injection into the system prompt.
+
+        A small store is injected whole. Past MEMORY_TOP_K memories or
+        MEMORY_TOKEN_BUDGET tokens, only the memories recalled for `query`
+        are injected and the rest are listed by file.
+        """
         if not self.memories:
             return ""
+        key = (self._version, query)
+        if self._prompt_memo[0] == key:
+            return self._prompt_memo[1]
+
+        total = sum(memory_tokens(name, mem) for name, mem in self.memories.items())
+        if len(self.memories) <= MEMORY_TOP_K and total <= MEMORY_TOKEN_BUDGET:
+            selected = set(self.memories)
+        else:
+            selected = set(self.recall(query))
 
         sections = []
         sections.append("# Memories (persistent across sessions)")
@@ -108,7 +381,7 @@ class MemoryManager:
 
         # Group by type for readability
         for mem_type in MEMORY_TYPES:
-            typed = {k: v for k, v in self.memories.items() if v["type"] == mem_type}
+            typed = {k: v for k, v in self.memories.items() if v["type"] == mem_type and k in selected}
             if not typed:
                 continue
             sections.append(f"## [{mem_type}]")
@@ -118,7 +391,12 @@ class MemoryManager:
                     sections.append(mem["content"].strip())
                 sections.append("")
 
-        return "\n".join(sections)
+        rest = [name for name in self.memories if name not in selected]
+        if rest:
+            sections.append("Other memories (use search_memory if one looks relevant): " + ", ".join(rest))
+
+        self._prompt_memo = (key, "\n".join(sections))
+        return self._prompt_memo[1]
 
     def save_memory(self, name: str, description: str, mem_type: str, content: str) -> str:
         """
@@ -134,20 +412,16 @@ class MemoryManager:
         if not safe_name:
             return "Error: invalid memory name"
 
-        self.memory_dir.mkdir(parents=True, exist_ok=True)
+        if self.store:
+            # One upsert; no file rewrite and no index rebuild
+            self.store.upsert(name, description, mem_type, content)
+            self.memories[name] = {"description": description, "type": mem_type,
+                                   "content": content, "file": None, "updated_at": time.time()}
+            self._changed()
+            return f"Saved memory '{name}' [{mem_type}] to {self.store.path.name}"
 
-        # Write individual memory file with frontmatter
-        frontmatter = (
-            f"---\n"
-            f"name: {name}\n"
-            f"description: {description}\n"
-            f"type: {mem_type}\n"
-            f"---\n"
-            f"{content}\n"
-        )
-        file_name = f"{safe_name}.md"
+        file_name = self._write_memory_file(safe_name, name, description, mem_type, content)
         file_path = self.memory_dir / file_name
-        file_path.write_text(frontmatter)
 
         # Update in-memory store
         self.memories[name] = {
@@ -155,23 +429,85 @@ class MemoryManager:
             "type": mem_type,
             "content": content,
             "file": file_name,
+            "updated_at": time.time(),
         }
+        self._changed()
 
         # Rebuild MEMORY.md index
         self._rebuild_index()
 
-        return f"Saved memory '{name}' [{mem_type}] to {file_path.relative_to(WORKDIR)}"
+        self._dir_mtime = self.memory_dir.stat().st_mtime_ns  # our own write is not a reload
+        shown = file_path.relative_to(WORKDIR) if file_path.is_relative_to(WORKDIR) else file_path
+        return f"Saved memory '{name}' [{mem_type}] to {shown}"
+
+    def _write_memory_file(self, safe_name: str, name: str, description: str,
+                           mem_type: str, content: str) -> str:
+        """Write one memory file with frontmatter; returns its file name."""
+        self.memory_dir.mkdir(parents=True, exist_ok=True)
+        frontmatter = (
+            f"---\n"
+            f"name: {name}\n"
+            f"description: {description}\n"
+            f"type: {mem_type}\n"
+            f"---\n"
+            f"{content}\n"
+        )
+        file_name = f"{safe_name}.md"
+        (self.memory_dir / file_name).write_text(frontmatter)
+        return file_name
 
     def _rebuild_index(self):
         """Rebuild MEMORY.md from current in-memory state, capped at 200 lines."""
-        lines = ["# Memory Index", ""]
-        for name, mem in self.memories.items():
-            lines.append(f"- {name}: {mem['description']} [{mem['type']}]")
-            if len(lines) >= MAX_INDEX_LINES:
-                lines.append(f"... (truncated at {MAX_INDEX_LINES} lines)")
-                break
+        entries = [f"- {name}: {mem['description']} [{mem['type']}]" for name, mem in self.memories.items()]
+        capacity = MAX_INDEX_LINES - 2  # after the two header lines
+        if len(entries) > capacity:
+            entries = entries[:capacity - 1] + [f"... (truncated at {MAX_INDEX_LINES} lines)"]
+        lines = ["# Memory Index", ""] + entries
         self.memory_dir.mkdir(parents=True, exist_ok=True)
-        MEMORY_INDEX.write_text("\n".join(lines) + "\n")
+        (self.memory_dir / MEMORY_INDEX.name).write_text("\n".join(lines) + "\n")
+
+    def search(self, query: str, k: int = 5) -> str:
+        """Full text of the memories that best match `query` (search_memory tool)."""
+        names = self.recall(query, k=k)
+        if not names:
+            return "No matching memories."
+        return "\n\n".join(
+            f"[{self.memories[n]['type']}] {n}: {self.memories[n]['description']}\n{self.memories[n]['content']}"
+            for n in names)
+
+    def import_markdown(self, source_dir: Path = None) -> int:
+        """Copy Markdown memories into the SQLite store."""
+        markdown = MemoryManager(source_dir or self.memory_dir)
+        markdown.load_all(quiet=True)
+        for name, mem in markdown.memories.items():
+            self.store.upsert(name, mem["description"], mem["type"], mem["content"])
+        self.memories = self.store.all()
+        self._changed()
+        return len(markdown.memories)
+
+    def archive_memory(self, name: str):
+        """Retire a memory: files move to .memory/.archive/, rows to memories_archive."""
+        mem = self.memories.pop(name, None)
+        if mem is None:
+            return
+        if self.store:
+            self.store.archive(name)
+        elif mem["file"]:
+            archive_dir = self.memory_dir / ".archive"
+            archive_dir.mkdir(parents=True, exist_ok=True)
+            (self.memory_dir / mem["file"]).replace(archive_dir / mem["file"])
+        self._changed()
+
+    def export_markdown(self, target_dir: Path = None) -> int:
+        """Write every memory back out in the Markdown layout, MEMORY.md included."""
+        markdown = MemoryManager(target_dir or self.memory_dir)
+        for name, mem in self.memories.items():
+            safe_name = re.sub(r"[^a-zA-Z0-9_-]", "_", name.lower())
+            file_name = markdown._write_memory_file(
+                safe_name, name, mem["description"], mem["type"], mem["content"])
+            markdown.memories[name] = dict(mem, file=file_name)
+        markdown._rebuild_index()  # once, not once per memory
+        return len(self.memories)
 
     def _parse_frontmatter(self, text: str) -> dict | None:
         """Parse --- delimited frontmatter + body content."""
@@ -187,6 +523,47 @@ class MemoryManager:
         return result
 
 
+def shingles(text: str, size: int = 3) -> set[str]:
+    words = tokenize(text)
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+# MinHash: 64 seeded universal hashes; LSH: 32 bands x 2 rows, so pairs down
+# to Jaccard ~0.2 usually share a bucket. Candidates are then checked exactly.
+MINHASH_PRIME = (1 << 61) - 1
+_minhash_rng = random.Random(1337)
+MINHASH_PARAMS = [(_minhash_rng.randrange(1, MINHASH_PRIME), _minhash_rng.randrange(MINHASH_PRIME))
+                  for _ in range(64)]
+LSH_BANDS, LSH_ROWS = 32, 2
+
+
+def minhash(shingle_set: set) -> list[int]:
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big")
+              for s in shingle_set] or [0]
+    return [min((a * h + b) % MINHASH_PRIME for h in hashes) for a, b in MINHASH_PARAMS]
+
+
+def lsh_candidates(signatures: dict) -> set[tuple[str, str]]:
+    """Pairs of names whose signatures collide in at least one band."""
+    pairs = set()
+    for band in range(LSH_BANDS):
+        buckets = {}
+        for name, sig in signatures.items():
+            key = tuple(sig[band * LSH_ROWS:(band + 1) * LSH_ROWS])
+            buckets.setdefault(key, []).append(name)
+        for names in buckets.values():
+            for i, first in enumerate(names):
+                for second in names[i + 1:]:
+                    pairs.add(tuple(sorted((first, second))))
+    return pairs
+
+
 class DreamConsolidator:
     """
     Auto-consolidation of memories between sessions ("Dream").
@@ -194,12 +571,19 @@ class DreamConsolidator:
     This is an optional later-stage feature. Its job is to prevent the memory
     store from growing into a noisy pile by merging, deduplicating, and
     pruning entries over time.
+
+    Near-duplicates are found locally (MinHash + LSH over word shingles) and
+    merged without a model call; only pairs in the ambiguous overlap band
+    are shown to the LLM. Nothing is deleted: retired entries are archived.
     """
 
     COOLDOWN_SECONDS = 86400       # 24 hours between consolidations
     SCAN_THROTTLE_SECONDS = 600    # 10 minutes between scan attempts
     MIN_SESSION_COUNT = 5          # need enough data to consolidate
     LOCK_STALE_SECONDS = 3600      # PID lock considered stale after 1 hour
+    DUPLICATE_JACCARD = 0.7        # at or above: merge without asking
+    OVERLAP_JACCARD = 0.3          # between this and DUPLICATE: ask the LLM
+    STALE_SECONDS = 180 * 86400    # project facts untouched this long are archived
 
     PHASES = [
         "Orient: scan MEMORY.md index for structure and categories",
@@ -211,19 +595,42 @@ class DreamConsolidator:
     def __init__(self, memory_dir: Path = None):
         self.memory_dir = memory_dir or MEMORY_DIR
         self.lock_file = self.memory_dir / ".dream_lock"
+        self.state_file = self.memory_dir / ".dream_state.json"
         self.enabled = True
         self.mode = "default"
         self.last_consolidation_time = 0.0
         self.last_scan_time = 0.0
         self.session_count = 0
+        self.llm = self._ask_model  # prompt -> reply text; replaceable in tests
+        self._load_state()
+
+    def _load_state(self):
+        """Gate counters live on disk, so cooldown and session count span sessions."""
+        try:
+            state = json.loads(self.state_file.read_text())
+        except (OSError, json.JSONDecodeError):
+            return
+        self.last_consolidation_time = state.get("last_consolidation_time", 0.0)
+        self.last_scan_time = state.get("last_scan_time", 0.0)
+        self.session_count = state.get("session_count", 0)
+
+    def _save_state(self):
+        self.memory_dir.mkdir(parents=True, exist_ok=True)
+        self.state_file.write_text(json.dumps({
+            "last_consolidation_time": self.last_consolidation_time,
+            "last_scan_time": self.last_scan_time,
+            "session_count": self.session_count,
+        }))
+
+    def record_session(self):
+        self.session_count += 1
+        self._save_state()
 
     def should_consolidate(self) -> tuple[bool, str]:
         """
         Check 7 gates in sequence. All must pass.
         Returns (can_run, reason) where reason explains the first failed gate.
         """
-        import time
-
         now = time.time()
 
         # Gate 1: enabled flag
@@ -236,7 +643,7 @@ class DreamConsolidator:
         memory_files = list(self.memory_dir.glob("*.md"))
         # Exclude MEMORY.md itself from the count
         memory_files = [f for f in memory_files if f.name != "MEMORY.md"]
-        if not memory_files:
+        if not memory_files and not (self.memory_dir / MEMORY_DB.name).exists():
             return False, "Gate 2: no memory files found"
 
         # Gate 3: not in plan mode (only consolidate in active modes)
@@ -265,40 +672,172 @@ class DreamConsolidator:
 
         return True, "All 7 gates passed"
 
-    def consolidate(self) -> list[str]:
-        """
-        Run the 4-phase consolidation process.
+    def start_background(self) -> threading.Thread:
+        """Run consolidate() off the main thread; the gates and PID lock still apply."""
+        thread = threading.Thread(target=self.consolidate, kwargs={"quiet": True},
+                                  daemon=True, name="dream")
+        thread.start()
+        return thread
 
-        The teaching version returns phase descriptions to make the flow
-        visible without requiring an extra LLM pass here.
+    def consolidate(self, manager: "MemoryManager" = None, quiet: bool = False) -> list[str]:
         """
-        import time
+        Run the 4-phase consolidation process. Returns one summary per phase.
 
+        Works on its own MemoryManager (its own SQLite connection), so the
+        session's manager picks the result up through refresh_if_changed().
+        quiet skips the gate-failure message; the background run at startup
+        only prints when a consolidation actually happens.
+        """
         can_run, reason = self.should_consolidate()
         if not can_run:
-            print(f"[Dream] Cannot consolidate: {reason}")
+            if not quiet:
+                print(f"[Dream] Cannot consolidate: {reason}")
             return []
 
         print("[Dream] Starting consolidation...")
         self.last_scan_time = time.time()
-
-        completed_phases = []
-        for i, phase in enumerate(self.PHASES, 1):
-            print(f"[Dream] Phase {i}/4: {phase}")
-            completed_phases.append(phase)
-
-        self.last_consolidation_time = time.time()
-        self._release_lock()
+        self._save_state()
+        try:
+            manager = manager or self._open_manager()
+            completed_phases = self._run_phases(manager)
+            self.last_consolidation_time = time.time()
+            self._save_state()
+        finally:
+            self._release_lock()
         print(f"[Dream] Consolidation complete: {len(completed_phases)} phases executed")
         return completed_phases
 
+    def _open_manager(self) -> "MemoryManager":
+        store = SQLiteMemoryStore(self.memory_dir / MEMORY_DB.name) if MEMORY_BACKEND == "sqlite" else None
+        manager = MemoryManager(self.memory_dir, store=store)
+        manager.load_all(quiet=True)
+        return manager
+
+    def _run_phases(self, manager: "MemoryManager") -> list[str]:
+        # Phase 1 -- Orient: what is in the store, by type
+        by_type = {}
+        for mem in manager.memories.values():
+            by_type[mem["type"]] = by_type.get(mem["type"], 0) + 1
+        phases = [f"Orient: {len(manager.memories)} memories {by_type}"]
+        print(f"[Dream] Phase 1/4: {phases[-1]}")
+
+        # Phase 2 -- Gather: shingle, sign, and bucket every memory
+        sets = {name: shingles(f"{mem['description']} {mem['content']}")
+                for name, mem in manager.memories.items()}
+        signatures = {name: minhash(shingle_set) for name, shingle_set in sets.items()}
+        duplicates, ambiguous = [], []
+        for first, second in sorted(lsh_candidates(signatures)):
+            if manager.memories[first]["type"] != manager.memories[second]["type"]:
+                continue
+            similarity = jaccard(sets[first], sets[second])
+            if similarity >= self.DUPLICATE_JACCARD:
+                duplicates.append((first, second))
+            elif similarity >= self.OVERLAP_JACCARD:
+                ambiguous.append((first, second))
+        phases.append(f"Gather: {len(duplicates)} duplicate and {len(ambiguous)} overlapping pairs")
+        print(f"[Dream] Phase 2/4: {phases[-1]}")
+
+        # Phase 3 -- Consolidate: merge duplicate clusters, ask about overlaps
+        merged = 0
+        for cluster in self._clusters(duplicates):
+            merged += self._merge(manager, cluster)
+        asked = 0
+        for first, second in ambiguous:
+            if first in manager.memories and second in manager.memories:
+                asked += 1
+                merged += self._merge_with_llm(manager, first, second)
+        phases.append(f"Consolidate: archived {merged} merged memories ({asked} pairs asked)")
+        print(f"[Dream] Phase 3/4: {phases[-1]}")
+
+        # Phase 4 -- Prune: stale project facts, then the index line cap
+        now = time.time()
+        stale = [name for name, mem in manager.memories.items()
+                 if mem["type"] == "project" and now - (mem.get("updated_at") or now) > self.STALE_SECONDS]
+        for name in stale:
+            manager.archive_memory(name)
+        capacity = MAX_INDEX_LINES - 2  # MEMORY.md header lines; _rebuild_index fits this many
+        overflow = sorted((mem.get("updated_at") or 0, name) for name, mem in manager.memories.items()
+                          if mem["type"] != "user")[:max(0, len(manager.memories) - capacity)]
+        for _, name in overflow:
+            manager.archive_memory(name)
+        if not manager.store:
+            manager._rebuild_index()
+        phases.append(f"Prune: archived {len(stale)} stale and {len(overflow)} over the "
+                      f"{MAX_INDEX_LINES}-line index")
+        print(f"[Dream] Phase 4/4: {phases[-1]}")
+        return phases
+
+    @staticmethod
+    def _clusters(pairs: list) -> list[list[str]]:
+        """Connected components of the duplicate graph (union-find)."""
+        parent = {}
+
+        def find(x):
+            parent.setdefault(x, x)
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for first, second in pairs:
+            parent[find(first)] = find(second)
+        groups = {}
+        for name in parent:
+            groups.setdefault(find(name), []).append(name)
+        return [sorted(group) for group in groups.values()]
+
+    @staticmethod
+    def _merge(manager: "MemoryManager", names: list) -> int:
+        """Keep the newest memory, append lines only the others had, archive the rest."""
+        names = sorted(names, key=lambda n: manager.memories[n].get("updated_at") or 0, reverse=True)
+        keep = manager.memories[names[0]]
+        lines = keep["content"].splitlines()
+        seen = {" ".join(tokenize(line)) for line in lines}
+        for name in names[1:]:
+            for line in manager.memories[name]["content"].splitlines():
+                key = " ".join(tokenize(line))
+                if key and key not in seen:
+                    seen.add(key)
+                    lines.append(line)
+        for name in names[1:]:
+            manager.archive_memory(name)
+        manager.save_memory(names[0], keep["description"], keep["type"], "\n".join(lines))
+        return len(names) - 1
+
+    def _merge_with_llm(self, manager: "MemoryManager", first: str, second: str) -> int:
+        a, b = manager.memories[first], manager.memories[second]
+        prompt = (
+            "Two saved memories overlap. If they record the same fact, merge them; "
+            "otherwise keep both. Reply with JSON only: "
+            '{"merge": true, "description": "...", "content": "..."} or {"merge": false}.\n\n'
+            f"A ({first}): {a['description']}\n{a['content']}\n\n"
+            f"B ({second}): {b['description']}\n{b['content']}"
+        )
+        try:
+            reply = json.loads(self.llm(prompt))
+        except Exception as e:
+            print(f"[Dream] Kept {first} and {second}: {e}")
+            return 0
+        if not reply.get("merge"):
+            return 0
+        keep, drop = (first, second) if (a.get("updated_at") or 0) >= (b.get("updated_at") or 0) else (second, first)
+        manager.archive_memory(drop)
+        manager.save_memory(keep, reply.get("description") or manager.memories[keep]["description"],
+                            manager.memories[keep]["type"], reply.get("content") or manager.memories[keep]["content"])
+        return 1
+
+    @staticmethod
+    def _ask_model(prompt: str) -> str:
+        response = client.messages.create(
+            model=MODEL, messages=[{"role": "user", "content": prompt}], max_tokens=1000)
+        text = response.content[0].text.strip()
+        return text[text.find("{"):text.rfind("}") + 1]
+
     def _acquire_lock(self) -> bool:
         """
         Acquire a PID-based lock file. Returns False if locked by another
         live process. Stale locks (older than LOCK_STALE_SECONDS) are removed.
         """
-        import time
-
         if self.lock_file.exists():
             try:
                 lock_data = self.lock_file.read_text().strip()
@@ -396,7 +935,7 @@ def run_edit(path: str, old_text: str, new_text: str) -> str:
 
 
 # Global memory manager
-memory_mgr = MemoryManager()
+memory_mgr = MemoryManager(store=SQLiteMemoryStore(MEMORY_DB) if MEMORY_BACKEND == "sqlite" else None)
 
 
 def run_save_memory(name: str, description: str, mem_type: str, content: str) -> str:
@@ -409,6 +948,7 @@ TOOL_HANDLERS = {
     "write_file":   lambda **kw: run_write(kw["path"], kw["content"]),
     "edit_file":    lambda **kw: run_edit(kw["path"], kw["old_text"], kw["new_text"]),
     "save_memory":  lambda **kw: run_save_memory(kw["name"], kw["description"], kw["type"], kw["content"]),
+    "search_memory": lambda **kw: memory_mgr.search(kw["query"]),
 }
 
 TOOLS = [
@@ -428,6 +968,8 @@ TOOLS = [
                   "description": "user=preferences, feedback=corrections, project=non-obvious project conventions or decision reasons, reference=external resource pointers"},
          "content": {"type": "string", "description": "Full memory content (multi-line OK)"},
      }, "required": ["name", "description", "type", "content"]}},
+    {"name": "search_memory", "description": "Search saved memories and return the best matches in full.",
+     "input_schema": {"type": "object", "properties": {"query": {"type": "string"}}, "required": ["query"]}},
 ]
 
 MEMORY_GUIDANCE = """
@@ -447,12 +989,21 @@ When NOT to save:
 """
 
 
-def build_system_prompt() -> str:
+def latest_user_text(messages: list) -> str:
+    """The most recent typed user request, used as the memory recall query."""
+    for message in reversed(messages):
+        if message["role"] == "user" and isinstance(message["content"], str):
+            return message["content"]
+    return ""
+
+
+def build_system_prompt(query: str = "") -> str:
     """Assemble system prompt with memory content included."""
     parts = [f"You are a coding agent at {WORKDIR}. Use tools to solve tasks."]
 
     # Inject memory content if available
-    memory_section = memory_mgr.load_memory_prompt()
+    memory_mgr.refresh_if_changed()
+    memory_section = memory_mgr.load_memory_prompt(query)
     if memory_section:
         parts.append(memory_section)
 
@@ -468,7 +1019,7 @@ def agent_loop(messages: list):
     are visible in the next LLM turn within the same session.
     """
     while True:
-        system = build_system_prompt()
+        system = build_system_prompt(latest_user_text(messages))
         response = client.messages.create(
             model=MODEL, system=system, messages=messages,
             tools=TOOLS, max_tokens=8000,
@@ -506,6 +1057,13 @@ if __name__ == "__main__":
     else:
         print("[No existing memories. The agent can create them with save_memory.]")
 
+    # Count this session, then let Dream tidy the store off the main thread
+    # if its gates pass. It writes through its own manager; this session
+    # picks the result up on the next refresh_if_changed().
+    dream = DreamConsolidator()
+    dream.record_session()
+    dream.start_background()
+
     history = []
     while True:
         try:
@@ -515,6 +1073,16 @@ if __name__ == "__main__":
         if query.strip().lower() in ("q", "exit", ""):
             break
 
+        # /memories import|export moves memories between SQLite and Markdown
+        if query.strip() in ("/memories import", "/memories export"):
+            if not memory_mgr.store:
+                print("  (set MEMORY_BACKEND=sqlite to use import/export)")
+            elif query.strip().endswith("import"):
+                print(f"  imported {memory_mgr.import_markdown()} memories")
+            else:
+                print(f"  exported {memory_mgr.export_markdown()} memories")
+            continue
+
         # /memories command to list current memories
         if query.strip() == "/memories":
             if memory_mgr.memories:
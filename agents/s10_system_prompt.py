@@ -16,7 +16,11 @@ Teaching pipeline:
   6. dynamic context
 
 The builder keeps stable information separate from information that changes
-often. A simple DYNAMIC_BOUNDARY marker makes that split visible.
+often. A simple DYNAMIC_BOUNDARY marker makes that split visible: sections
+1, 2, 3 and 5 form the static prefix, and the query-dependent memory recall
+sits after the boundary with the dynamic context, so the prefix stays
+byte-identical from turn to turn and the provider-side prompt cache hits.
+Each static section is memoized with its own invalidation key.
 
 Per-turn reminders are even more dynamic. They are better injected as a
 separate user-role system reminder than mixed blindly into the stable prompt.
@@ -26,10 +30,13 @@ big string."
 """
 
 import datetime
+import hashlib
 import json
+import math
 import os
 import re
 import subprocess
+import time
 from pathlib import Path
 
 from anthropic import Anthropic
@@ -45,6 +52,108 @@ client = Anthropic(base_url=os.getenv("ANTHROPIC_BASE_URL"))
 MODEL = os.environ["MODEL_ID"]
 
 DYNAMIC_BOUNDARY = "=== DYNAMIC_BOUNDARY ==="
+MEMORY_TOP_K = 8
+MEMORY_TOKEN_BUDGET = 2000  # memory tokens injected into the prompt per turn
+BM25_K1, BM25_B = 1.2, 0.75
+MEMORY_RESCAN_SECONDS = 5  # in-place edits do not touch the dir mtime; rescan this often
+
+
+def file_signature(path: Path) -> tuple | None:
+    """(mtime_ns, size) of a file, or None if it does not exist."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class ClaudeMdCache:
+    """
+    CLAUDE.md discovery: every file from the repo root down to a directory.
+
+    Per directory it remembers the file's (mtime_ns, size) and a content
+    digest, so a repeat lookup is one stat per level and nothing is re-read
+    until a file changes. Texts are stored by digest, which lets s18
+    worktrees (separate directories, same checked-out CLAUDE.md) share one
+    entry. One cache per process, shared by every builder.
+    """
+
+    def __init__(self):
+        self._files = {}  # directory -> ((mtime_ns, size), digest)
+        self._texts = {}  # digest -> file text
+        self._roots = {}  # start directory -> repo root
+
+    def repo_root(self, start: Path) -> Path | None:
+        """Nearest ancestor holding .git (a directory, or a file in worktrees)."""
+        if start not in self._roots:
+            self._roots[start] = next((d for d in (start, *start.parents) if (d / ".git").exists()), None)
+        return self._roots[start]
+
+    def chain(self, start: Path, stop: Path = None) -> list[Path]:
+        """Directories from the repo root (or `stop`) down to `start`."""
+        root = self.repo_root(start) or stop
+        if root is None or not start.is_relative_to(root):
+            root = start
+        return [d for d in reversed((start, *start.parents)) if d.is_relative_to(root)]
+
+    def digest(self, directory: Path) -> str | None:
+        """Digest of directory/CLAUDE.md, or None if there is none."""
+        path = directory / "CLAUDE.md"
+        signature = file_signature(path)
+        cached = self._files.get(directory)
+        if cached and cached[0] == signature:
+            return cached[1]
+        digest = None
+        if signature:
+            try:
+                text = path.read_text()
+            except OSError:
+                text = None
+            if text is not None:
+                digest = hashlib.sha256(text.encode()).hexdigest()
+                self._texts.setdefault(digest, text)
+        self._files[directory] = (signature, digest)
+        return digest
+
+    def text(self, digest: str) -> str:
+        return self._texts[digest]
+
+
+CLAUDE_MD_CACHE = ClaudeMdCache()
+
+
+def tokenize(text: str) -> list[str]:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+class BM25Index:
+    """Inverted index over memory name (x3), description (x2) and body (x1)."""
+
+    def __init__(self, memories: list):
+        self.postings = {}
+        self.lengths = []
+        for i, mem in enumerate(memories):
+            counts = {}
+            for text, weight in ((mem["name"], 3), (mem["description"], 2), (mem["body"], 1)):
+                for term in tokenize(text):
+                    counts[term] = counts.get(term, 0) + weight
+            self.lengths.append(sum(counts.values()) or 1)
+            for term, count in counts.items():
+                self.postings.setdefault(term, {})[i] = count
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 1.0
+
+    def search(self, query: str) -> list[int]:
+        """Indexes of memories sharing a term with the query, best first."""
+        scores = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (len(self.lengths) - len(posting) + 0.5) / (len(posting) + 0.5))
+            for i, tf in posting.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[i] / self.avg_length)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return sorted(scores, key=lambda i: (-scores[i], i))
 
 
 class SystemPromptBuilder:
@@ -63,6 +172,22 @@ class SystemPromptBuilder:
         self.tools = tools or []
         self.skills_dir = self.workdir / "skills"
         self.memory_dir = self.workdir / ".memory"
+        # Memory catalog: file name -> ((mtime_ns, size), parsed memory or None)
+        self._memory_files = {}
+        self._memory_dir_mtime = None
+        self._memory_scanned_at = 0.0
+        self._memory_version = 0
+        self._memory_memo = (None, "")  # ((version, query), rendered section)
+        self._sections = {}  # section name -> (invalidation key, rendered text)
+
+    def _cached(self, name: str, key, render) -> str:
+        """Render a section only when its invalidation key has changed."""
+        cached = self._sections.get(name)
+        if cached and cached[0] == key:
+            return cached[1]
+        text = render()
+        self._sections[name] = (key, text)
+        return text
 
     # -- Section 1: Core instructions --
     def _build_core(self) -> str:
@@ -74,6 +199,10 @@ class SystemPromptBuilder:
 
     # -- Section 2: Tool listings --
     def _build_tool_listing(self) -> str:
+        key = hashlib.sha256(json.dumps(self.tools, sort_keys=True, default=str).encode()).hexdigest()
+        return self._cached("tools", key, self._render_tool_listing)
+
+    def _render_tool_listing(self) -> str:
         if not self.tools:
             return ""
         lines = ["# Available tools"]
@@ -84,15 +213,24 @@ class SystemPromptBuilder:
         return "\n".join(lines)
 
     # -- Section 3: Skill metadata (layer 1 from s05 concept) --
+    def _skill_files(self) -> tuple:
+        if not self.skills_dir.is_dir():
+            return ()
+        files = ((d.name, file_signature(d / "SKILL.md")) for d in sorted(self.skills_dir.iterdir()))
+        return tuple((name, sig) for name, sig in files if sig)
+
     def _build_skill_listing(self) -> str:
-        if not self.skills_dir.exists():
-            return ""
+        files = self._skill_files()
+        return self._cached("skills", files, lambda: self._render_skill_listing(files))
+
+    def _render_skill_listing(self, files: tuple) -> str:
         skills = []
-        for skill_dir in sorted(self.skills_dir.iterdir()):
-            skill_md = skill_dir / "SKILL.md"
-            if not skill_md.exists():
+        for dir_name, _ in files:
+            skill_dir = self.skills_dir / dir_name
+            try:
+                text = (skill_dir / "SKILL.md").read_text()
+            except OSError:
                 continue
-            text = skill_md.read_text()
             # Parse frontmatter for name + description
             match = re.match(r"^---\s*\n(.*?)\n---", text, re.DOTALL)
             if not match:
@@ -110,65 +248,134 @@ class SystemPromptBuilder:
         return "# Available skills\n" + "\n".join(skills)
 
     # -- Section 4: Memory content --
-    def _build_memory_section(self) -> str:
-        if not self.memory_dir.exists():
-            return ""
-        memories = []
-        for md_file in sorted(self.memory_dir.glob("*.md")):
-            if md_file.name == "MEMORY.md":
-                continue
-            text = md_file.read_text()
-            match = re.match(r"^---\s*\n(.*?)\n---\s*\n(.*)", text, re.DOTALL)
-            if not match:
-                continue
-            header, body = match.group(1), match.group(2).strip()
-            meta = {}
-            for line in header.splitlines():
-                if ":" in line:
-                    k, _, v = line.partition(":")
-                    meta[k.strip()] = v.strip()
-            name = meta.get("name", md_file.stem)
-            mem_type = meta.get("type", "project")
-            desc = meta.get("description", "")
-            memories.append(f"[{mem_type}] {name}: {desc}\n{body}")
+    def _build_memory_section(self, query: str = "") -> str:
+        """
+        Relevant memories in full, the rest as one line of file names.
+
+        Small stores are injected whole; past MEMORY_TOP_K entries or
+        MEMORY_TOKEN_BUDGET tokens, BM25 over the query picks what to inject.
+        """
+        self._refresh_memories()
+        key = (self._memory_version, query)
+        if self._memory_memo[0] == key:
+            return self._memory_memo[1]
+        memories = [mem for _, (_, mem) in sorted(self._memory_files.items()) if mem]
         if not memories:
+            self._memory_memo = (key, "")
             return ""
-        return "# Memories (persistent)\n\n" + "\n\n".join(memories)
+        rendered = [f"[{m['type']}] {m['name']}: {m['description']}\n{m['body']}" for m in memories]
+        costs = [len(text) // 4 + 8 for text in rendered]
+        if len(memories) <= MEMORY_TOP_K and sum(costs) <= MEMORY_TOKEN_BUDGET:
+            selected = set(range(len(memories)))
+        else:
+            selected, used = set(), 0
+            for i in BM25Index(memories).search(query):
+                if len(selected) >= MEMORY_TOP_K:
+                    break
+                if used + costs[i] <= MEMORY_TOKEN_BUDGET:
+                    selected.add(i)
+                    used += costs[i]
+        parts = [rendered[i] for i in sorted(selected)]
+        rest = [m["file"] for i, m in enumerate(memories) if i not in selected]
+        if rest:
+            parts.append(f"Other memories in {self.memory_dir.name}/ (read one if it looks relevant): "
+                         + ", ".join(rest))
+        self._memory_memo = (key, "# Memories (persistent)\n\n" + "\n\n".join(parts))
+        return self._memory_memo[1]
+
+    def _refresh_memories(self):
+        """
+        Keep the memory catalog current without a per-build directory scan.
+
+        One stat of the directory per build; files are only listed again when
+        its mtime moves (create, delete, rename-on-save) or every
+        MEMORY_RESCAN_SECONDS, and only files whose (mtime, size) changed
+        are re-read and parsed.
+        """
+        try:
+            dir_mtime = self.memory_dir.stat().st_mtime_ns
+        except FileNotFoundError:
+            dir_mtime = None
+        now = time.monotonic()
+        if dir_mtime == self._memory_dir_mtime and now - self._memory_scanned_at < MEMORY_RESCAN_SECONDS:
+            return
+        self._memory_dir_mtime, self._memory_scanned_at = dir_mtime, now
+        files = {}
+        if dir_mtime is not None:
+            with os.scandir(self.memory_dir) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(".md") or entry.name == "MEMORY.md":
+                        continue
+                    st = entry.stat()
+                    signature = (st.st_mtime_ns, st.st_size)
+                    cached = self._memory_files.get(entry.name)
+                    if cached and cached[0] == signature:
+                        files[entry.name] = cached
+                    else:
+                        files[entry.name] = (signature, self._parse_memory(Path(entry.path)))
+        if files != self._memory_files:
+            self._memory_files = files
+            self._memory_version += 1
+
+    @staticmethod
+    def _parse_memory(md_file: Path) -> dict | None:
+        match = re.match(r"^---\s*\n(.*?)\n---\s*\n(.*)", md_file.read_text(), re.DOTALL)
+        if not match:
+            return None
+        header, body = match.group(1), match.group(2).strip()
+        meta = {}
+        for line in header.splitlines():
+            if ":" in line:
+                k, _, v = line.partition(":")
+                meta[k.strip()] = v.strip()
+        return {
+            "name": meta.get("name", md_file.stem),
+            "type": meta.get("type", "project"),
+            "description": meta.get("description", ""),
+            "body": body,
+            "file": md_file.name,
+        }
 
     # -- Section 5: CLAUDE.md chain --
-    def _build_claude_md(self) -> str:
+    def _claude_md_sources(self) -> list[tuple[str, str]]:
         """
-        Load CLAUDE.md files in priority order (all are included):
+        CLAUDE.md files in priority order (all are included), as (label, digest):
         1. ~/.claude/CLAUDE.md (user-global instructions)
-        2. <project-root>/CLAUDE.md (project instructions)
-        3. <current-subdir>/CLAUDE.md (directory-specific instructions)
+        2. <repo-root>/CLAUDE.md (project instructions)
+        3. every CLAUDE.md below it, down to the current directory
+
+        The walk starts at cwd when it is inside the workdir, else at the
+        workdir, and stops at the repo root (or the workdir outside git).
         """
         sources = []
-
-        # User-global
-        user_claude = Path.home() / ".claude" / "CLAUDE.md"
-        if user_claude.exists():
-            sources.append(("user global (~/.claude/CLAUDE.md)", user_claude.read_text()))
-
-        # Project root
-        project_claude = self.workdir / "CLAUDE.md"
-        if project_claude.exists():
-            sources.append(("project root (CLAUDE.md)", project_claude.read_text()))
-
-        # Subdirectory -- in real CC, this walks from cwd up to project root
-        # Teaching: check cwd if different from workdir
+        user_global = CLAUDE_MD_CACHE.digest(Path.home() / ".claude")
+        if user_global:
+            sources.append(("user global (~/.claude/CLAUDE.md)", user_global))
         cwd = Path.cwd()
-        if cwd != self.workdir:
-            subdir_claude = cwd / "CLAUDE.md"
-            if subdir_claude.exists():
-                sources.append((f"subdir ({cwd.name}/CLAUDE.md)", subdir_claude.read_text()))
+        start = cwd if cwd.is_relative_to(self.workdir) else self.workdir
+        chain = CLAUDE_MD_CACHE.chain(start, stop=self.workdir)
+        for directory in chain:
+            digest = CLAUDE_MD_CACHE.digest(directory)
+            if not digest:
+                continue
+            if directory == chain[0]:
+                sources.append(("project root (CLAUDE.md)", digest))
+            else:
+                sources.append((f"subdir ({directory.relative_to(chain[0])}/CLAUDE.md)", digest))
+        return sources
 
+    def _build_claude_md(self) -> str:
+        sources = tuple(self._claude_md_sources())
+        return self._cached("claude_md", sources, lambda: self._render_claude_md(sources))
+
+    @staticmethod
+    def _render_claude_md(sources: tuple) -> str:
         if not sources:
             return ""
         parts = ["# CLAUDE.md instructions"]
-        for label, content in sources:
+        for label, digest in sources:
             parts.append(f"## From {label}")
-            parts.append(content.strip())
+            parts.append(CLAUDE_MD_CACHE.text(digest).strip())
         return "\n\n".join(parts)
 
     # -- Section 6: Dynamic context --
@@ -182,43 +389,44 @@ class SystemPromptBuilder:
         return "# Dynamic context\n" + "\n".join(lines)
 
     # -- Assemble all sections --
-    def build(self) -> str:
+    def build_static(self) -> str:
         """
-        Assemble the full system prompt from all sections.
+        The cacheable prefix: core, tools, skills and CLAUDE.md.
 
-        Static sections (1-5) are separated from dynamic (6) by
-        the DYNAMIC_BOUNDARY marker. In real CC, the static prefix
-        is cached across turns to save prompt tokens.
+        Every section is memoized against its own key (tool list hash, file
+        set plus mtimes, CLAUDE.md digests), so a turn that changed nothing re-reads nothing
+        and returns the same string, byte for byte.
         """
-        sections = []
-
-        core = self._build_core()
-        if core:
-            sections.append(core)
-
-        tools = self._build_tool_listing()
-        if tools:
-            sections.append(tools)
-
-        skills = self._build_skill_listing()
-        if skills:
-            sections.append(skills)
+        sections = [
+            self._cached("core", str(self.workdir), self._build_core),
+            self._build_tool_listing(),
+            self._build_skill_listing(),
+            self._build_claude_md(),
+        ]
+        return "\n\n".join(section for section in sections if section)
 
-        memory = self._build_memory_section()
-        if memory:
-            sections.append(memory)
+    def build(self, query: str = "") -> str:
+        """
+        Assemble the full system prompt from all sections.
 
-        claude_md = self._build_claude_md()
-        if claude_md:
-            sections.append(claude_md)
+        `query` is the current user request; it selects which memories
+        are recalled into the memory section.
 
-        # Static/dynamic boundary
-        sections.append(DYNAMIC_BOUNDARY)
+        The static prefix is separated from the per-turn part (memory
+        recall and dynamic context) by the DYNAMIC_BOUNDARY marker. In real
+        CC, the static prefix is cached across turns to save prompt tokens,
+        which only works while it stays byte-identical.
+        """
+        sections = [self.build_static(), DYNAMIC_BOUNDARY]
 
         dynamic = self._build_dynamic_context()
         if dynamic:
             sections.append(dynamic)
 
+        memory = self._build_memory_section(query)
+        if memory:
+            sections.append(memory)
+
         return "\n\n".join(sections)
 
 
@@ -313,6 +521,14 @@ TOOLS = [
 prompt_builder = SystemPromptBuilder(workdir=WORKDIR, tools=TOOLS)
 
 
+def latest_user_text(messages: list) -> str:
+    """The most recent typed user request, used as the memory recall query."""
+    for message in reversed(messages):
+        if message["role"] == "user" and isinstance(message["content"], str):
+            return message["content"]
+    return ""
+
+
 def agent_loop(messages: list):
     """
     Agent loop with assembled system prompt.
@@ -321,7 +537,7 @@ def agent_loop(messages: list):
     prefix is cached and only the dynamic suffix changes per turn.
     """
     while True:
-        system = prompt_builder.build()
+        system = prompt_builder.build(latest_user_text(messages))
         response = client.messages.create(
             model=MODEL, system=system, messages=messages,
             tools=TOOLS, max_tokens=8000,
@@ -24,10 +24,15 @@ drains a notification queue and hands finished results back to the model.
 
 Background tasks here are runtime execution slots, not the durable task-board
 records introduced in s12.
+
+Every command runs in its own process group. A timeout or cancel kills the
+whole group, so servers and watchers started by the command do not leak.
 """
 
+import atexit
 import os
 import json
+import signal
 import subprocess
 import threading
 import time
@@ -53,6 +58,42 @@ SYSTEM = f"You are a coding agent at {WORKDIR}. Use background_run for long-runn
 STALL_THRESHOLD_S = 45  # seconds before a task is considered stalled
 
 
+def kill_process_group(proc: subprocess.Popen):
+    """Kill the command and everything it started (same process group)."""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGKILL)
+        elif proc.poll() is None:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def run_command(command: str, cwd: Path, timeout: int, on_start=None) -> tuple[str, bool]:
+    """
+    Run a shell command in a new session. Returns (output, timed_out).
+
+    subprocess.run(timeout=...) only kills the shell; grandchildren keep the
+    pipe and their ports. Here the group is killed on timeout and again once
+    the shell exits, and communicate() reaps the shell either way.
+    """
+    proc = subprocess.Popen(
+        command, shell=True, cwd=cwd, text=True, start_new_session=True,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+    )
+    if on_start:
+        on_start(proc)
+    try:
+        output, _ = proc.communicate(timeout=timeout)
+        timed_out = False
+    except subprocess.TimeoutExpired:
+        kill_process_group(proc)
+        output, _ = proc.communicate()
+        timed_out = True
+    kill_process_group(proc)
+    return output or "", timed_out
+
+
 class NotificationQueue:
     """
     Priority-based notification queue with same-key folding.
@@ -89,8 +130,10 @@ class BackgroundManager:
     def __init__(self):
         self.dir = RUNTIME_DIR
         self.tasks = {}  # task_id -> {status, result, command, started_at}
+        self._procs = {}  # task_id -> Popen while the task is running
         self._notification_queue = []  # completed task results
         self._lock = threading.Lock()
+        atexit.register(self.cancel_all)
 
     def _record_path(self, task_id: str) -> Path:
         return self.dir / f"{task_id}.json"
@@ -135,18 +178,20 @@ class BackgroundManager:
     def _execute(self, task_id: str, command: str):
         """Thread target: run subprocess, capture output, push to queue."""
         try:
-            r = subprocess.run(
-                command, shell=True, cwd=WORKDIR,
-                capture_output=True, text=True, timeout=300
+            output, timed_out = run_command(
+                command, WORKDIR, timeout=300,
+                on_start=lambda proc: self._procs.__setitem__(task_id, proc),
             )
-            output = (r.stdout + r.stderr).strip()[:50000]
-            status = "completed"
-        except subprocess.TimeoutExpired:
-            output = "Error: Timeout (300s)"
-            status = "timeout"
+            output = output.strip()[:50000]
+            status = "timeout" if timed_out else "completed"
+            if timed_out:
+                output = f"Error: Timeout (300s)\n{output}".strip()
         except Exception as e:
             output = f"Error: {e}"
             status = "error"
+        self._procs.pop(task_id, None)
+        if self.tasks[task_id]["status"] == "cancelled":
+            status = "cancelled"
         final_output = output or "(no output)"
         preview = self._preview(final_output)
         output_path = self._output_path(task_id)
@@ -187,6 +232,20 @@ class BackgroundManager:
             )
         return "\n".join(lines) if lines else "No background tasks."
 
+    def cancel(self, task_id: str) -> str:
+        """Kill a running task's whole process tree."""
+        proc = self._procs.get(task_id)
+        if proc is None:
+            t = self.tasks.get(task_id)
+            return f"Error: Unknown task {task_id}" if not t else f"Task {task_id} is {t['status']}"
+        self.tasks[task_id]["status"] = "cancelled"
+        kill_process_group(proc)
+        return f"Cancelled background task {task_id}"
+
+    def cancel_all(self):
+        for task_id in list(self._procs):
+            self.cancel(task_id)
+
     def drain_notifications(self) -> list:
         """Return and clear all pending completion notifications."""
         with self._lock:
@@ -223,13 +282,11 @@ def run_bash(command: str) -> str:
     dangerous = ["rm -rf /", "sudo", "shutdown", "reboot", "> /dev/"]
     if any(d in command for d in dangerous):
         return "Error: Dangerous command blocked"
-    try:
-        r = subprocess.run(command, shell=True, cwd=WORKDIR,
-                           capture_output=True, text=True, timeout=120)
-        out = (r.stdout + r.stderr).strip()
-        return out[:50000] if out else "(no output)"
-    except subprocess.TimeoutExpired:
+    out, timed_out = run_command(command, WORKDIR, timeout=120)
+    if timed_out:
         return "Error: Timeout (120s)"
+    out = out.strip()
+    return out[:50000] if out else "(no output)"
 
 def run_read(path: str, limit: int = None) -> str:
     try:
@@ -268,6 +325,7 @@ TOOL_HANDLERS = {
     "edit_file":        lambda **kw: run_edit(kw["path"], kw["old_text"], kw["new_text"]),
     "background_run":   lambda **kw: BG.run(kw["command"]),
     "check_background": lambda **kw: BG.check(kw.get("task_id")),
+    "cancel_background": lambda **kw: BG.cancel(kw["task_id"]),
 }
 
 TOOLS = [
@@ -283,6 +341,8 @@ TOOLS = [
      "input_schema": {"type": "object", "properties": {"command": {"type": "string"}}, "required": ["command"]}},
     {"name": "check_background", "description": "Check background task status. Omit task_id to list all.",
      "input_schema": {"type": "object", "properties": {"task_id": {"type": "string"}}}},
+    {"name": "cancel_background", "description": "Stop a running background task and everything it started.",
+     "input_schema": {"type": "object", "properties": {"task_id": {"type": "string"}}, "required": ["task_id"]}},
 ]
 
 
@@ -63,6 +63,7 @@ Autonomous claiming, task selection, and worktree assignment stay in later chapt
 
 import json
 import os
+import signal
 import subprocess
 import threading
 import time
@@ -334,7 +335,7 @@ class TeammateManager:
             {"name": "edit_file", "description": "Replace exact text in file.",
              "input_schema": {"type": "object", "properties": {"path": {"type": "string"}, "old_text": {"type": "string"}, "new_text": {"type": "string"}}, "required": ["path", "old_text", "new_text"]}},
             {"name": "send_message", "description": "Send message to a teammate.",
-             "input_schema": {"type": "object", "properties": {"to": {"type": "string"}, "content": {"type": "string"}, "msg_type": {"type": "string", "enum": list(VALID_MSG_TYPES)}}, "required": ["to", "content"]}},
+             "input_schema": {"type": "object", "properties": {"to": {"type": "string"}, "content": {"type": "string"}, "msg_type": {"type": "string", "enum": sorted(VALID_MSG_TYPES)}}, "required": ["to", "content"]}},
             {"name": "read_inbox", "description": "Read and drain your inbox.",
              "input_schema": {"type": "object", "properties": {}}},
             {"name": "shutdown_response", "description": "Respond to a shutdown request. Approve to shut down, reject to keep working.",
@@ -366,19 +367,48 @@ def _safe_path(p: str) -> Path:
     return path
 
 
+def kill_process_group(proc: subprocess.Popen):
+    """Kill the command and everything it started (same process group)."""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGKILL)
+        elif proc.poll() is None:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def run_command(command: str, cwd: Path, timeout: int) -> tuple[str, bool]:
+    """
+    Run a shell command in a new session. Returns (output, timed_out).
+
+    A timeout kills the whole group, so a command a teammate abandoned
+    mid-protocol does not keep running behind the next request.
+    """
+    proc = subprocess.Popen(
+        command, shell=True, cwd=cwd, text=True, start_new_session=True,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+    )
+    try:
+        output, _ = proc.communicate(timeout=timeout)
+        timed_out = False
+    except subprocess.TimeoutExpired:
+        kill_process_group(proc)
+        output, _ = proc.communicate()
+        timed_out = True
+    kill_process_group(proc)
+    return output or "", timed_out
+
+
 def _run_bash(command: str) -> str:
     dangerous = ["rm -rf /", "sudo", "shutdown", "reboot"]
     if any(d in command for d in dangerous):
         return "Error: Dangerous command blocked"
-    try:
-        r = subprocess.run(
-            command, shell=True, cwd=WORKDIR,
-            capture_output=True, text=True, timeout=120,
-        )
-        out = (r.stdout + r.stderr).strip()
-        return out[:50000] if out else "(no output)"
-    except subprocess.TimeoutExpired:
+    out, timed_out = run_command(command, WORKDIR, timeout=120)
+    if timed_out:
         return "Error: Timeout (120s)"
+    out = out.strip()
+    return out[:50000] if out else "(no output)"
 
 
 def _run_read(path: str, limit: int = None) -> str:
@@ -485,7 +515,7 @@ TOOLS = [
     {"name": "list_teammates", "description": "List all teammates.",
      "input_schema": {"type": "object", "properties": {}}},
     {"name": "send_message", "description": "Send a message to a teammate.",
-     "input_schema": {"type": "object", "properties": {"to": {"type": "string"}, "content": {"type": "string"}, "msg_type": {"type": "string", "enum": list(VALID_MSG_TYPES)}}, "required": ["to", "content"]}},
+     "input_schema": {"type": "object", "properties": {"to": {"type": "string"}, "content": {"type": "string"}, "msg_type": {"type": "string", "enum": sorted(VALID_MSG_TYPES)}}, "required": ["to", "content"]}},
     {"name": "read_inbox", "description": "Read and drain the lead's inbox.",
      "input_schema": {"type": "object", "properties": {}}},
     {"name": "broadcast", "description": "Send a message to all teammates.",
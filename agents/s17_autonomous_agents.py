@@ -41,6 +41,7 @@ returns a single summary.
 
 import json
 import os
+import signal
 import subprocess
 import threading
 import time
@@ -65,6 +66,8 @@ CLAIM_EVENTS_PATH = TASKS_DIR / "claim_events.jsonl"
 
 POLL_INTERVAL = 5
 IDLE_TIMEOUT = 60
+TEAMMATE_TOKEN_THRESHOLD = 60000
+KEEP_RECENT_TOOL_RESULTS = 3
 
 SYSTEM = f"You are a team lead at {WORKDIR}. Teammates are autonomous -- they find work themselves."
 
@@ -245,6 +248,45 @@ def ensure_identity_context(messages: list, name: str, role: str, team_name: str
     messages.insert(1, {"role": "assistant", "content": f"I am {name}. Continuing."})
 
 
+# -- Per-teammate compaction (s06 pipeline, run inside each teammate) --
+def estimate_tokens(messages: list) -> int:
+    return len(json.dumps(messages, default=str)) // 4
+
+
+def micro_compact(messages: list) -> int:
+    results = [
+        block
+        for message in messages
+        if message.get("role") == "user" and isinstance(message.get("content"), list)
+        for block in message["content"]
+        if isinstance(block, dict) and block.get("type") == "tool_result"
+    ]
+    compacted = 0
+    for block in results[:-KEEP_RECENT_TOOL_RESULTS]:
+        if isinstance(block.get("content"), str) and len(block["content"]) > 120:
+            block["content"] = "[Earlier tool result compacted. Re-run the tool if you need full detail.]"
+            compacted += 1
+    return compacted
+
+
+def compact_teammate_context(messages: list, name: str, role: str, team_name: str):
+    conversation = json.dumps(messages, default=str)[:80000]
+    response = client.messages.create(
+        model=MODEL,
+        messages=[{"role": "user", "content": (
+            f"Summarize the work of teammate '{name}' so it can continue: current task, "
+            f"findings, files touched, remaining steps.\n\n{conversation}")}],
+        max_tokens=2000,
+    )
+    messages[:] = [{"role": "user", "content": f"<summary>{response.content[0].text}</summary>"}]
+    ensure_identity_context(messages, name, role, team_name)
+
+
+def is_prompt_too_long(error: Exception) -> bool:
+    text = str(error).lower()
+    return "overlong_prompt" in text or ("prompt" in text and "long" in text)
+
+
 # -- Autonomous TeammateManager --
 class TeammateManager:
     def __init__(self, team_dir: Path):
@@ -253,6 +295,7 @@ class TeammateManager:
         self.config_path = self.dir / "config.json"
         self.config = self._load_config()
         self.threads = {}
+        self.context_stats = {}
 
     def _load_config(self) -> dict:
         if self.config_path.exists():
@@ -302,6 +345,7 @@ class TeammateManager:
         )
         messages = [{"role": "user", "content": prompt}]
         tools = self._teammate_tools()
+        stats = self.context_stats.setdefault(name, {"auto": 0, "micro": 0, "tokens": 0})
 
         while True:
             # -- WORK PHASE: standard agent loop --
@@ -312,15 +356,35 @@ class TeammateManager:
                         self._set_status(name, "shutdown")
                         return
                     messages.append({"role": "user", "content": json.dumps(msg)})
+                response = None
                 try:
-                    response = client.messages.create(
-                        model=MODEL,
-                        system=sys_prompt,
-                        messages=messages,
-                        tools=tools,
-                        max_tokens=8000,
-                    )
-                except Exception:
+                    # Compaction calls the summarizer, so it fails like the API call does
+                    stats["micro"] += micro_compact(messages)
+                    if estimate_tokens(messages) > TEAMMATE_TOKEN_THRESHOLD:
+                        print(f"  [{name}] auto compact")
+                        compact_teammate_context(messages, name, role, team_name)
+                        stats["auto"] += 1
+                    stats["tokens"] = estimate_tokens(messages)
+                    for attempt in range(2):
+                        try:
+                            response = client.messages.create(
+                                model=MODEL,
+                                system=sys_prompt,
+                                messages=messages,
+                                tools=tools,
+                                max_tokens=8000,
+                            )
+                            break
+                        except Exception as e:
+                            if attempt == 0 and is_prompt_too_long(e):
+                                compact_teammate_context(messages, name, role, team_name)
+                                stats["auto"] += 1
+                                continue
+                            print(f"  [{name}] API error: {e}")
+                            break
+                except Exception as e:
+                    print(f"  [{name}] context compaction failed: {e}")
+                if response is None:
                     self._set_status(name, "idle")
                     return
                 messages.append({"role": "assistant", "content": response.content})
@@ -453,7 +517,7 @@ class TeammateManager:
             {"name": "edit_file", "description": "Replace exact text in file.",
              "input_schema": {"type": "object", "properties": {"path": {"type": "string"}, "old_text": {"type": "string"}, "new_text": {"type": "string"}}, "required": ["path", "old_text", "new_text"]}},
             {"name": "send_message", "description": "Send message to a teammate.",
-             "input_schema": {"type": "object", "properties": {"to": {"type": "string"}, "content": {"type": "string"}, "msg_type": {"type": "string", "enum": list(VALID_MSG_TYPES)}}, "required": ["to", "content"]}},
+             "input_schema": {"type": "object", "properties": {"to": {"type": "string"}, "content": {"type": "string"}, "msg_type": {"type": "string", "enum": sorted(VALID_MSG_TYPES)}}, "required": ["to", "content"]}},
             {"name": "read_inbox", "description": "Read and drain your inbox.",
              "input_schema": {"type": "object", "properties": {}}},
             {"name": "shutdown_response", "description": "Respond to a shutdown request.",
@@ -471,7 +535,9 @@ class TeammateManager:
             return "No teammates."
         lines = [f"Team: {self.config['team_name']}"]
         for m in self.config["members"]:
-            lines.append(f"  {m['name']} ({m['role']}): {m['status']}")
+            ctx = self.context_stats.get(m["name"])
+            usage = f" [~{ctx['tokens']} tokens, {ctx['auto']} compactions]" if ctx else ""
+            lines.append(f"  {m['name']} ({m['role']}): {m['status']}{usage}")
         return "\n".join(lines)
 
     def member_names(self) -> list:
@@ -489,19 +555,48 @@ def _safe_path(p: str) -> Path:
     return path
 
 
+def kill_process_group(proc: subprocess.Popen):
+    """Kill the command and everything it started (same process group)."""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGKILL)
+        elif proc.poll() is None:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def run_command(command: str, cwd: Path, timeout: int) -> tuple[str, bool]:
+    """
+    Run a shell command in a new session. Returns (output, timed_out).
+
+    A timeout kills the whole group: an autonomous teammate moves on
+    to the next task, and nothing from the last one may keep running.
+    """
+    proc = subprocess.Popen(
+        command, shell=True, cwd=cwd, text=True, start_new_session=True,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+    )
+    try:
+        output, _ = proc.communicate(timeout=timeout)
+        timed_out = False
+    except subprocess.TimeoutExpired:
+        kill_process_group(proc)
+        output, _ = proc.communicate()
+        timed_out = True
+    kill_process_group(proc)
+    return output or "", timed_out
+
+
 def _run_bash(command: str) -> str:
     dangerous = ["rm -rf /", "sudo", "shutdown", "reboot"]
     if any(d in command for d in dangerous):
         return "Error: Dangerous command blocked"
-    try:
-        r = subprocess.run(
-            command, shell=True, cwd=WORKDIR,
-            capture_output=True, text=True, timeout=120,
-        )
-        out = (r.stdout + r.stderr).strip()
-        return out[:50000] if out else "(no output)"
-    except subprocess.TimeoutExpired:
+    out, timed_out = run_command(command, WORKDIR, timeout=120)
+    if timed_out:
         return "Error: Timeout (120s)"
+    out = out.strip()
+    return out[:50000] if out else "(no output)"
 
 
 def _run_read(path: str, limit: int = None) -> str:
@@ -610,7 +705,7 @@ TOOLS = [
     {"name": "list_teammates", "description": "List all teammates.",
      "input_schema": {"type": "object", "properties": {}}},
     {"name": "send_message", "description": "Send a message to a teammate.",
-     "input_schema": {"type": "object", "properties": {"to": {"type": "string"}, "content": {"type": "string"}, "msg_type": {"type": "string", "enum": list(VALID_MSG_TYPES)}}, "required": ["to", "content"]}},
+     "input_schema": {"type": "object", "properties": {"to": {"type": "string"}, "content": {"type": "string"}, "msg_type": {"type": "string", "enum": sorted(VALID_MSG_TYPES)}}, "required": ["to", "content"]}},
     {"name": "read_inbox", "description": "Read and drain the lead's inbox.",
      "input_schema": {"type": "object", "properties": {}}},
     {"name": "broadcast", "description": "Send a message to all teammates.",
@@ -46,6 +46,7 @@ Cross-machine execution, merge automation, and enterprise policy glue are intent
 import json
 import os
 import re
+import signal
 import subprocess
 import time
 from pathlib import Path
@@ -77,6 +78,39 @@ def detect_repo_root(cwd: Path) -> Path | None:
 
 REPO_ROOT = detect_repo_root(WORKDIR) or WORKDIR
 
+
+def kill_process_group(proc: subprocess.Popen):
+    """Kill the command and everything it started (same process group)."""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGKILL)
+        elif proc.poll() is None:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def run_command(command: str, cwd: Path, timeout: int) -> tuple[str, bool]:
+    """
+    Run a shell command in a new session. Returns (output, timed_out).
+
+    A timeout kills the whole group, not only the shell, so a test server
+    started inside a worktree lane does not keep its port after the call.
+    """
+    proc = subprocess.Popen(
+        command, shell=True, cwd=cwd, text=True, start_new_session=True,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+    )
+    try:
+        output, _ = proc.communicate(timeout=timeout)
+        timed_out = False
+    except subprocess.TimeoutExpired:
+        kill_process_group(proc)
+        output, _ = proc.communicate()
+        timed_out = True
+    kill_process_group(proc)
+    return output or "", timed_out
+
 SYSTEM = (
     f"You are a coding agent at {WORKDIR}. "
     "Use task + worktree tools for multi-task work. "
@@ -363,22 +397,20 @@ class WorktreeManager:
         path = Path(wt["path"])
         if not path.exists():
             return f"Error: Worktree path missing: {path}"
-        try:
-            self._update_entry(
-                name,
-                last_entered_at=time.time(),
-                last_command_at=time.time(),
-                last_command_preview=command[:120],
-            )
-            self.events.emit("worktree.run.before", task_id=wt.get("task_id"), wt_name=name, command=command[:120])
-            r = subprocess.run(command, shell=True, cwd=path,
-                               capture_output=True, text=True, timeout=300)
-            out = (r.stdout + r.stderr).strip()
-            self.events.emit("worktree.run.after", task_id=wt.get("task_id"), wt_name=name)
-            return out[:50000] if out else "(no output)"
-        except subprocess.TimeoutExpired:
+        self._update_entry(
+            name,
+            last_entered_at=time.time(),
+            last_command_at=time.time(),
+            last_command_preview=command[:120],
+        )
+        self.events.emit("worktree.run.before", task_id=wt.get("task_id"), wt_name=name, command=command[:120])
+        out, timed_out = run_command(command, path, timeout=300)
+        if timed_out:
             self.events.emit("worktree.run.timeout", task_id=wt.get("task_id"), wt_name=name)
             return "Error: Timeout (300s)"
+        out = out.strip()
+        self.events.emit("worktree.run.after", task_id=wt.get("task_id"), wt_name=name)
+        return out[:50000] if out else "(no output)"
 
     def remove(
         self,
@@ -486,13 +518,11 @@ def run_bash(command: str) -> str:
     dangerous = ["rm -rf /", "sudo", "shutdown", "reboot", "> /dev/"]
     if any(d in command for d in dangerous):
         return "Error: Dangerous command blocked"
-    try:
-        r = subprocess.run(command, shell=True, cwd=WORKDIR,
-                           capture_output=True, text=True, timeout=120)
-        out = (r.stdout + r.stderr).strip()
-        return out[:50000] if out else "(no output)"
-    except subprocess.TimeoutExpired:
+    out, timed_out = run_command(command, WORKDIR, timeout=120)
+    if timed_out:
         return "Error: Timeout (120s)"
+    out = out.strip()
+    return out[:50000] if out else "(no output)"
 
 def run_read(path: str, limit: int = None) -> str:
     try:
@@ -37,10 +37,14 @@ Marketplace details, auth flows, reconnect logic, and non-tool capability layers
 are intentionally left to bridge docs and later extensions.
 """
 
+import hashlib
 import json
+import math
 import os
+import re
 import subprocess
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from anthropic import Anthropic
@@ -55,6 +59,8 @@ WORKDIR = Path.cwd()
 client = Anthropic(base_url=os.getenv("ANTHROPIC_BASE_URL"))
 MODEL = os.environ["MODEL_ID"]
 PERMISSION_MODES = ("default", "auto")
+MAX_PARALLEL_TOOLS = 8
+TOOL_SEARCH_THRESHOLD = 12  # larger pools send natives + tools found via tool_search
 
 
 class CapabilityPermissionGate:
@@ -82,7 +88,7 @@ class CapabilityPermissionGate:
             source = "native"
 
         lowered = actual_tool.lower()
-        if actual_tool == "read_file" or lowered.startswith(self.READ_PREFIXES):
+        if actual_tool in ("read_file", "tool_search") or lowered.startswith(self.READ_PREFIXES):
             risk = "read"
         elif actual_tool == "bash":
             command = tool_input.get("command", "")
@@ -127,20 +133,50 @@ class CapabilityPermissionGate:
             "intent": intent,
         }
 
-    def ask_user(self, intent: dict, tool_input: dict) -> bool:
-        preview = json.dumps(tool_input, ensure_ascii=False)[:200]
-        source = (
+    @staticmethod
+    def _describe(intent: dict) -> str:
+        return (
             f"{intent['source']}:{intent['server']}/{intent['tool']}"
             if intent.get("server")
             else f"{intent['source']}:{intent['tool']}"
         )
-        print(f"\n  [Permission] {source} risk={intent['risk']}: {preview}")
+
+    def ask_user(self, intent: dict, tool_input: dict) -> bool:
+        preview = json.dumps(tool_input, ensure_ascii=False)[:200]
+        print(f"\n  [Permission] {self._describe(intent)} risk={intent['risk']}: {preview}")
         try:
             answer = input("  Allow? (y/n): ").strip().lower()
         except (EOFError, KeyboardInterrupt):
             return False
         return answer in ("y", "yes")
 
+    def ask_batch(self, requests: list) -> list:
+        """One prompt for a turn's pending calls: [(intent, tool_input)] -> [bool]."""
+        if len(requests) == 1:
+            return [self.ask_user(*requests[0])]
+        print(f"\n  [Permission] {len(requests)} capabilities need approval:")
+        for i, (intent, tool_input) in enumerate(requests, 1):
+            preview = json.dumps(tool_input, ensure_ascii=False)[:160]
+            print(f"    {i}. {self._describe(intent)} risk={intent['risk']}: {preview}")
+        try:
+            answer = input("  Approve? (a=all / n=none / 1,3=selected): ").strip().lower()
+        except (EOFError, KeyboardInterrupt):
+            return [False] * len(requests)
+        return parse_batch_answer(answer, len(requests))
+
+
+def parse_batch_answer(answer: str, count: int) -> list:
+    """'a'/'y' -> all, 'n'/'' -> none, '1,3' or '2-4' -> those calls (1-based)."""
+    if answer in ("a", "all", "y", "yes"):
+        return [True] * count
+    chosen = set()
+    for part in answer.replace(",", " ").split():
+        low, _, high = part.partition("-")
+        if not low.isdigit() or (high and not high.isdigit()):
+            return [False] * count  # anything unreadable counts as deny-all
+        chosen.update(range(int(low), int(high or low) + 1))
+    return [i + 1 in chosen for i in range(count)]
+
 
 permission_gate = CapabilityPermissionGate()
 
@@ -394,6 +430,7 @@ NATIVE_HANDLERS = {
     "read_file":  lambda **kw: run_read(kw["path"]),
     "write_file": lambda **kw: run_write(kw["path"], kw["content"]),
     "edit_file":  lambda **kw: run_edit(kw["path"], kw["old_text"], kw["new_text"]),
+    "tool_search": lambda **kw: tool_selector.search(kw["query"], kw.get("limit", 5)),
 }
 
 NATIVE_TOOLS = [
@@ -405,6 +442,8 @@ NATIVE_TOOLS = [
      "input_schema": {"type": "object", "properties": {"path": {"type": "string"}, "content": {"type": "string"}}, "required": ["path", "content"]}},
     {"name": "edit_file", "description": "Replace exact text in file.",
      "input_schema": {"type": "object", "properties": {"path": {"type": "string"}, "old_text": {"type": "string"}, "new_text": {"type": "string"}}, "required": ["path", "old_text", "new_text"]}},
+    {"name": "tool_search", "description": "Find MCP tools by keyword and load them for later turns.",
+     "input_schema": {"type": "object", "properties": {"query": {"type": "string"}, "limit": {"type": "integer"}}, "required": ["query"]}},
 ]
 
 
@@ -413,22 +452,121 @@ mcp_router = MCPToolRouter()
 plugin_loader = PluginLoader()
 
 
-def build_tool_pool() -> list:
+def canonical_schema(value):
+    """Sort keys at every level, and the order-free `required`/`enum` lists."""
+    if isinstance(value, dict):
+        return {key: sorted(item, key=str) if key in ("required", "enum") and isinstance(item, list)
+                else canonical_schema(item)
+                for key, item in sorted(value.items())}
+    if isinstance(value, list):
+        return [canonical_schema(item) for item in value]
+    return value
+
+
+_tool_pool = {"hash": None, "tools": ()}
+
+
+def build_tool_pool() -> tuple:
     """
     Assemble the complete tool pool: native + MCP tools.
 
     Native tools take precedence on name conflicts so the local core remains
     predictable even after external tools are added.
+
+    The pool is canonical: natives in declared order, MCP tools sorted by
+    name, every schema key-sorted, and router-only "_" keys dropped. Its
+    sha256 decides whether anything changed; if not, the previous tuple is
+    returned as-is, so the tools block of the prompt stays byte-identical
+    and the provider-side prompt cache keeps hitting.
     """
-    all_tools = list(NATIVE_TOOLS)
-    mcp_tools = mcp_router.get_all_tools()
+    native_names = {t["name"] for t in NATIVE_TOOLS}
+    mcp_tools = sorted((t for t in mcp_router.get_all_tools() if t["name"] not in native_names),
+                       key=lambda t: t["name"])
+    pool = [canonical_schema({k: v for k, v in tool.items() if not k.startswith("_")})
+            for tool in [*NATIVE_TOOLS, *mcp_tools]]
+    digest = hashlib.sha256(
+        json.dumps(pool, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+    ).hexdigest()
+    if digest != _tool_pool["hash"]:
+        if _tool_pool["hash"] is not None:
+            print(f"[tool pool changed: {_tool_pool['hash'][:12]} -> {digest[:12]}, {len(pool)} tools]")
+        _tool_pool.update(hash=digest, tools=tuple(pool))
+    return _tool_pool["tools"]
+
+
+def tool_terms(text: str) -> list:
+    """Lowercase word terms; mcp__server__tool, snake_case and camelCase split into words."""
+    return re.findall(r"[a-z0-9]+", re.sub(r"([a-z])([A-Z])", r"\1 \2", text).lower())
+
+
+class ToolSelector:
+    """
+    Per-turn tool subset for large pools.
+
+    Native tools are always sent. MCP tools are found through tool_search
+    (BM25 over name, description and parameter names) and stay loaded for
+    the rest of the session. Pools at or under the threshold are sent whole.
+    """
+
+    def __init__(self, threshold: int = TOOL_SEARCH_THRESHOLD):
+        self.threshold = threshold
+        self.loaded = set()
+        self.pool = ()
+        self._active = (None, ())
+        self._index = None
+
+    def active(self, pool: tuple) -> tuple:
+        """Tools for this call, in pool order; the same tuple until the pool or loaded set changes."""
+        if pool is not self.pool:
+            self.pool, self._index = pool, None
+        if len(pool) <= self.threshold:
+            return pool
+        native = {t["name"] for t in NATIVE_TOOLS}
+        key = (id(pool), frozenset(self.loaded))
+        if self._active[0] != key:
+            self._active = (key, tuple(t for t in pool if t["name"] in native or t["name"] in self.loaded))
+        return self._active[1]
+
+    def search(self, query: str, limit: int = 5) -> str:
+        pool = self.pool or build_tool_pool()
+        if pool is not self.pool:
+            self.pool, self._index = pool, None
+        native = {t["name"] for t in NATIVE_TOOLS}
+        tools = [t for t in pool if t["name"] not in native]
+        hits = [t for t in tools if t["name"] == query.strip()] or \
+            [tools[i] for i in self._rank(tools, query)][:limit]
+        if not hits:
+            return f"No MCP tools match '{query}'."
+        self.loaded.update(t["name"] for t in hits)
+        return "Loaded, callable from now on:\n" + "\n".join(f"- {t['name']}: {t['description']}" for t in hits)
+
+    def _rank(self, tools: list, query: str) -> list:
+        if self._index is None:
+            docs = []
+            for tool in tools:
+                params = " ".join(tool.get("input_schema", {}).get("properties", {}))
+                counts = {}
+                for text, weight in ((tool["name"], 3), (tool.get("description", ""), 1), (params, 1)):
+                    for term in tool_terms(text):
+                        counts[term] = counts.get(term, 0) + weight
+                docs.append(counts)
+            self._index = docs
+        docs, k1, b = self._index, 1.2, 0.75
+        avg_length = sum(sum(d.values()) for d in docs) / max(len(docs), 1)
+        scores = {}
+        for term in set(tool_terms(query)):
+            matching = [i for i, d in enumerate(docs) if term in d]
+            if not matching:
+                continue
+            idf = math.log(1 + (len(docs) - len(matching) + 0.5) / (len(matching) + 0.5))
+            for i in matching:
+                tf, length = docs[i][term], sum(docs[i].values())
+                norm = k1 * (1 - b + b * length / avg_length)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+        return sorted(scores, key=lambda i: (-scores[i], i))
 
-    native_names = {t["name"] for t in all_tools}
-    for tool in mcp_tools:
-        if tool["name"] not in native_names:
-            all_tools.append(tool)
 
-    return all_tools
+tool_selector = ToolSelector()
 
 
 def handle_tool_call(tool_name: str, tool_input: dict) -> str:
@@ -455,15 +593,50 @@ def normalize_tool_result(tool_name: str, output: str, intent: dict | None = Non
     return json.dumps(payload, indent=2, ensure_ascii=False)
 
 
+def run_tool_call(block) -> str:
+    try:
+        return handle_tool_call(block.name, block.input or {})
+    except Exception as e:
+        return f"Error: {e}"
+
+
+def execute_allowed(calls: list, decisions: list, allowed: list) -> list:
+    """
+    Run allowed calls, outputs in call order. Consecutive native reads share a
+    thread pool; MCP calls stay sequential because one stdio connection
+    carries one request at a time.
+    """
+    outputs = [None] * len(calls)
+    reads = []
+
+    def flush(pool):
+        for i, future in [(i, pool.submit(run_tool_call, calls[i])) for i in reads]:
+            outputs[i] = future.result()
+        reads.clear()
+
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_TOOLS) as pool:
+        for i, block in enumerate(calls):
+            if not allowed[i]:
+                continue
+            intent = decisions[i]["intent"]
+            if intent["risk"] == "read" and intent["source"] == "native":
+                reads.append(i)
+                continue
+            flush(pool)
+            outputs[i] = run_tool_call(block)
+        flush(pool)
+    return outputs
+
+
 def agent_loop(messages: list):
     """Agent loop with unified native + MCP tool pool."""
-    tools = build_tool_pool()
-
     while True:
+        tools = tool_selector.active(build_tool_pool())
         system = (
             f"You are a coding agent at {WORKDIR}. Use tools to solve tasks.\n"
             "You have both native tools and MCP tools available.\n"
             "MCP tools are prefixed with mcp__{server}__{tool}.\n"
+            "If an MCP tool you need is not listed, find it with tool_search.\n"
             "All capabilities pass through the same permission gate before execution."
         )
         response = client.messages.create(
@@ -475,22 +648,22 @@ def agent_loop(messages: list):
         if response.stop_reason != "tool_use":
             return
 
+        calls = [block for block in response.content if block.type == "tool_use"]
+        decisions = [permission_gate.check(block.name, block.input or {}) for block in calls]
+        pending = [i for i, d in enumerate(decisions) if d["behavior"] == "ask"]
+        approvals = dict(zip(pending, permission_gate.ask_batch(
+            [(decisions[i]["intent"], calls[i].input or {}) for i in pending]))) if pending else {}
+        allowed = [d["behavior"] == "allow" or approvals.get(i, False) for i, d in enumerate(decisions)]
+        outputs = execute_allowed(calls, decisions, allowed)
+
         results = []
-        for block in response.content:
-            if block.type != "tool_use":
-                continue
-            decision = permission_gate.check(block.name, block.input or {})
-            try:
-                if decision["behavior"] == "deny":
-                    output = f"Permission denied: {decision['reason']}"
-                elif decision["behavior"] == "ask" and not permission_gate.ask_user(
-                    decision["intent"], block.input or {}
-                ):
-                    output = f"Permission denied by user: {decision['reason']}"
-                else:
-                    output = handle_tool_call(block.name, block.input or {})
-            except Exception as e:
-                output = f"Error: {e}"
+        for i, (block, decision) in enumerate(zip(calls, decisions)):
+            if decision["behavior"] == "deny":
+                output = f"Permission denied: {decision['reason']}"
+            elif not allowed[i]:
+                output = f"Permission denied by user: {decision['reason']}"
+            else:
+                output = outputs[i]
             print(f"> {block.name}: {str(output)[:200]}")
             results.append({
                 "type": "tool_result",
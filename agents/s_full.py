@@ -16,7 +16,8 @@ Chapter -> Class/Function mapping:
   s03 TodoWrite      -> TodoManager
   s04 Subagent       -> run_subagent()
   s05 Skill Loading  -> SkillLoader
-  s06 Context Compact-> maybe_persist_output(), micro_compact(), auto_compact()
+  s06 Context Compact-> maybe_persist_output(), micro_compact(), auto_compact(),
+                        TranscriptLog, HistoryStore
   s07 Permissions    -> PermissionManager
   s08 Hooks          -> HookManager
   s09 Memory         -> MemoryManager
@@ -30,16 +31,26 @@ Chapter -> Class/Function mapping:
   s17 Autonomous     -> _idle_poll(), scan_unclaimed_tasks()
   s18 Worktree       -> WorktreeManager
 
-REPL commands: /compact /tasks /team /inbox
+REPL commands: /compact /tasks /team /inbox /context
+Resume a session: python agents/s_full.py --resume [<session_id>|latest]
 """
 
+import atexit
+import gzip
 import json
+import math
+import mmap
 import os
 import re
+import shutil
+import signal
 import subprocess
+import sys
 import threading
 import time
 import uuid
+import weakref
+from collections import OrderedDict
 from pathlib import Path
 from queue import Queue
 
@@ -75,6 +86,12 @@ PERSISTED_PREVIEW_CHARS = 2000
 KEEP_RECENT = 3
 PRESERVE_RESULT_TOOLS = {"read_file"}
 
+# Tool search: pools larger than the threshold send only the core set plus
+# whatever tool_search has loaded this session
+TOOL_SEARCH_THRESHOLD = 12
+CORE_TOOLS = {"bash", "read_file", "write_file", "edit_file", "TodoWrite",
+              "task", "load_skill", "compress", "tool_search"}
+
 VALID_MSG_TYPES = {"message", "broadcast", "shutdown_request",
                    "shutdown_response", "plan_approval_response"}
 
@@ -126,6 +143,251 @@ def maybe_persist_output(tool_use_id: str, output: str, trigger_chars: int = Non
     return _build_persisted_marker(stored_path, output)
 
 
+# === SECTION: history_store (s06) ===
+# Large tool_result payloads live in mmap-backed segment files; the message
+# list keeps a small SpilledText handle that is read back only for API calls
+# and summaries. Segments are scratch space (the transcript has the full text):
+# once compaction drops every handle into a segment, the next spill deletes it,
+# or truncates it when it is still the one being written.
+HISTORY_DIR = TASK_OUTPUT_DIR / "history"
+HISTORY_SPILL_CHARS = 4096
+HISTORY_SEGMENT_BYTES = 64 * 1024 * 1024  # start a new segment past this size
+
+
+class SpilledText:
+    __slots__ = ("store", "segment", "offset", "length", "chars", "__weakref__")
+
+    def __init__(self, store, segment: dict, offset: int, length: int, chars: int):
+        self.store, self.segment = store, segment
+        self.offset, self.length, self.chars = offset, length, chars
+
+    def __str__(self) -> str:
+        return self.store.read(self)
+
+    def __len__(self) -> int:
+        return self.chars
+
+
+class HistoryStore:
+    def __init__(self, path: Path, spill_chars: int = HISTORY_SPILL_CHARS,
+                 segment_bytes: int = HISTORY_SEGMENT_BYTES):
+        self.path = path
+        self.spill_chars = spill_chars
+        self.segment_bytes = segment_bytes
+        self._segments = []  # {"path", "file", "map", "refs": WeakSet of live handles}; last is written
+        self._next_id = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def spill(self, text: str):
+        if not isinstance(text, str) or len(text) < self.spill_chars:
+            return text
+        data = text.encode()
+        with self._lock:
+            if self._closed:
+                return text
+            segment = self._writable_segment()
+            offset = segment["file"].seek(0, os.SEEK_END)
+            segment["file"].write(data)
+            segment["file"].flush()
+            ref = SpilledText(self, segment, offset, len(data), len(text))
+            segment["refs"].add(ref)
+        return ref
+
+    def _writable_segment(self) -> dict:
+        """Drop segments no handle points into any more, then return the one to append to."""
+        for segment in [seg for seg in self._segments[:-1] if not seg["refs"]]:
+            self._segments.remove(segment)
+            self._drop(segment)
+        current = self._segments[-1] if self._segments else None
+        if current is not None and not current["refs"]:
+            if current["map"] is not None:
+                current["map"].close()
+                current["map"] = None
+            current["file"].truncate(0)
+        if current is None or current["file"].seek(0, os.SEEK_END) >= self.segment_bytes:
+            path = self.path if not self._next_id else \
+                self.path.with_name(f"{self.path.stem}.{self._next_id}{self.path.suffix}")
+            self._next_id += 1
+            path.parent.mkdir(parents=True, exist_ok=True)
+            current = {"path": path, "file": open(path, "w+b"), "map": None, "refs": weakref.WeakSet()}
+            self._segments.append(current)
+        return current
+
+    def read(self, ref: SpilledText) -> str:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"history store {self.path} is closed; spilled output is gone")
+            segment, end = ref.segment, ref.offset + ref.length
+            if segment["map"] is None or end > len(segment["map"]):
+                if segment["map"] is not None:
+                    segment["map"].close()
+                segment["map"] = mmap.mmap(segment["file"].fileno(), 0, access=mmap.ACCESS_READ)
+            return segment["map"][ref.offset:end].decode()
+
+    @staticmethod
+    def _drop(segment: dict):
+        if segment["map"] is not None:
+            segment["map"].close()
+        segment["file"].close()
+        segment["path"].unlink(missing_ok=True)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for segment in self._segments:
+                self._drop(segment)
+            self._segments = []
+
+
+def materialize(messages: list) -> list:
+    """Copy of `messages` with spilled payloads read back; untouched messages are shared."""
+    out = []
+    for msg in messages:
+        content = msg.get("content")
+        if isinstance(content, list) and any(
+                isinstance(part, dict) and isinstance(part.get("content"), SpilledText) for part in content):
+            content = [dict(part, content=str(part["content"]))
+                       if isinstance(part, dict) and isinstance(part.get("content"), SpilledText) else part
+                       for part in content]
+            msg = dict(msg, content=content)
+        out.append(msg)
+    return out
+
+
+# === SECTION: sandboxed execution ===
+# Per-call limits for commands the agents run. Teammates share one host, so a
+# runaway build in one call must not starve the others. Memory is capped with
+# RLIMIT_AS (Linux does not enforce RLIMIT_RSS). It is opt-in: RLIMIT_AS caps
+# reserved address space, and JVM, Go and Node reserve far more than they use.
+# RLIMIT_NPROC counts every process of the user, so it is a ceiling, not a
+# per-call quota. 0 = no limit.
+SANDBOX_LIMITS = {
+    "cpu_seconds": int(os.getenv("SANDBOX_CPU_SECONDS", "300")),
+    "memory_mb": int(os.getenv("SANDBOX_MEMORY_MB", "0")),
+    "max_processes": int(os.getenv("SANDBOX_MAX_PROCESSES", "0")),
+    "output_bytes": int(os.getenv("SANDBOX_OUTPUT_BYTES", str(8 * 1024 * 1024))),
+}
+
+try:
+    import resource
+except ImportError:  # not POSIX: run without limits or accounting
+    resource = None
+
+
+# Limits are set by the shell itself (`ulimit`) rather than preexec_fn, which
+# is not safe while other threads (teammates, background tasks) are running, so
+# the common case costs nothing extra. Shells disagree on the flag for process
+# counts, so only max_processes goes through a small wrapper that calls
+# setrlimit and execs the shell (same pid, group and wait4 accounting).
+_NPROC_WRAPPER = (
+    "import os, resource, sys\n"
+    "limit = int(sys.argv[1])\n"
+    "resource.setrlimit(resource.RLIMIT_NPROC, (limit, limit))\n"
+    "os.execv('/bin/sh', ['/bin/sh', '-c', sys.argv[2]])\n"
+)
+
+
+def _sandbox_argv(command: str, limits: dict):
+    """Popen (args, shell) for command with the configured rlimits applied."""
+    if resource is None:
+        return command, True
+    ulimits = []
+    if limits["cpu_seconds"]:
+        ulimits.append(f"ulimit -t {int(limits['cpu_seconds'])}")
+    if limits["memory_mb"]:
+        ulimits.append(f"ulimit -v {int(limits['memory_mb']) * 1024}")
+    script = "\n".join(ulimits + [command])
+    if limits["max_processes"]:
+        return [sys.executable, "-c", _NPROC_WRAPPER, str(int(limits["max_processes"])), script], False
+    return script, True
+
+
+def _kill_group(proc):
+    try:
+        if resource is not None:
+            os.killpg(proc.pid, signal.SIGKILL)
+        elif proc.poll() is None:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def run_sandboxed(command: str, cwd: Path = None, timeout: int = 120, limits: dict = None,
+                  on_start=None) -> dict:
+    """
+    Run a shell command in its own process group under SANDBOX_LIMITS.
+
+    The group is killed on timeout, when output passes output_bytes, and once
+    the shell exits (so stray `&` children do not outlive the call). Every
+    command path (bash, background tasks) goes through here; on_start(proc)
+    lets a caller keep the Popen to cancel it. Returns {"output", "returncode",
+    "timed_out", "truncated", "wall_s", "cpu_s", "maxrss_kb"}.
+    """
+    limits = {**SANDBOX_LIMITS, **(limits or {})}
+    posix = resource is not None
+    args, shell = _sandbox_argv(command, limits)
+    started = time.monotonic()
+    proc = subprocess.Popen(
+        args, shell=shell, cwd=cwd or WORKDIR,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, start_new_session=posix,
+    )
+    if on_start:
+        on_start(proc)
+    state = {"timed_out": False, "truncated": False}
+    chunks = []
+
+    def read_output():
+        size, cap = 0, limits["output_bytes"] or float("inf")
+        for chunk in iter(lambda: proc.stdout.read1(65536), b""):
+            if size < cap:
+                chunks.append(chunk[:int(cap - size)])
+            size += len(chunk)
+            if size > cap and not state["truncated"]:
+                state["truncated"] = True
+                _kill_group(proc)
+
+    def on_timeout():
+        state["timed_out"] = True
+        _kill_group(proc)
+
+    reader = threading.Thread(target=read_output, daemon=True)
+    reader.start()
+    timer = threading.Timer(timeout, on_timeout)
+    timer.start()
+    try:
+        if posix:
+            _, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            cpu_s, maxrss_kb = usage.ru_utime + usage.ru_stime, usage.ru_maxrss
+            _kill_group(proc)
+        else:
+            proc.wait()
+            cpu_s, maxrss_kb = None, None
+    finally:
+        timer.cancel()
+    reader.join(timeout=5)
+    proc.stdout.close()
+    return {
+        "output": b"".join(chunks).decode("utf-8", errors="replace"),
+        "returncode": proc.returncode,
+        "timed_out": state["timed_out"],
+        "truncated": state["truncated"],
+        "wall_s": round(time.monotonic() - started, 3),
+        "cpu_s": None if cpu_s is None else round(cpu_s, 3),
+        "maxrss_kb": maxrss_kb,
+    }
+
+
+def format_run_metadata(result: dict) -> str:
+    parts = [f"exit {result['returncode']}", f"wall {result['wall_s']}s"]
+    if result["cpu_s"] is not None:
+        parts += [f"cpu {result['cpu_s']}s", f"maxrss {result['maxrss_kb'] // 1024}MB"]
+    if result["truncated"]:
+        parts.append("output truncated")
+    return "[" + " | ".join(parts) + "]"
+
+
 # === SECTION: base_tools ===
 def safe_path(p: str) -> Path:
     path = (WORKDIR / p).resolve()
@@ -137,16 +399,15 @@ def run_bash(command: str, tool_use_id: str = "") -> str:
     dangerous = ["rm -rf /", "sudo", "shutdown", "reboot", "> /dev/"]
     if any(d in command for d in dangerous):
         return "Error: Dangerous command blocked"
-    try:
-        r = subprocess.run(command, shell=True, cwd=WORKDIR,
-                           capture_output=True, text=True, timeout=120)
-        out = (r.stdout + r.stderr).strip()
-        if not out:
-            return "(no output)"
-        out = maybe_persist_output(tool_use_id, out, trigger_chars=PERSIST_OUTPUT_TRIGGER_CHARS_BASH)
-        return out[:CONTEXT_TRUNCATE_CHARS] if isinstance(out, str) else str(out)[:CONTEXT_TRUNCATE_CHARS]
-    except subprocess.TimeoutExpired:
-        return "Error: Timeout (120s)"
+    r = run_sandboxed(command, timeout=120)
+    if r["timed_out"]:
+        return f"Error: Timeout (120s)\n{format_run_metadata(r)}"
+    out = r["output"].strip()
+    if not out:
+        return f"(no output)\n{format_run_metadata(r)}"
+    out = maybe_persist_output(tool_use_id, out, trigger_chars=PERSIST_OUTPUT_TRIGGER_CHARS_BASH)
+    out = out[:CONTEXT_TRUNCATE_CHARS] if isinstance(out, str) else str(out)[:CONTEXT_TRUNCATE_CHARS]
+    return f"{out}\n{format_run_metadata(r)}"
 
 def run_read(path: str, tool_use_id: str = "", limit: int = None) -> str:
     try:
@@ -239,9 +500,15 @@ def run_subagent(prompt: str, agent_type: str = "Explore") -> str:
         "edit_file": lambda **kw: run_edit(kw["path"], kw["old_text"], kw["new_text"]),
     }
     sub_msgs = [{"role": "user", "content": prompt}]
+    ctx = AgentContext(f"subagent-{uuid.uuid4().hex[:8]}", "subagent")
     resp = None
     for _ in range(30):
-        resp = client.messages.create(model=MODEL, messages=sub_msgs, tools=sub_tools, max_tokens=8000)
+        try:
+            ctx.prepare(sub_msgs)
+            resp = ctx.create(sub_msgs, model=MODEL, tools=sub_tools, max_tokens=8000)
+        except Exception as e:
+            ctx.close()
+            return f"(subagent failed: {e})"
         sub_msgs.append({"role": "assistant", "content": resp.content})
         if resp.stop_reason != "tool_use":
             break
@@ -249,53 +516,302 @@ def run_subagent(prompt: str, agent_type: str = "Explore") -> str:
         for b in resp.content:
             if b.type == "tool_use":
                 h = sub_handlers.get(b.name, lambda **kw: "Unknown tool")
-                results.append({"type": "tool_result", "tool_use_id": b.id, "content": str(h(**b.input))[:50000]})
+                results.append({"type": "tool_result", "tool_use_id": b.id,
+                                "content": HISTORY_STORE.spill(str(h(**b.input))[:50000])})
         sub_msgs.append({"role": "user", "content": results})
+    ctx.log.sync(sub_msgs)
+    ctx.close()
     if resp:
         return "".join(b.text for b in resp.content if hasattr(b, "text")) or "(no summary)"
     return "(subagent failed)"
 
 
 # === SECTION: skills (s05) ===
+SKILL_MANIFEST = ".manifest.json"
+SKILL_BODY_CACHE_SIZE = 8
+SKILL_INLINE_CHARS = 3000  # larger skills load as contents + requested sections
+SKILL_QUERY_SECTIONS = 2
+
+
+def index_skill_sections(body: str) -> list:
+    """Headings outside code fences -> [{path, level, text (with subsections), intro}]."""
+    lines, headings, in_fence = body.splitlines(), [], False
+    for n, line in enumerate(lines):
+        if line.lstrip().startswith("```"):
+            in_fence = not in_fence
+        m = None if in_fence else re.match(r"^(#{1,6})\s+(.+?)\s*#*$", line)
+        if m:
+            headings.append((n, len(m.group(1)), m.group(2)))
+    sections, trail = [], []
+    for i, (start, level, title) in enumerate(headings):
+        trail = [t for t in trail if t[0] < level] + [(level, title)]
+        end = next((n for n, lvl, _ in headings[i + 1:] if lvl <= level), len(lines))
+        intro_end = headings[i + 1][0] if i + 1 < len(headings) else len(lines)
+        sections.append({"path": " > ".join(t for _, t in trail), "level": level,
+                         "text": "\n".join(lines[start:end]).strip(),
+                         "intro": "\n".join(lines[start:intro_end]).strip()})
+    return sections
+
+
 class SkillLoader:
-    def __init__(self, skills_dir: Path):
-        self.skills = {}
-        if skills_dir.exists():
-            for f in sorted(skills_dir.rglob("SKILL.md")):
-                text = f.read_text()
-                match = re.match(r"^---\n(.*?)\n---\n(.*)", text, re.DOTALL)
-                meta, body = {}, text
-                if match:
-                    for line in match.group(1).strip().splitlines():
-                        if ":" in line:
-                            k, v = line.split(":", 1)
-                            meta[k.strip()] = v.strip()
-                    body = match.group(2).strip()
-                name = meta.get("name", f.parent.name)
-                self.skills[name] = {"meta": meta, "body": body}
+    """Catalog from frontmatter only (cached per (mtime, size) in skills/.manifest.json);
+    bodies read on load and kept in a small LRU."""
+
+    def __init__(self, skills_dir: Path, cache_size: int = SKILL_BODY_CACHE_SIZE):
+        self.skills, self.cache_size = {}, cache_size
+        self._bodies = OrderedDict()  # (path, mtime_ns) -> body
+        if not skills_dir.exists():
+            return
+        manifest = skills_dir / SKILL_MANIFEST
+        try:
+            cached = json.loads(manifest.read_text())
+        except (OSError, json.JSONDecodeError):
+            cached = {}
+        records = {}
+        for f in sorted(skills_dir.rglob("SKILL.md")):
+            key, st = f.relative_to(skills_dir).as_posix(), f.stat()
+            record = cached.get(key)
+            if not record or record.get("sig") != [st.st_mtime_ns, st.st_size]:
+                record = {"sig": [st.st_mtime_ns, st.st_size], "meta": self._read_frontmatter(f)}
+            records[key] = record
+            self.skills[record["meta"].get("name", f.parent.name)] = {"meta": record["meta"], "path": f}
+        if records != cached:
+            try:
+                tmp = manifest.with_name(f"{SKILL_MANIFEST}.{os.getpid()}.tmp")
+                tmp.write_text(json.dumps(records, ensure_ascii=False))
+                os.replace(tmp, manifest)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _read_frontmatter(path: Path) -> dict:
+        """Read only up to the closing --- of the frontmatter block."""
+        meta = {}
+        with path.open() as f:
+            if f.readline().rstrip("\n") != "---":
+                return {}
+            for line in f:
+                if line.rstrip("\n") == "---":
+                    return meta
+                if ":" in line:
+                    k, v = line.split(":", 1)
+                    meta[k.strip()] = v.strip()
+        return {}
+
+    def _body(self, path: Path) -> tuple:
+        """(body, sections), parsed once per (path, mtime)."""
+        key = (path, path.stat().st_mtime_ns)
+        if key in self._bodies:
+            self._bodies.move_to_end(key)
+            return self._bodies[key]
+        text = path.read_text()
+        match = re.match(r"^---\n(.*?)\n---\n(.*)", text, re.DOTALL)
+        body = match.group(2).strip() if match else text
+        self._bodies[key] = (body, index_skill_sections(body))
+        while len(self._bodies) > self.cache_size:
+            self._bodies.popitem(last=False)
+        return self._bodies[key]
 
     def descriptions(self) -> str:
         if not self.skills: return "(no skills)"
         return "\n".join(f"  - {n}: {s['meta'].get('description', '-')}" for n, s in self.skills.items())
 
-    def load(self, name: str) -> str:
+    def load(self, name: str, section: str = None, query: str = None, file: str = None) -> str:
+        """Small skills whole; large ones as contents + sections by heading path or query.
+        Reference files beside SKILL.md are read only when named via `file`."""
         s = self.skills.get(name)
         if not s: return f"Error: Unknown skill '{name}'. Available: {', '.join(self.skills.keys())}"
-        return f"<skill name=\"{name}\">\n{s['body']}\n</skill>"
+        skill_dir = s["path"].parent.resolve()
+        if file:
+            ref = (skill_dir / file).resolve()
+            if not ref.is_relative_to(skill_dir) or not ref.is_file():
+                return f"Error: No reference file '{file}' in skill '{name}'"
+            return f"<skill-file name=\"{name}/{file}\">\n{ref.read_text()[:CONTEXT_TRUNCATE_CHARS]}\n</skill-file>"
+        body, sections = self._body(s["path"])
+        if not (section or query) and len(body) <= SKILL_INLINE_CHARS:
+            return f"<skill name=\"{name}\">\n{body}\n</skill>"
+        if section:
+            wanted = " > ".join(p.strip() for p in section.lower().split(">"))
+            picked = [x for x in sections if x["path"].lower() == wanted or x["path"].lower().endswith(" > " + wanted)] \
+                or [x for x in sections if wanted in x["path"].split(" > ")[-1].lower()]
+        elif query:
+            picked = self._rank(sections, query)[:SKILL_QUERY_SECTIONS]
+        else:
+            picked = []
+        picked = [x for x in picked if not any(o is not x and x["path"].startswith(o["path"] + " > ") for o in picked)]
+        top = min((x["level"] for x in sections), default=1)
+        parts = ["Contents:\n" + "\n".join(f"{'  ' * (x['level'] - top)}- {x['path'].split(' > ')[-1]}" for x in sections)]
+        if picked:
+            parts += [x["text"] for x in picked]
+        elif section or query:
+            parts.append(f"(no section matches {section or query!r})")
+        else:
+            parts += [sections[0]["intro"] if sections else body,
+                      "Load more with section=<heading path> or query=<keywords>."]
+        refs = sorted(p.relative_to(skill_dir).as_posix() for p in skill_dir.rglob("*") if p.is_file() and p.name != "SKILL.md")
+        if refs:
+            parts.append("Reference files (load with file=<path>): " + ", ".join(refs))
+        return f"<skill name=\"{name}\">\n" + "\n\n".join(parts) + "\n</skill>"
+
+    @staticmethod
+    def _rank(sections: list, query: str) -> list:
+        """Keyword score per section: title terms x3, rarer terms weigh more."""
+        terms = lambda text: re.findall(r"[a-z0-9]+", text.lower())
+        docs = [terms(x["path"].split(" > ")[-1]) * 3 + terms(x["intro"]) for x in sections]
+        scores = {}
+        for term in set(terms(query)):
+            matching = [i for i, d in enumerate(docs) if term in d]
+            idf = math.log(1 + len(docs) / (1 + len(matching)))
+            for i in matching:
+                scores[i] = scores.get(i, 0.0) + idf * docs[i].count(term) / math.sqrt(len(docs[i]))
+        return [sections[i] for i in sorted(scores, key=lambda i: (-scores[i], i))]
+
+
+# === SECTION: transcript_log (s06) ===
+# One directory per session: segment_NNNNNN.jsonl files plus a fixed-width
+# index (record number -> segment, byte offset). Each record is written once.
+TRANSCRIPT_SEGMENT_MAX_BYTES = 8 * 1024 * 1024
+TRANSCRIPT_GZIP_SEGMENTS = os.getenv("TRANSCRIPT_GZIP", "") == "1"
+INDEX_LINE_FORMAT = "{seq:012d} {segment:06d} {offset:016d} {kind}\n"
+INDEX_LINE_LEN = 39
+INDEX_KINDS = {"message": "m", "compaction": "c", "todos": "t"}
+
+
+def _jsonable(value):
+    # SDK content blocks are pydantic models; keep their structure, not repr().
+    if hasattr(value, "model_dump"):
+        return value.model_dump(exclude_none=True)
+    return str(value)
+
+
+class TranscriptLog:
+    def __init__(self, session_id: str = None, root: Path = TRANSCRIPT_DIR,
+                 max_segment_bytes: int = TRANSCRIPT_SEGMENT_MAX_BYTES,
+                 gzip_segments: bool = TRANSCRIPT_GZIP_SEGMENTS):
+        self.session_id = session_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.dir = root / self.session_id
+        self.index_path = self.dir / "index.idx"
+        self.max_segment_bytes = max_segment_bytes
+        self.gzip_segments = gzip_segments
+        self.synced = 0  # how many entries of the live message list are already logged
+        self._lock = threading.Lock()
+        self.count, self.segment = 0, 1
+        if self.index_path.exists():
+            size = self.index_path.stat().st_size
+            self.count = size // INDEX_LINE_LEN
+            if self.count:
+                self.segment = self._index_entry(self.count - 1)[0]
+
+    def _segment_path(self, segment: int, gz: bool = False) -> Path:
+        return self.dir / f"segment_{segment:06d}.jsonl{'.gz' if gz else ''}"
+
+    def _index_entry(self, seq: int) -> tuple:
+        with open(self.index_path, "rb") as f:
+            f.seek(seq * INDEX_LINE_LEN)
+            line = f.read(INDEX_LINE_LEN).decode()
+        _, segment, offset, kind = line.split()
+        return int(segment), int(offset), kind
+
+    def _rotate(self):
+        closed = self._segment_path(self.segment)
+        if self.gzip_segments and closed.exists():
+            with open(closed, "rb") as src, gzip.open(self._segment_path(self.segment, gz=True), "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            closed.unlink()
+        self.segment += 1
+
+    def append(self, kind: str, payload: dict) -> int:
+        with self._lock:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            path = self._segment_path(self.segment)
+            if path.exists() and path.stat().st_size >= self.max_segment_bytes:
+                self._rotate()
+                path = self._segment_path(self.segment)
+            record = {"seq": self.count, "kind": kind, "ts": time.time(), **payload}
+            line = (json.dumps(record, default=_jsonable) + "\n").encode()
+            with open(path, "ab") as f:
+                offset = f.tell()
+                f.write(line)
+            with open(self.index_path, "ab") as f:
+                f.write(INDEX_LINE_FORMAT.format(
+                    seq=self.count, segment=self.segment, offset=offset,
+                    kind=INDEX_KINDS.get(kind, "x")).encode())
+            self.count += 1
+            return self.count - 1
+
+    def sync(self, messages: list) -> int:
+        """Append the messages added since the last sync. Returns how many were written."""
+        new = messages[self.synced:]
+        for msg in new:
+            self.append("message", {"message": msg})
+        self.synced = len(messages)
+        return len(new)
+
+    def record_compaction(self, summary: str, kept: int, stats: dict = None) -> int:
+        # The compacted list starts fresh; its first `kept` entries are the summary itself.
+        seq = self.append("compaction", {"summary": summary, "stats": stats or {}})
+        self.synced = kept
+        return seq
+
+    def read(self, seq: int) -> dict:
+        segment, offset, _ = self._index_entry(seq)
+        with self._open_segment(segment) as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def _open_segment(self, segment: int):
+        path = self._segment_path(segment)
+        if path.exists():
+            return open(path, "rb")
+        return gzip.open(self._segment_path(segment, gz=True), "rb")
+
+    def replay(self, start: int = 0):
+        """Stream records from `start` to the end: one seek, then sequential reads."""
+        if start >= self.count:
+            return
+        segment, offset, _ = self._index_entry(start)
+        while segment <= self.segment:
+            with self._open_segment(segment) as f:
+                f.seek(offset)
+                for line in f:
+                    yield json.loads(line)
+            segment, offset = segment + 1, 0
+
+    def last_of_kind(self, kind: str, chunk_lines: int = 4096):
+        """Scan the index backwards for the newest record of `kind`; None if absent."""
+        tag = INDEX_KINDS[kind]
+        end = self.count
+        with open(self.index_path, "rb") as f:
+            while end > 0:
+                start = max(0, end - chunk_lines)
+                f.seek(start * INDEX_LINE_LEN)
+                block = f.read((end - start) * INDEX_LINE_LEN).decode()
+                for i in range(end - start - 1, -1, -1):
+                    if block[i * INDEX_LINE_LEN + INDEX_LINE_LEN - 2] == tag:
+                        return start + i
+                end = start
+        return None
 
 
 # === SECTION: compression (s06) ===
 def estimate_tokens(messages: list) -> int:
-    return len(json.dumps(messages, default=str)) // 4
+    spilled = []
+
+    def measure(value):
+        if isinstance(value, SpilledText):
+            spilled.append(value.chars)  # counted without reading the payload back
+            return ""
+        return str(value)
+    return (len(json.dumps(messages, default=measure)) + sum(spilled)) // 4
 
-def microcompact(messages: list):
+def microcompact(messages: list, keep_recent: int = KEEP_RECENT):
     tool_results = []
     for msg in messages:
         if msg["role"] == "user" and isinstance(msg.get("content"), list):
             for part in msg["content"]:
                 if isinstance(part, dict) and part.get("type") == "tool_result":
                     tool_results.append(part)
-    if len(tool_results) <= KEEP_RECENT:
+    if len(tool_results) <= keep_recent:
         return
     tool_name_map = {}
     for msg in messages:
@@ -303,10 +819,14 @@ def microcompact(messages: list):
             content = msg.get("content", [])
             if isinstance(content, list):
                 for block in content:
-                    if hasattr(block, "type") and block.type == "tool_use":
+                    if isinstance(block, dict):
+                        # blocks restored from a transcript are plain dicts
+                        if block.get("type") == "tool_use":
+                            tool_name_map[block["id"]] = block["name"]
+                    elif hasattr(block, "type") and block.type == "tool_use":
                         tool_name_map[block.id] = block.name
-    for part in tool_results[:-KEEP_RECENT]:
-        if not isinstance(part.get("content"), str) or len(part["content"]) <= 100:
+    for part in tool_results[:-keep_recent]:
+        if not isinstance(part.get("content"), (str, SpilledText)) or len(part["content"]) <= 100:
             continue
         tool_id = part.get("tool_use_id", "")
         tool_name = tool_name_map.get(tool_id, "unknown")
@@ -314,12 +834,23 @@ def microcompact(messages: list):
             continue
         part["content"] = f"[Previous: used {tool_name}]"
 
-def auto_compact(messages: list, focus: str = None) -> list:
-    TRANSCRIPT_DIR.mkdir(exist_ok=True)
-    path = TRANSCRIPT_DIR / f"transcript_{int(time.time())}.jsonl"
-    with open(path, "w") as f:
-        for msg in messages:
-            f.write(json.dumps(msg, default=str) + "\n")
+COMPACT_STATS = {"auto": 0, "manual": 0}
+
+
+def continuation_message(summary: str) -> dict:
+    return {"role": "user", "content": (
+        "This session is being continued from a previous conversation that ran out "
+        "of context. The summary below covers the earlier portion of the conversation.\n\n"
+        f"{summary}\n\n"
+        "Please continue the conversation from where we left it off without asking "
+        "the user any further questions."
+    )}
+
+
+def auto_compact(messages: list, focus: str = None, log: "TranscriptLog" = None,
+                 stats: dict = None) -> list:
+    log = log or TRANSCRIPT
+    log.sync(messages)
     conv_text = json.dumps(messages, default=str)[:80000]
     prompt = (
         "Summarize this conversation for continuity. Structure your summary:\n"
@@ -338,16 +869,79 @@ def auto_compact(messages: list, focus: str = None) -> list:
         max_tokens=4000,
     )
     summary = resp.content[0].text
-    continuation = (
-        "This session is being continued from a previous conversation that ran out "
-        "of context. The summary below covers the earlier portion of the conversation.\n\n"
-        f"{summary}\n\n"
-        "Please continue the conversation from where we left it off without asking "
-        "the user any further questions."
-    )
-    return [
-        {"role": "user", "content": continuation},
-    ]
+    log.record_compaction(summary, kept=1, stats=dict(COMPACT_STATS if stats is None else stats))
+    return [continuation_message(summary)]
+
+
+# === SECTION: agent_context (s06 + s17) ===
+# Teammates and subagents run the same compaction pipeline as the lead, each
+# with its own threshold, transcript and stats.
+AGENT_TOKEN_THRESHOLDS = {"teammate": 60000, "subagent": 40000}
+AGENT_KEEP_RECENT = {"teammate": KEEP_RECENT, "subagent": 2}  # tool results microcompact leaves whole
+AGENT_CONTEXTS = {}
+
+
+def ensure_identity_context(messages: list, name: str, role: str, team_name: str):
+    if messages and "<identity>" in str(messages[0].get("content", "")):
+        return
+    messages.insert(0, {"role": "user", "content":
+        f"<identity>You are '{name}', role: {role}, team: {team_name}.</identity>"})
+    messages.insert(1, {"role": "assistant", "content": f"I am {name}. Continuing."})
+
+
+class AgentContext:
+    def __init__(self, name: str, kind: str, identity: tuple = None):
+        self.name = name
+        self.token_threshold = AGENT_TOKEN_THRESHOLDS[kind]
+        self.keep_recent = AGENT_KEEP_RECENT[kind]
+        self.identity = identity  # (role, team_name) for teammates
+        self.log = TranscriptLog(name, root=TRANSCRIPT.dir / "agents")
+        self.stats = {"kind": kind, "turns": 0, "auto": 0, "tokens": 0, "peak_tokens": 0}
+        AGENT_CONTEXTS[name] = self
+
+    def prepare(self, messages: list):
+        """Run before every model call: log, micro-compact, auto-compact past the threshold."""
+        self.log.sync(messages)
+        microcompact(messages, keep_recent=self.keep_recent)
+        tokens = estimate_tokens(messages)
+        self.stats["peak_tokens"] = max(self.stats["peak_tokens"], tokens)
+        if tokens > self.token_threshold:
+            print(f"  [{self.name}] auto-compact ({tokens} tokens)")
+            self.compact(messages)
+            tokens = estimate_tokens(messages)
+        self.stats["turns"] += 1
+        self.stats["tokens"] = tokens
+
+    def compact(self, messages: list):
+        self.stats["auto"] += 1
+        messages[:] = auto_compact(messages, log=self.log, stats=self.stats)
+        if self.identity:
+            ensure_identity_context(messages, self.name, *self.identity)
+        self.log.synced = len(messages)
+
+    def create(self, messages: list, **kwargs):
+        """client.messages.create with one compact-and-retry on prompt-too-long."""
+        try:
+            return client.messages.create(messages=materialize(messages), **kwargs)
+        except Exception as e:
+            error = str(e).lower()
+            if not ("overlong_prompt" in error or ("prompt" in error and "long" in error)):
+                raise
+        print(f"  [{self.name}] prompt too long, compacting and retrying")
+        self.compact(messages)
+        return client.messages.create(messages=materialize(messages), **kwargs)
+
+    def close(self):
+        AGENT_CONTEXTS.pop(self.name, None)
+
+
+def agent_context_report() -> str:
+    lines = [f"lead: compactions {COMPACT_STATS}"]
+    for name, ctx in AGENT_CONTEXTS.items():
+        st = ctx.stats
+        lines.append(f"{name} ({st['kind']}): {st['tokens']}/{ctx.token_threshold} tokens, "
+                     f"peak {st['peak_tokens']}, turns {st['turns']}, auto-compactions {st['auto']}")
+    return "\n".join(lines)
 
 
 # === SECTION: file_tasks (s07) ===
@@ -421,6 +1015,8 @@ class BackgroundManager:
     def __init__(self):
         self.tasks = {}
         self.notifications = Queue()
+        self._procs = {}  # tid -> Popen while running, for cancel()
+        atexit.register(self.cancel_all)
 
     def run(self, command: str, timeout: int = 120) -> str:
         tid = str(uuid.uuid4())[:8]
@@ -430,12 +1026,16 @@ class BackgroundManager:
 
     def _exec(self, tid: str, command: str, timeout: int):
         try:
-            r = subprocess.run(command, shell=True, cwd=WORKDIR,
-                               capture_output=True, text=True, timeout=timeout)
-            output = (r.stdout + r.stderr).strip()[:50000]
-            self.tasks[tid].update({"status": "completed", "result": output or "(no output)"})
+            r = run_sandboxed(command, timeout=timeout,
+                              on_start=lambda proc: self._procs.__setitem__(tid, proc))
+            output = r["output"].strip()[:50000]
+            status = "timeout" if r["timed_out"] else "completed"
+            if self.tasks[tid]["status"] == "cancelled":
+                status = "cancelled"
+            self.tasks[tid].update({"status": status, "result": f"{output or '(no output)'}\n{format_run_metadata(r)}"})
         except Exception as e:
             self.tasks[tid].update({"status": "error", "result": str(e)})
+        self._procs.pop(tid, None)
         self.notifications.put({"task_id": tid, "status": self.tasks[tid]["status"],
                                 "result": self.tasks[tid]["result"][:500]})
 
@@ -445,6 +1045,19 @@ class BackgroundManager:
             return f"[{t['status']}] {t.get('result', '(running)')}" if t else f"Unknown: {tid}"
         return "\n".join(f"{k}: [{v['status']}] {v['command'][:60]}" for k, v in self.tasks.items()) or "No bg tasks."
 
+    def cancel(self, tid: str) -> str:
+        proc = self._procs.get(tid)
+        if proc is None:
+            t = self.tasks.get(tid)
+            return f"Task {tid} is {t['status']}" if t else f"Unknown: {tid}"
+        self.tasks[tid]["status"] = "cancelled"
+        _kill_group(proc)
+        return f"Cancelled background task {tid}"
+
+    def cancel_all(self):
+        for tid in list(self._procs):
+            self.cancel(tid)
+
     def drain(self) -> list:
         notifs = []
         while not self.notifications.empty():
@@ -535,92 +1148,97 @@ class TeammateManager:
         sys_prompt = (f"You are '{name}', role: {role}, team: {team_name}, at {WORKDIR}. "
                       f"Use idle when done with current work. You may auto-claim tasks.")
         messages = [{"role": "user", "content": prompt}]
-        tools = [
-            {"name": "bash", "description": "Run command.", "input_schema": {"type": "object", "properties": {"command": {"type": "string"}}, "required": ["command"]}},
-            {"name": "read_file", "description": "Read file.", "input_schema": {"type": "object", "properties": {"path": {"type": "string"}}, "required": ["path"]}},
-            {"name": "write_file", "description": "Write file.", "input_schema": {"type": "object", "properties": {"path": {"type": "string"}, "content": {"type": "string"}}, "required": ["path", "content"]}},
-            {"name": "edit_file", "description": "Edit file.", "input_schema": {"type": "object", "properties": {"path": {"type": "string"}, "old_text": {"type": "string"}, "new_text": {"type": "string"}}, "required": ["path", "old_text", "new_text"]}},
-            {"name": "send_message", "description": "Send message.", "input_schema": {"type": "object", "properties": {"to": {"type": "string"}, "content": {"type": "string"}}, "required": ["to", "content"]}},
-            {"name": "idle", "description": "Signal no more work.", "input_schema": {"type": "object", "properties": {}}},
-            {"name": "claim_task", "description": "Claim task by ID.", "input_schema": {"type": "object", "properties": {"task_id": {"type": "integer"}}, "required": ["task_id"]}},
-        ]
-        while True:
-            # -- WORK PHASE --
-            for _ in range(50):
-                inbox = self.bus.read_inbox(name)
-                for msg in inbox:
-                    if msg.get("type") == "shutdown_request":
-                        self._set_status(name, "shutdown")
-                        return
-                    messages.append({"role": "user", "content": json.dumps(msg)})
-                try:
-                    response = client.messages.create(
-                        model=MODEL, system=sys_prompt, messages=messages,
-                        tools=tools, max_tokens=8000)
-                except Exception:
-                    self._set_status(name, "shutdown")
-                    return
-                messages.append({"role": "assistant", "content": response.content})
-                if response.stop_reason != "tool_use":
-                    break
-                results = []
-                idle_requested = False
-                for block in response.content:
-                    if block.type == "tool_use":
-                        if block.name == "idle":
-                            idle_requested = True
-                            output = "Entering idle phase."
-                        elif block.name == "claim_task":
-                            output = self.task_mgr.claim(block.input["task_id"], name)
-                        elif block.name == "send_message":
-                            output = self.bus.send(name, block.input["to"], block.input["content"])
-                        else:
-                            dispatch = {"bash": lambda **kw: run_bash(kw["command"]),
-                                        "read_file": lambda **kw: run_read(kw["path"]),
-                                        "write_file": lambda **kw: run_write(kw["path"], kw["content"]),
-                                        "edit_file": lambda **kw: run_edit(kw["path"], kw["old_text"], kw["new_text"])}
-                            output = dispatch.get(block.name, lambda **kw: "Unknown")(**block.input)
-                        print(f"  [{name}] {block.name}: {str(output)[:120]}")
-                        results.append({"type": "tool_result", "tool_use_id": block.id, "content": str(output)})
-                messages.append({"role": "user", "content": results})
-                if idle_requested:
-                    break
-            # -- IDLE PHASE: poll for messages and unclaimed tasks --
-            self._set_status(name, "idle")
-            resume = False
-            for _ in range(IDLE_TIMEOUT // max(POLL_INTERVAL, 1)):
-                time.sleep(POLL_INTERVAL)
-                inbox = self.bus.read_inbox(name)
-                if inbox:
+        ctx = AgentContext(name, "teammate", identity=(role, team_name))
+        try:
+            tools = [
+                {"name": "bash", "description": "Run command.", "input_schema": {"type": "object", "properties": {"command": {"type": "string"}}, "required": ["command"]}},
+                {"name": "read_file", "description": "Read file.", "input_schema": {"type": "object", "properties": {"path": {"type": "string"}}, "required": ["path"]}},
+                {"name": "write_file", "description": "Write file.", "input_schema": {"type": "object", "properties": {"path": {"type": "string"}, "content": {"type": "string"}}, "required": ["path", "content"]}},
+                {"name": "edit_file", "description": "Edit file.", "input_schema": {"type": "object", "properties": {"path": {"type": "string"}, "old_text": {"type": "string"}, "new_text": {"type": "string"}}, "required": ["path", "old_text", "new_text"]}},
+                {"name": "send_message", "description": "Send message.", "input_schema": {"type": "object", "properties": {"to": {"type": "string"}, "content": {"type": "string"}}, "required": ["to", "content"]}},
+                {"name": "idle", "description": "Signal no more work.", "input_schema": {"type": "object", "properties": {}}},
+                {"name": "claim_task", "description": "Claim task by ID.", "input_schema": {"type": "object", "properties": {"task_id": {"type": "integer"}}, "required": ["task_id"]}},
+            ]
+            while True:
+                # -- WORK PHASE --
+                for _ in range(50):
+                    inbox = self.bus.read_inbox(name)
                     for msg in inbox:
                         if msg.get("type") == "shutdown_request":
                             self._set_status(name, "shutdown")
                             return
                         messages.append({"role": "user", "content": json.dumps(msg)})
-                    resume = True
-                    break
-                unclaimed = []
-                for f in sorted(TASKS_DIR.glob("task_*.json")):
-                    t = json.loads(f.read_text())
-                    if t.get("status") == "pending" and not t.get("owner") and not t.get("blockedBy"):
-                        unclaimed.append(t)
-                if unclaimed:
-                    task = unclaimed[0]
-                    self.task_mgr.claim(task["id"], name)
-                    # Identity re-injection for compressed contexts
-                    if len(messages) <= 3:
-                        messages.insert(0, {"role": "user", "content":
-                            f"<identity>You are '{name}', role: {role}, team: {team_name}.</identity>"})
-                        messages.insert(1, {"role": "assistant", "content": f"I am {name}. Continuing."})
-                    messages.append({"role": "user", "content":
-                        f"<auto-claimed>Task #{task['id']}: {task['subject']}\n{task.get('description', '')}</auto-claimed>"})
-                    messages.append({"role": "assistant", "content": f"Claimed task #{task['id']}. Working on it."})
-                    resume = True
-                    break
-            if not resume:
-                self._set_status(name, "shutdown")
-                return
-            self._set_status(name, "working")
+                    try:
+                        ctx.prepare(messages)  # may call the summarizer; failures shut down cleanly
+                        response = ctx.create(messages, model=MODEL, system=sys_prompt,
+                                              tools=tools, max_tokens=8000)
+                    except Exception as e:
+                        print(f"  [{name}] API error, shutting down: {e}")
+                        ctx.log.sync(messages)
+                        self._set_status(name, "shutdown")
+                        return
+                    messages.append({"role": "assistant", "content": response.content})
+                    if response.stop_reason != "tool_use":
+                        break
+                    results = []
+                    idle_requested = False
+                    for block in response.content:
+                        if block.type == "tool_use":
+                            if block.name == "idle":
+                                idle_requested = True
+                                output = "Entering idle phase."
+                            elif block.name == "claim_task":
+                                output = self.task_mgr.claim(block.input["task_id"], name)
+                            elif block.name == "send_message":
+                                output = self.bus.send(name, block.input["to"], block.input["content"])
+                            else:
+                                dispatch = {"bash": lambda **kw: run_bash(kw["command"]),
+                                            "read_file": lambda **kw: run_read(kw["path"]),
+                                            "write_file": lambda **kw: run_write(kw["path"], kw["content"]),
+                                            "edit_file": lambda **kw: run_edit(kw["path"], kw["old_text"], kw["new_text"])}
+                                output = dispatch.get(block.name, lambda **kw: "Unknown")(**block.input)
+                            print(f"  [{name}] {block.name}: {str(output)[:120]}")
+                            results.append({"type": "tool_result", "tool_use_id": block.id,
+                                            "content": HISTORY_STORE.spill(str(output))})
+                    messages.append({"role": "user", "content": results})
+                    if idle_requested:
+                        break
+                # -- IDLE PHASE: poll for messages and unclaimed tasks --
+                self._set_status(name, "idle")
+                resume = False
+                for _ in range(IDLE_TIMEOUT // max(POLL_INTERVAL, 1)):
+                    time.sleep(POLL_INTERVAL)
+                    inbox = self.bus.read_inbox(name)
+                    if inbox:
+                        for msg in inbox:
+                            if msg.get("type") == "shutdown_request":
+                                self._set_status(name, "shutdown")
+                                return
+                            messages.append({"role": "user", "content": json.dumps(msg)})
+                        resume = True
+                        break
+                    unclaimed = []
+                    for f in sorted(TASKS_DIR.glob("task_*.json")):
+                        t = json.loads(f.read_text())
+                        if t.get("status") == "pending" and not t.get("owner") and not t.get("blockedBy"):
+                            unclaimed.append(t)
+                    if unclaimed:
+                        task = unclaimed[0]
+                        self.task_mgr.claim(task["id"], name)
+                        # Identity re-injection for compressed contexts
+                        if len(messages) <= 3:
+                            ensure_identity_context(messages, name, role, team_name)
+                        messages.append({"role": "user", "content":
+                            f"<auto-claimed>Task #{task['id']}: {task['subject']}\n{task.get('description', '')}</auto-claimed>"})
+                        messages.append({"role": "assistant", "content": f"Claimed task #{task['id']}. Working on it."})
+                        resume = True
+                        break
+                if not resume:
+                    self._set_status(name, "shutdown")
+                    return
+                self._set_status(name, "working")
+        finally:
+            ctx.close()  # drop it from AGENT_CONTEXTS and /context
 
     def list_all(self) -> str:
         if not self.config["members"]: return "No teammates."
@@ -634,17 +1252,21 @@ class TeammateManager:
 
 
 # === SECTION: global_instances ===
+HISTORY_STORE = HistoryStore(HISTORY_DIR / f"segment_{os.getpid()}.bin")
+atexit.register(HISTORY_STORE.close)
 TODO = TodoManager()
 SKILLS = SkillLoader(SKILLS_DIR)
 TASK_MGR = TaskManager()
 BG = BackgroundManager()
 BUS = MessageBus()
 TEAM = TeammateManager(BUS, TASK_MGR)
+TRANSCRIPT = TranscriptLog()
 
 # === SECTION: system_prompt ===
 SYSTEM = f"""You are a coding agent at {WORKDIR}. Use tools to solve tasks.
 Prefer task_create/task_update/task_list for multi-step work. Use TodoWrite for short checklists.
 Use task for subagent delegation. Use load_skill for specialized knowledge.
+Team, background and task-board tools are loaded on demand: call tool_search first.
 Skills: {SKILLS.descriptions()}"""
 
 
@@ -673,10 +1295,11 @@ TOOL_HANDLERS = {
     "edit_file":        lambda **kw: run_edit(kw["path"], kw["old_text"], kw["new_text"]),
     "TodoWrite":        lambda **kw: TODO.update(kw["items"]),
     "task":             lambda **kw: run_subagent(kw["prompt"], kw.get("agent_type", "Explore")),
-    "load_skill":       lambda **kw: SKILLS.load(kw["name"]),
+    "load_skill":       lambda **kw: SKILLS.load(kw["name"], kw.get("section"), kw.get("query"), kw.get("file")),
     "compress":         lambda **kw: "Compressing...",
     "background_run":   lambda **kw: BG.run(kw["command"], kw.get("timeout", 120)),
     "check_background": lambda **kw: BG.check(kw.get("task_id")),
+    "cancel_background": lambda **kw: BG.cancel(kw["task_id"]),
     "task_create":      lambda **kw: TASK_MGR.create(kw["subject"], kw.get("description", "")),
     "task_get":         lambda **kw: TASK_MGR.get(kw["task_id"]),
     "task_update":      lambda **kw: TASK_MGR.update(kw["task_id"], kw.get("status"), kw.get("add_blocked_by"), kw.get("add_blocks")),
@@ -690,6 +1313,7 @@ TOOL_HANDLERS = {
     "plan_approval":    lambda **kw: handle_plan_review(kw["request_id"], kw["approve"], kw.get("feedback", "")),
     "idle":             lambda **kw: "Lead does not idle.",
     "claim_task":       lambda **kw: TASK_MGR.claim(kw["task_id"], "lead"),
+    "tool_search":      lambda **kw: TOOL_SELECTOR.search(kw["query"], kw.get("limit", 5)),
 }
 
 TOOLS = [
@@ -705,14 +1329,16 @@ TOOLS = [
      "input_schema": {"type": "object", "properties": {"items": {"type": "array", "items": {"type": "object", "properties": {"content": {"type": "string"}, "status": {"type": "string", "enum": ["pending", "in_progress", "completed"]}, "activeForm": {"type": "string"}}, "required": ["content", "status", "activeForm"]}}}, "required": ["items"]}},
     {"name": "task", "description": "Spawn a subagent for isolated exploration or work.",
      "input_schema": {"type": "object", "properties": {"prompt": {"type": "string"}, "agent_type": {"type": "string", "enum": ["Explore", "general-purpose"]}}, "required": ["prompt"]}},
-    {"name": "load_skill", "description": "Load specialized knowledge by name.",
-     "input_schema": {"type": "object", "properties": {"name": {"type": "string"}}, "required": ["name"]}},
+    {"name": "load_skill", "description": "Load specialized knowledge by name. Large skills return their contents plus the sections picked by section (heading path) or query; file loads a reference file.",
+     "input_schema": {"type": "object", "properties": {"name": {"type": "string"}, "section": {"type": "string"}, "query": {"type": "string"}, "file": {"type": "string"}}, "required": ["name"]}},
     {"name": "compress", "description": "Manually compress conversation context.",
      "input_schema": {"type": "object", "properties": {}}},
     {"name": "background_run", "description": "Run command in background thread.",
      "input_schema": {"type": "object", "properties": {"command": {"type": "string"}, "timeout": {"type": "integer"}}, "required": ["command"]}},
     {"name": "check_background", "description": "Check background task status.",
      "input_schema": {"type": "object", "properties": {"task_id": {"type": "string"}}}},
+    {"name": "cancel_background", "description": "Stop a running background task and everything it started.",
+     "input_schema": {"type": "object", "properties": {"task_id": {"type": "string"}}, "required": ["task_id"]}},
     {"name": "task_create", "description": "Create a persistent file task.",
      "input_schema": {"type": "object", "properties": {"subject": {"type": "string"}, "description": {"type": "string"}}, "required": ["subject"]}},
     {"name": "task_get", "description": "Get task details by ID.",
@@ -726,7 +1352,7 @@ TOOLS = [
     {"name": "list_teammates", "description": "List all teammates.",
      "input_schema": {"type": "object", "properties": {}}},
     {"name": "send_message", "description": "Send a message to a teammate.",
-     "input_schema": {"type": "object", "properties": {"to": {"type": "string"}, "content": {"type": "string"}, "msg_type": {"type": "string", "enum": list(VALID_MSG_TYPES)}}, "required": ["to", "content"]}},
+     "input_schema": {"type": "object", "properties": {"to": {"type": "string"}, "content": {"type": "string"}, "msg_type": {"type": "string", "enum": sorted(VALID_MSG_TYPES)}}, "required": ["to", "content"]}},
     {"name": "read_inbox", "description": "Read and drain the lead's inbox.",
      "input_schema": {"type": "object", "properties": {}}},
     {"name": "broadcast", "description": "Send message to all teammates.",
@@ -740,16 +1366,93 @@ TOOLS = [
     {"name": "claim_task", "description": "Claim a task from the board.",
      "input_schema": {"type": "object", "properties": {"task_id": {"type": "integer"}}, "required": ["task_id"]}},
 ]
+TOOLS.append(
+    {"name": "tool_search", "description": "Find more tools by keyword and load them for later turns. Not loaded yet: "
+        + ", ".join(t["name"] for t in TOOLS if t["name"] not in CORE_TOOLS) + ".",
+     "input_schema": {"type": "object", "properties": {"query": {"type": "string"}, "limit": {"type": "integer"}}, "required": ["query"]}})
+
+
+# === SECTION: tool_search ===
+def tool_terms(text: str) -> list:
+    """Lowercase word terms; snake_case and camelCase names split into words."""
+    return re.findall(r"[a-z0-9]+", re.sub(r"([a-z])([A-Z])", r"\1 \2", text).lower())
+
+
+class ToolSelector:
+    """
+    Per-turn tool subset. The core set is always sent; every other tool is
+    found through tool_search (BM25 over name, description and parameter
+    names) and stays loaded for the rest of the session. Pools at or under
+    the threshold are sent whole.
+    """
+
+    def __init__(self, tools: list, core: set, threshold: int = TOOL_SEARCH_THRESHOLD):
+        self.tools = tools
+        self.core = core
+        self.threshold = threshold
+        self.loaded = set()
+        self._active = (None, tools)
+        self._index = None
+
+    def active(self) -> list:
+        """Tools for this call, in catalogue order; the same list until a search loads more."""
+        if len(self.tools) <= self.threshold:
+            return self.tools
+        key = frozenset(self.loaded)
+        if self._active[0] != key:
+            self._active = (key, [t for t in self.tools if t["name"] in self.core or t["name"] in key])
+        return self._active[1]
+
+    def search(self, query: str, limit: int = 5) -> str:
+        hits = [t for t in self.tools if t["name"] == query.strip()] or \
+            [self.tools[i] for i in self._rank(query)][:limit]
+        hits = [t for t in hits if t["name"] not in self.core]
+        if not hits:
+            deferred = [t["name"] for t in self.tools if t["name"] not in self.core]
+            return f"No tools match '{query}'. Not loaded yet: {', '.join(deferred)}"
+        self.loaded.update(t["name"] for t in hits)
+        return "Loaded, callable from now on:\n" + "\n".join(f"- {t['name']}: {t['description']}" for t in hits)
+
+    def _rank(self, query: str) -> list:
+        if self._index is None:
+            docs = []
+            for tool in self.tools:
+                params = " ".join(tool.get("input_schema", {}).get("properties", {}))
+                counts = {}
+                for text, weight in ((tool["name"], 3), (tool.get("description", ""), 1), (params, 1)):
+                    for term in tool_terms(text):
+                        counts[term] = counts.get(term, 0) + weight
+                docs.append(counts)
+            self._index = docs
+        docs, k1, b = self._index, 1.2, 0.75
+        avg_length = sum(sum(d.values()) for d in docs) / max(len(docs), 1)
+        scores = {}
+        for term in set(tool_terms(query)):
+            matching = [i for i, d in enumerate(docs) if term in d]
+            if not matching:
+                continue
+            idf = math.log(1 + (len(docs) - len(matching) + 0.5) / (len(matching) + 0.5))
+            for i in matching:
+                tf, length = docs[i][term], sum(docs[i].values())
+                norm = k1 * (1 - b + b * length / avg_length)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+        return sorted(scores, key=lambda i: (-scores[i], i))
+
+
+TOOL_SELECTOR = ToolSelector(TOOLS, CORE_TOOLS)
 
 
 # === SECTION: agent_loop ===
 def agent_loop(messages: list):
     rounds_without_todo = 0
     while True:
+        # s06: log new messages before microcompact rewrites old tool results
+        TRANSCRIPT.sync(messages)
         # s06: compression pipeline
         microcompact(messages)
         if estimate_tokens(messages) > TOKEN_THRESHOLD:
             print("[auto-compact triggered]")
+            COMPACT_STATS["auto"] += 1
             messages[:] = auto_compact(messages)
         # s08: drain background notifications
         notifs = BG.drain()
@@ -764,11 +1467,12 @@ def agent_loop(messages: list):
             messages.append({"role": "assistant", "content": "Noted inbox messages."})
         # LLM call
         response = client.messages.create(
-            model=MODEL, system=SYSTEM, messages=messages,
-            tools=TOOLS, max_tokens=8000,
+            model=MODEL, system=SYSTEM, messages=materialize(messages),
+            tools=TOOL_SELECTOR.active(), max_tokens=8000,
         )
         messages.append({"role": "assistant", "content": response.content})
         if response.stop_reason != "tool_use":
+            TRANSCRIPT.sync(messages)
             return
         # Tool execution
         results = []
@@ -788,9 +1492,12 @@ def agent_loop(messages: list):
                 except Exception as e:
                     output = f"Error: {e}"
                 print(f"> {block.name}: {str(output)[:200]}")
-                results.append({"type": "tool_result", "tool_use_id": block.id, "content": str(output)})
+                results.append({"type": "tool_result", "tool_use_id": block.id,
+                                "content": HISTORY_STORE.spill(str(output))})
                 if block.name == "TodoWrite":
                     used_todo = True
+        if used_todo:
+            TRANSCRIPT.append("todos", {"items": TODO.items})
         # s03: nag reminder (only when todo workflow is active)
         rounds_without_todo = 0 if used_todo else rounds_without_todo + 1
         if TODO.has_open_items() and rounds_without_todo >= 3:
@@ -799,12 +1506,49 @@ def agent_loop(messages: list):
         # s06: manual compress
         if manual_compress:
             print("[manual compact]")
+            COMPACT_STATS["manual"] += 1
             messages[:] = auto_compact(messages, focus=compact_focus)
 
 
+# === SECTION: resume (s06) ===
+def resume_session(session_id: str) -> tuple:
+    """Rebuild (log, history) from the newest compaction summary plus the tail after it."""
+    if session_id == "latest":
+        sessions = [d for d in TRANSCRIPT_DIR.glob("*") if (d / "index.idx").exists()]
+        if not sessions:
+            raise ValueError(f"No sessions in {TRANSCRIPT_DIR}")
+        session_id = max(sessions, key=lambda d: (d / "index.idx").stat().st_mtime).name
+    log = TranscriptLog(session_id)
+    if not log.count:
+        raise ValueError(f"Unknown or empty session '{session_id}'")
+    history, start = [], 0
+    last_compaction = log.last_of_kind("compaction")
+    if last_compaction is not None:
+        record = log.read(last_compaction)
+        history.append(continuation_message(record["summary"]))
+        COMPACT_STATS.update(record.get("stats", {}))
+        start = last_compaction + 1
+    last_todos = log.last_of_kind("todos")
+    if last_todos is not None:
+        TODO.items = log.read(last_todos)["items"]
+    history += [r["message"] for r in log.replay(start) if r["kind"] == "message"]
+    # A turn cut off between tool_use and tool_result cannot be sent back as-is.
+    while history and history[-1]["role"] == "assistant" and isinstance(history[-1]["content"], list) \
+            and any(isinstance(b, dict) and b.get("type") == "tool_use" for b in history[-1]["content"]):
+        history.pop()
+    log.synced = len(history)
+    return log, history
+
+
 # === SECTION: repl ===
 if __name__ == "__main__":
     history = []
+    if len(sys.argv) >= 2 and sys.argv[1] == "--resume":
+        TRANSCRIPT, history = resume_session(sys.argv[2] if len(sys.argv) > 2 else "latest")
+        print(f"[resumed {TRANSCRIPT.session_id}: {len(history)} messages, "
+              f"{len(TODO.items)} todos, compactions {COMPACT_STATS}]")
+    else:
+        print(f"[session {TRANSCRIPT.session_id}]")
     while True:
         try:
             query = input("\033[36ms_full >> \033[0m")
@@ -815,6 +1559,7 @@ if __name__ == "__main__":
         if query.strip() == "/compact":
             if history:
                 print("[manual compact via /compact]")
+                COMPACT_STATS["manual"] += 1
                 history[:] = auto_compact(history)
             continue
         if query.strip() == "/tasks":
@@ -823,6 +1568,9 @@ if __name__ == "__main__":
         if query.strip() == "/team":
             print(TEAM.list_all())
             continue
+        if query.strip() == "/context":
+            print(agent_context_report())
+            continue
         if query.strip() == "/inbox":
             print(json.dumps(BUS.read_inbox("lead"), indent=2))
             continue
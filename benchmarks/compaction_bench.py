@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+compaction_bench.py - Compaction cost and fidelity on synthetic long sessions
+
+Generates a deterministic multi-thousand-turn history with heavy tool output,
+plants facts at known positions, then runs each compaction strategy from
+`s06_context_compact.py` and `s_full.py` against a fake summarizer client.
+
+For every strategy it reports:
+  cpu_ms        CPU time spent in the strategy (time.process_time)
+  peak_kb       peak Python allocation while it ran (tracemalloc)
+  tokens_before / tokens_after   len(json) // 4, same estimate as s_full
+  llm_in        tokens the strategy sent to the summarizer
+  fidelity      planted facts still present in the compacted context
+
+The fake client is an extractive summarizer: it sees exactly the prompt the
+real model would see and keeps the `FACT-` lines it finds, within the same
+max_tokens budget. No network access and no API key are needed.
+
+Usage:
+  python benchmarks/compaction_bench.py --turns 2000 --output-chars 40000
+  python benchmarks/compaction_bench.py --json
+"""
+
+import argparse
+import contextlib
+import copy
+import importlib.util
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+AGENTS_DIR = REPO_ROOT / "agents"
+FACT_RE = re.compile(r"FACT-\d+: value \d{8}")
+WORDS = ("alpha beta gamma delta error warning passed failed build module "
+         "import config cache token request handler worker thread").split()
+
+
+# -- deterministic fake client --
+class FakeMessages:
+    def __init__(self):
+        self.input_tokens = 0
+        self.calls = 0
+
+    def create(self, model=None, messages=None, max_tokens=4000, **kwargs):
+        prompt = "".join(m["content"] for m in messages if isinstance(m["content"], str))
+        self.calls += 1
+        self.input_tokens += len(prompt) // 4
+        budget, kept = max_tokens * 4, []
+        for fact in FACT_RE.findall(prompt):
+            if sum(len(k) + 1 for k in kept) + len(fact) > budget:
+                break
+            kept.append(fact)
+        text = "Summary of earlier work.\n" + "\n".join(kept)
+        return types.SimpleNamespace(
+            content=[types.SimpleNamespace(type="text", text=text)],
+            stop_reason="end_turn",
+        )
+
+
+class FakeClient:
+    def __init__(self, *args, **kwargs):
+        self.messages = FakeMessages()
+
+
+def load_agent(name: str, workdir: Path):
+    """Import agents/<name>.py with a fake anthropic SDK, rooted at `workdir`."""
+    fake_anthropic = types.ModuleType("anthropic")
+    fake_anthropic.Anthropic = FakeClient
+    fake_dotenv = types.ModuleType("dotenv")
+    fake_dotenv.load_dotenv = lambda override=True: None
+    saved = {k: sys.modules.get(k) for k in ("anthropic", "dotenv")}
+    previous_cwd = Path.cwd()
+    sys.modules["anthropic"], sys.modules["dotenv"] = fake_anthropic, fake_dotenv
+    try:
+        os.chdir(workdir)
+        os.environ.setdefault("MODEL_ID", "bench-model")
+        spec = importlib.util.spec_from_file_location(f"bench_{name}", AGENTS_DIR / f"{name}.py")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    finally:
+        os.chdir(previous_cwd)
+        for key, value in saved.items():
+            if value is None:
+                sys.modules.pop(key, None)
+            else:
+                sys.modules[key] = value
+
+
+# -- synthetic history --
+def build_history(turns: int, output_chars: int, fact_every: int, seed: int) -> tuple:
+    rng = random.Random(seed)
+    messages = [{"role": "user", "content": "Refactor the build system and keep the tests green."}]
+    facts = []
+    for turn in range(turns):
+        tool = "read_file" if turn % 3 == 0 else "bash"
+        tool_id = f"toolu_{turn:06d}"
+        messages.append({"role": "assistant", "content": [
+            {"type": "text", "text": f"Step {turn}: running {tool}."},
+            {"type": "tool_use", "id": tool_id, "name": tool,
+             "input": {"command": f"make step{turn}"} if tool == "bash" else {"path": f"src/mod{turn}.py"}},
+        ]})
+        lines, size = [], 0
+        while size < output_chars:
+            line = " ".join(rng.choice(WORDS) for _ in range(12))
+            lines.append(line)
+            size += len(line) + 1
+        if turn % fact_every == 0:
+            fact = f"FACT-{len(facts):04d}: value {rng.randrange(10**8):08d}"
+            facts.append(fact)
+            lines.insert(rng.randrange(len(lines) + 1), fact)
+        messages.append({"role": "user", "content": [
+            {"type": "tool_result", "tool_use_id": tool_id, "content": "\n".join(lines)},
+        ]})
+    return messages, facts
+
+
+# -- strategies --
+def strategies(s06, full) -> dict:
+    def s06_persist(messages):
+        for message in messages:
+            if message["role"] == "user" and isinstance(message["content"], list):
+                for block in message["content"]:
+                    if block.get("type") == "tool_result":
+                        block["content"] = s06.persist_large_output(block["tool_use_id"], block["content"])
+        return messages
+
+    def full_pipeline(messages):
+        full.microcompact(messages)
+        if full.estimate_tokens(messages) > full.TOKEN_THRESHOLD:
+            messages[:] = full.auto_compact(messages)
+        return messages
+
+    return {
+        "s06.persist_large_output": s06_persist,
+        "s06.micro_compact": s06.micro_compact,
+        "s06.compact_history": lambda m: s06.compact_history(m, s06.CompactState()),
+        "s_full.microcompact": lambda m: full.microcompact(m) or m,
+        "s_full.auto_compact": full.auto_compact,
+        "s_full.micro+auto": full_pipeline,
+    }
+
+
+def measure(name: str, fn, history: list, facts: list, client) -> dict:
+    messages = copy.deepcopy(history)
+    tokens_before = len(json.dumps(messages, default=str)) // 4
+    llm_before = client.messages.input_tokens
+    tracemalloc.start()
+    cpu_start = time.process_time()
+    result = fn(messages)
+    cpu_ms = (time.process_time() - cpu_start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    context = json.dumps(result, default=str)
+    kept = sum(1 for fact in facts if fact in context)
+    return {
+        "strategy": name,
+        "cpu_ms": round(cpu_ms, 1),
+        "peak_kb": peak // 1024,
+        "tokens_before": tokens_before,
+        "tokens_after": len(context) // 4,
+        "llm_in": client.messages.input_tokens - llm_before,
+        "fidelity": round(kept / len(facts), 3) if facts else 1.0,
+    }
+
+
+def run_suite(turns: int = 2000, output_chars: int = 40000, fact_every: int = 25, seed: int = 7) -> list:
+    history, facts = build_history(turns, output_chars, fact_every, seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        s06 = load_agent("s06_context_compact", workdir)
+        full = load_agent("s_full", workdir)
+        previous_cwd = Path.cwd()
+        os.chdir(workdir)
+        # s06 prints a "[transcript saved]" line per compaction; keep them out of the report
+        try:
+            rows = []
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                for name, fn in strategies(s06, full).items():
+                    client = full.client if name.startswith("s_full") else s06.client
+                    rows.append(measure(name, fn, history, facts, client))
+            return rows
+        finally:
+            os.chdir(previous_cwd)
+
+
+def print_table(rows: list):
+    columns = ["strategy", "cpu_ms", "peak_kb", "tokens_before", "tokens_after", "llm_in", "fidelity"]
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for row in rows:
+        print("  ".join(str(row[c]).ljust(widths[c]) for c in columns))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--output-chars", type=int, default=40000)
+    parser.add_argument("--fact-every", type=int, default=25)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    results = run_suite(args.turns, args.output_chars, args.fact_every, args.seed)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
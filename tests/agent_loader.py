@@ -0,0 +1,47 @@
+import importlib.util
+import os
+import sys
+import types
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def load_agent_module(name: str, temp_cwd: Path):
+    """Import agents/<name>.py from temp_cwd with anthropic and dotenv faked out."""
+    fake_anthropic = types.ModuleType("anthropic")
+
+    class FakeAnthropic:
+        def __init__(self, *args, **kwargs):
+            self.messages = types.SimpleNamespace(create=None)
+
+    fake_dotenv = types.ModuleType("dotenv")
+    setattr(fake_anthropic, "Anthropic", FakeAnthropic)
+    setattr(fake_dotenv, "load_dotenv", lambda override=True: None)
+
+    previous = {mod: sys.modules.get(mod) for mod in ("anthropic", "dotenv")}
+    previous_cwd = Path.cwd()
+    module_path = REPO_ROOT / "agents" / f"{name}.py"
+    spec = importlib.util.spec_from_file_location(f"{name}_under_test", module_path)
+    if spec is None or spec.loader is None:
+        raise RuntimeError(f"Unable to load {module_path}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["anthropic"] = fake_anthropic
+    sys.modules["dotenv"] = fake_dotenv
+    try:
+        os.chdir(temp_cwd)
+        os.environ.setdefault("MODEL_ID", "test-model")
+        spec.loader.exec_module(module)
+        return module
+    finally:
+        os.chdir(previous_cwd)
+        for mod, value in previous.items():
+            if value is None:
+                sys.modules.pop(mod, None)
+            else:
+                sys.modules[mod] = value
+
+
+def load_s_full_module(temp_cwd: Path):
+    return load_agent_module("s_full", temp_cwd)
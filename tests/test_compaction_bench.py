@@ -0,0 +1,41 @@
+import contextlib
+import importlib.util
+import io
+import unittest
+from pathlib import Path
+
+
+BENCH_PATH = Path(__file__).resolve().parents[1] / "benchmarks" / "compaction_bench.py"
+
+
+def load_bench():
+    spec = importlib.util.spec_from_file_location("compaction_bench", BENCH_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class CompactionBenchTests(unittest.TestCase):
+    def test_small_suite_reports_every_strategy(self):
+        bench = load_bench()
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            rows = bench.run_suite(turns=40, output_chars=2000, fact_every=5)
+
+        self.assertNotIn("[transcript saved", out.getvalue())
+
+        names = [row["strategy"] for row in rows]
+        self.assertIn("s_full.micro+auto", names)
+        self.assertIn("s06.persist_large_output", names)
+        for row in rows:
+            self.assertLessEqual(row["tokens_after"], row["tokens_before"])
+            self.assertGreaterEqual(row["fidelity"], 0.0)
+            self.assertLessEqual(row["fidelity"], 1.0)
+
+    def test_history_is_deterministic(self):
+        bench = load_bench()
+        self.assertEqual(bench.build_history(5, 500, 2, seed=1), bench.build_history(5, 500, 2, seed=1))
+
+
+if __name__ == "__main__":
+    unittest.main()
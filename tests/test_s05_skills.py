@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from agent_loader import load_agent_module
+
+
+def write_skill(root: Path, name: str, body: str):
+    skill_dir = root / "skills" / name
+    skill_dir.mkdir(parents=True, exist_ok=True)
+    (skill_dir / "SKILL.md").write_text(f"---\nname: {name}\ndescription: about {name}\n---\n{body}\n")
+
+
+class SkillRegistryTests(unittest.TestCase):
+    def test_manifest_skips_unchanged_files_and_bodies_load_lazily(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            for name in ("alpha", "beta", "gamma"):
+                write_skill(root, name, f"# {name}\nSteps for {name}.")
+            module = load_agent_module("s05_skill_loading", root)
+            skills_dir = root / "skills"
+
+            reads = []
+            original = module.SkillRegistry._read_frontmatter
+            module.SkillRegistry._read_frontmatter = staticmethod(
+                lambda path: reads.append(path.parent.name) or original(path))
+            write_skill(root, "beta", "# beta\nNew steps.")
+            os.utime(skills_dir / "beta" / "SKILL.md", ns=(1, 1))
+            registry = module.SkillRegistry(skills_dir, cache_size=1)
+
+            self.assertEqual(reads, ["beta"])
+            self.assertIn("- alpha: about alpha", registry.describe_available())
+            self.assertEqual(len(registry._bodies), 0)
+            self.assertIn("New steps.", registry.load_full_text("beta"))
+            self.assertIn("Steps for alpha.", registry.load_full_text("alpha"))
+            self.assertEqual(len(registry._bodies), 1)
+
+            s_full = load_agent_module("s_full", root)
+            self.assertIn("Steps for gamma.", s_full.SKILLS.load("gamma"))
+            self.assertEqual(module.SkillRegistry(skills_dir).manifests["gamma"].description, "about gamma")
+
+    def test_large_skills_load_contents_plus_requested_sections(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            filler = "Background prose. " * 200
+            write_skill(root, "big", "# Big\nIntro line.\n\n## Setup\n" + filler + "\n\n```bash\n# not a heading\n```\n"
+                        "\n## Deploy\nShip with make release.\n\n### Rollback\nRevert the tag.\n")
+            (root / "skills" / "big" / "references").mkdir()
+            (root / "skills" / "big" / "references" / "api.md").write_text("API notes.")
+            for module in (load_agent_module("s05_skill_loading", root), load_agent_module("s_full", root)):
+                load = module.SKILL_REGISTRY.load if hasattr(module, "SKILL_REGISTRY") else module.SKILLS.load
+
+                overview = load("big")
+                self.assertIn("  - Deploy\n    - Rollback", overview)
+                self.assertIn("Intro line.", overview)
+                self.assertNotIn("Background prose.", overview)
+                self.assertNotIn("not a heading", overview.split("Intro line.")[0])
+                self.assertIn("references/api.md", overview)
+
+                deploy = load("big", section="Big > Deploy")
+                self.assertIn("Revert the tag.", deploy)
+                self.assertNotIn("Background prose.", deploy)
+                self.assertIn("Revert the tag.", load("big", query="rollback a release"))
+                self.assertIn("API notes.", load("big", file="references/api.md"))
+                self.assertTrue(load("big", file="../../x").startswith("Error:"))
+
+
+if __name__ == "__main__":
+    unittest.main()
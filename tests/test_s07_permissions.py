@@ -0,0 +1,158 @@
+import tempfile
+import types
+import unittest
+from pathlib import Path
+
+from agent_loader import load_agent_module
+
+
+class BashAnalysisTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.module = load_agent_module("s07_permission_system", Path(self.tmp.name))
+        self.perms = self.module.PermissionManager()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_pipelines_of_allowed_commands_are_allowed(self):
+        for command in ("ls | grep foo", "cd src && ls 2>&1", "git status; git diff"):
+            self.assertEqual(self.perms.check("bash", {"command": command})["behavior"], "allow", command)
+
+    def test_reason_names_the_segment_that_triggered(self):
+        decision = self.perms.check("bash", {"command": "ls && make test"})
+        self.assertEqual(decision["behavior"], "ask")
+        self.assertIn("`make test`", decision["reason"])
+
+    def test_dangerous_segments_are_found_inside_substitutions_and_lines(self):
+        for command in ("echo $(sudo id)", "ls\nsudo reboot", "echo `rm -rf ~`"):
+            self.assertEqual(self.perms.check("bash", {"command": command})["behavior"], "deny", command)
+
+    def test_writing_redirection_still_asks(self):
+        decision = self.perms.check("bash", {"command": "echo hi > notes.txt"})
+        self.assertEqual(decision["behavior"], "ask")
+        self.assertIn("redirect_write", decision["reason"])
+
+    def test_punctuation_runs_and_newlines_cannot_hide_a_segment(self):
+        for command in ("ls\n\nrm important.txt", "ls;\nrm x", "ls &\nrm x"):
+            decision = self.perms.check("bash", {"command": command})
+            self.assertEqual(decision["behavior"], "ask", command)
+            self.assertIn("rm", decision["reason"])
+
+    def test_fd_redirects_only_duplicate_onto_digits(self):
+        self.assertEqual(self.perms.check("bash", {"command": "ls 2>&1"})["behavior"], "allow")
+        decision = self.perms.check("bash", {"command": "echo pwned >& /root/.bashrc"})
+        self.assertEqual(decision["behavior"], "ask")
+        self.assertIn("redirect_write:/root/.bashrc", decision["reason"])
+
+    def test_read_only_rules_do_not_cover_file_writing_options(self):
+        for command in ("sort -o /root/.bashrc x", "uniq a b", "git diff --output=/root/.bashrc"):
+            self.assertNotEqual(self.perms.check("bash", {"command": command})["behavior"], "allow", command)
+
+    def test_reason_keeps_leading_assignments(self):
+        self.assertIn("`IFS=x ls`", self.perms.check("bash", {"command": "IFS=x ls"})["reason"])
+
+    def test_environment_assignments_are_never_auto_allowed(self):
+        for command in ("GIT_EXTERNAL_DIFF='touch /tmp/pwned #' git diff",
+                        "LD_PRELOAD=/tmp/x.so ls", "PAGER='sh -c id' git log"):
+            decision = self.perms.check("bash", {"command": command})
+            self.assertEqual(decision["behavior"], "ask", command)
+            self.assertIn("env_assignment:", decision["reason"])
+        self.assertEqual(self.perms.check("bash", {"command": "LC_ALL=C ls"})["behavior"], "allow")
+
+    def test_always_answer_invalidates_cached_decision(self):
+        self.assertEqual(self.perms.check("write_file", {"path": "a.txt"})["behavior"], "ask")
+        self.perms.add_rule({"tool": "write_file", "path": "*", "behavior": "allow"})
+        self.assertEqual(self.perms.check("write_file", {"path": "a.txt"})["behavior"], "allow")
+
+
+class LearnedRuleTests(unittest.TestCase):
+    def test_always_answer_is_scoped_persisted_and_reloaded(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_agent_module("s07_permission_system", Path(tmp))
+            stores = {"project": module.RuleStore(Path(tmp) / ".claude" / "permissions.json")}
+            perms = module.PermissionManager(stores=stores)
+            command = {"command": "git commit -m x && pytest -q"}
+            self.assertEqual(perms.check("bash", command)["behavior"], "ask")
+
+            module.input = lambda prompt: "always"
+            self.assertTrue(perms.ask_user("bash", command))
+
+            fresh = module.PermissionManager(stores=stores)
+            self.assertEqual(fresh.check("bash", command)["behavior"], "allow")
+            self.assertEqual(fresh.check("bash", {"command": "pytest tests/x.py"})["behavior"], "allow")
+            self.assertEqual(fresh.check("bash", {"command": "git push"})["behavior"], "ask")
+
+            stores["project"].add(module.learned_rules("write_file", {"path": "src/app.py"}))
+            self.assertEqual(len(stores["project"].load()), 5)
+
+    def test_learned_rules_do_not_generalize_past_the_approved_call(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_agent_module("s07_permission_system", Path(tmp))
+            perms = module.PermissionManager()
+            module.input = lambda prompt: "always"
+            for tool, tool_input in (("bash", {"command": "python x.py"}),
+                                     ("bash", {"command": "uv run pytest"}),
+                                     ("write_file", {"path": "a.py"}),
+                                     ("write_file", {"path": "src/app.py"})):
+                self.assertTrue(perms.ask_user(tool, tool_input))
+
+            decide = lambda tool, key, value: perms.check(tool, {key: value})["behavior"]
+            self.assertEqual(decide("bash", "command", "python x.py"), "allow")
+            for command in ("python -c 'import os'", "python y.py", "python", "uv run python -c 1"):
+                self.assertEqual(decide("bash", "command", command), "ask", command)
+            self.assertEqual(decide("write_file", "path", "a.py"), "allow")
+            self.assertEqual(decide("write_file", "path", "src/util.py"), "allow")
+            for path in ("b.py", ".bashrc", "tests/test_a.py"):
+                self.assertEqual(decide("write_file", "path", path), "ask", path)
+            self.assertEqual(module.learned_rules("bash", {"command": "python3 -c 'print(1)'"}),
+                             [{"tool": "bash", "content": "python3 -c 'print(1)'", "behavior": "allow"}])
+
+    def test_store_edits_are_hot_reloaded(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_agent_module("s07_permission_system", Path(tmp))
+            module.RULES_RELOAD_INTERVAL = 0
+            store = module.RuleStore(Path(tmp) / "permissions.json")
+            perms = module.PermissionManager(stores={"project": store})
+            self.assertEqual(perms.check("write_file", {"path": "a.txt"})["behavior"], "ask")
+
+            store.add([{"tool": "write_file", "path": "*", "behavior": "deny"}])
+
+            self.assertEqual(perms.check("write_file", {"path": "a.txt"})["behavior"], "deny")
+
+            perms.rules = [{"tool": "read_file", "path": "*", "behavior": "deny"}]
+            store.add([{"tool": "edit_file", "path": "*", "behavior": "allow"}])
+            self.assertEqual(perms.check("edit_file", {"path": "a.txt"})["behavior"], "allow")
+            self.assertEqual(perms.check("read_file", {"path": "a.txt"})["behavior"], "deny")
+
+
+class BatchApprovalTests(unittest.TestCase):
+    def test_parse_batch_answer(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            parse = load_agent_module("s07_permission_system", Path(tmp)).parse_batch_answer
+            self.assertEqual(parse("a", 3), [True, True, True])
+            self.assertEqual(parse("n", 2), [False, False])
+            self.assertEqual(parse("1,3", 3), [True, False, True])
+            self.assertEqual(parse("2-3", 3), [False, True, True])
+            self.assertEqual(parse("what", 2), [False, False])
+
+    def test_execute_allowed_keeps_order_around_writes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_agent_module("s07_permission_system", Path(tmp))
+            module.WORKDIR = Path(tmp)
+            (Path(tmp) / "a.txt").write_text("old")
+            call = lambda name, **kw: types.SimpleNamespace(name=name, input=kw)
+            calls = [call("read_file", path="a.txt"),
+                     call("write_file", path="a.txt", content="new"),
+                     call("read_file", path="a.txt"),
+                     call("read_file", path="missing.txt")]
+
+            outputs = module.execute_allowed(calls, [True, True, True, False])
+
+            self.assertEqual(outputs[0], "old")
+            self.assertEqual(outputs[2], "new")
+            self.assertIsNone(outputs[3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+import json
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from agent_loader import load_agent_module
+
+
+ECHO_SERVER = """
+import json, os, sys
+for line in sys.stdin:
+    event = json.loads(line)
+    if event["tool_input"].get("crash"):
+        os._exit(3)
+    if event["tool_name"] == "write_file":
+        reply = {"exitCode": 1, "message": "no writes"}
+    else:
+        reply = {"additionalContext": f"{os.getpid()}:{len(event['tool_input']['blob'])}"}
+    print(json.dumps(reply), flush=True)
+"""
+
+
+def write_config(root: Path, hooks: dict) -> Path:
+    path = root / ".hooks.json"
+    path.write_text(json.dumps({"hooks": hooks}))
+    return path
+
+
+class ServerHookTests(unittest.TestCase):
+    def test_server_hook_sees_full_payload_and_restarts_after_crash(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            module = load_agent_module("s08_hook_system", root)
+            (root / "server.py").write_text(ECHO_SERVER)
+            command = f"{sys.executable} {root / 'server.py'}"
+            config = write_config(root, {"PreToolUse": [{"type": "server", "command": command}]})
+            hooks = module.HookManager(config, sdk_mode=True)
+            try:
+                first = hooks.run_hooks("PreToolUse", {"tool_name": "bash", "tool_input": {"blob": "x" * 20000}})
+                second = hooks.run_hooks("PreToolUse", {"tool_name": "bash", "tool_input": {"blob": "y"}})
+                pid, size = first["messages"][0].split(":")
+                self.assertEqual(size, "20000")
+                self.assertEqual(second["messages"][0], f"{pid}:1")
+
+                blocked = hooks.run_hooks("PreToolUse", {"tool_name": "write_file", "tool_input": {}})
+                self.assertTrue(blocked["blocked"])
+                self.assertEqual(blocked["block_reason"], "no writes")
+
+                crashed = hooks.run_hooks("PreToolUse", {"tool_name": "bash", "tool_input": {"crash": True}})
+                self.assertEqual(crashed["messages"], [])
+                after = hooks.run_hooks("PreToolUse", {"tool_name": "bash", "tool_input": {"blob": "z"}})
+                self.assertNotEqual(after["messages"][0].split(":")[0], pid)
+            finally:
+                hooks.close()
+
+
+POLICY_MODULE = """
+import time
+
+def deny_rm(event):
+    if "rm " in event["tool_input"].get("command", ""):
+        return {"exitCode": 1, "message": "rm is not allowed"}
+    return {"additionalContext": "checked " + event["event"]}
+
+def hang(event):
+    time.sleep(5)
+
+def slow(event):
+    time.sleep(0.3)
+    return {"additionalContext": "slow " + event["tool_name"]}
+
+def rewrite(event):
+    return {"updatedInput": {"command": "ls -la"}}
+"""
+
+
+class PythonHookTests(unittest.TestCase):
+    def test_python_hook_runs_in_process_with_budget_and_stats(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            module = load_agent_module("s08_hook_system", root)
+            (root / "policy_hooks_under_test.py").write_text(POLICY_MODULE)
+            config = write_config(root, {"PreToolUse": [
+                {"type": "python", "callable": "policy_hooks_under_test:deny_rm"},
+                {"type": "python", "callable": "policy_hooks_under_test:hang", "timeout": 0.05},
+            ]})
+            sys.path.insert(0, str(root))
+            try:
+                hooks = module.HookManager(config, sdk_mode=True)
+                allowed = hooks.run_hooks("PreToolUse", {"tool_name": "bash", "tool_input": {"command": "ls"}})
+                blocked = hooks.run_hooks("PreToolUse", {"tool_name": "bash", "tool_input": {"command": "rm -r x"}})
+            finally:
+                sys.path.remove(str(root))
+                sys.modules.pop("policy_hooks_under_test", None)
+
+            self.assertEqual(allowed["messages"], ["checked PreToolUse"])
+            self.assertFalse(allowed["blocked"])
+            self.assertEqual(blocked["block_reason"], "rm is not allowed")
+            stats = hooks.stats["policy_hooks_under_test:deny_rm"]
+            self.assertEqual((stats["calls"], stats["errors"]), (2, 0))
+            self.assertEqual(hooks.stats["policy_hooks_under_test:hang"]["timeouts"], 2)
+
+    def test_event_hooks_run_concurrently_and_async_notes_arrive_next_turn(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            module = load_agent_module("s08_hook_system", root)
+            (root / "policy_hooks_under_test.py").write_text(POLICY_MODULE)
+            slow = {"type": "python", "callable": "policy_hooks_under_test:slow"}
+            config = write_config(root, {
+                "PreToolUse": [slow, dict(slow), {"type": "python", "callable": "policy_hooks_under_test:rewrite"}],
+                "PostToolUse": [dict(slow, **{"async": True})],
+            })
+            sys.path.insert(0, str(root))
+            try:
+                hooks = module.HookManager(config, sdk_mode=True)
+                ctx = {"tool_name": "bash", "tool_input": {"command": "ls"}}
+                started = time.perf_counter()
+                pre = hooks.run_hooks("PreToolUse", ctx)
+                pre_seconds = time.perf_counter() - started
+
+                started = time.perf_counter()
+                post = hooks.run_hooks("PostToolUse", dict(ctx, tool_output="ok"))
+                post_seconds = time.perf_counter() - started
+                time.sleep(0.5)
+                messages = [{"role": "user", "content": "next"}]
+                module.inject_async_notes(messages, hooks)
+            finally:
+                sys.path.remove(str(root))
+                sys.modules.pop("policy_hooks_under_test", None)
+                hooks.close()
+
+            self.assertLess(pre_seconds, 0.55)
+            self.assertEqual(pre["messages"], ["slow bash", "slow bash"])
+            self.assertEqual(ctx["tool_input"], {"command": "ls -la"})
+            self.assertLess(post_seconds, 0.1)
+            self.assertEqual(post["messages"], [])
+            self.assertEqual(messages[0]["content"][-1]["text"], "[Hook note]: slow bash")
+            self.assertEqual(hooks.drain_async(), [])
+
+
+class HookConfigTests(unittest.TestCase):
+    def test_matchers_are_indexed_and_config_hot_reloads(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            module = load_agent_module("s08_hook_system", root)
+            module.HOOK_RELOAD_INTERVAL = 0
+            hooks_for = lambda defs: {"PreToolUse": [{"matcher": m, "command": "true"} for m in defs]}
+            config = write_config(root, hooks_for(["*", "bash", "read_file|write_file", "mcp__*", "re:^todo_.+"]))
+            hooks = module.HookManager(config, sdk_mode=True)
+            matched = lambda tool: [h["matcher"] for h in hooks._index.for_tool("PreToolUse", tool)]
+
+            self.assertEqual(matched("bash"), ["*", "bash"])
+            self.assertEqual(matched("write_file"), ["*", "read_file|write_file"])
+            self.assertEqual(matched("mcp__github__issues"), ["*", "mcp__*"])
+            self.assertEqual(matched("todo_write"), ["*", "re:^todo_.+"])
+            self.assertEqual(len(hooks._index.for_tool("PreToolUse")), 5)
+
+            write_config(root, hooks_for(["edit_file"]))
+            self.assertTrue(hooks.reload_if_changed())
+            self.assertEqual(matched("bash"), [])
+            self.assertEqual(matched("edit_file"), ["edit_file"])
+
+            config.write_text("{broken")
+            self.assertFalse(hooks.reload_if_changed())
+            self.assertEqual(matched("edit_file"), ["edit_file"])
+
+
+if __name__ == "__main__":
+    unittest.main()
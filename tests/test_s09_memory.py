@@ -0,0 +1,167 @@
+import contextlib
+import io
+import tempfile
+import unittest
+from pathlib import Path
+
+from agent_loader import load_agent_module
+
+
+def fill_store(manager, count: int = 40):
+    for i in range(count):
+        manager.save_memory(f"note_{i:02d}", f"routine note number {i}", "project", "filler text " * 20)
+    manager.save_memory("deploy_freeze", "no deploys on fridays", "project",
+                        "Production deploys are frozen on Fridays because of the on-call rota.")
+    manager.save_memory("prefer_tabs", "user prefers tabs", "user", "Indent with tabs in Go files.")
+
+
+class MemoryRecallTests(unittest.TestCase):
+    def test_prompt_injects_relevant_memories_and_lists_the_rest(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_agent_module("s09_memory_system", Path(tmp))
+            manager = module.MemoryManager(Path(tmp) / ".memory")
+            fill_store(manager)
+
+            self.assertEqual(manager.recall("can we deploy on friday?")[0], "deploy_freeze")
+            prompt = manager.load_memory_prompt("can we deploy on friday?")
+
+            self.assertIn("Production deploys are frozen", prompt)
+            self.assertNotIn("Indent with tabs", prompt)
+            self.assertIn("use search_memory if one looks relevant): ", prompt)
+            self.assertIn("prefer_tabs", prompt.splitlines()[-1])
+            self.assertLessEqual(prompt.count("### "), module.MEMORY_TOP_K)
+
+    def test_s10_memory_section_uses_the_same_ranking(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            s09 = load_agent_module("s09_memory_system", Path(tmp))
+            fill_store(s09.MemoryManager(Path(tmp) / ".memory"))
+            s10 = load_agent_module("s10_system_prompt", Path(tmp))
+
+            section = s10.SystemPromptBuilder(workdir=Path(tmp))._build_memory_section("tabs or spaces?")
+
+            self.assertIn("Indent with tabs", section)
+            self.assertNotIn("frozen on Fridays", section)
+            self.assertIn("deploy_freeze.md", section)
+
+
+class MemoryCatalogTests(unittest.TestCase):
+    def test_manifest_limits_parsing_to_changed_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_agent_module("s09_memory_system", Path(tmp))
+            memory_dir = Path(tmp) / ".memory"
+            fill_store(module.MemoryManager(memory_dir), count=5)
+            module.MemoryManager(memory_dir).load_all()
+
+            parsed = []
+            manager = module.MemoryManager(memory_dir)
+            original = manager._parse_frontmatter
+            manager._parse_frontmatter = lambda text: parsed.append(text) or original(text)
+            (memory_dir / "prefer_tabs.md").write_text(
+                "---\nname: prefer_tabs\ndescription: tabs everywhere\ntype: user\n---\nTabs in every language.\n")
+            manager.load_all()
+
+            self.assertEqual(len(parsed), 1)
+            self.assertEqual(len(manager.memories), 7)
+            self.assertEqual(manager.memories["prefer_tabs"]["description"], "tabs everywhere")
+            first = manager.load_memory_prompt("tabs")
+            self.assertIs(manager.load_memory_prompt("tabs"), first)
+            self.assertFalse(manager.refresh_if_changed())
+
+            manager.save_memory("new_fact", "fresh", "project", "body")
+            self.assertIsNot(manager.load_memory_prompt("tabs"), first)
+
+
+class SQLiteMemoryStoreTests(unittest.TestCase):
+    def test_sqlite_backend_upserts_searches_and_round_trips_markdown(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_agent_module("s09_memory_system", Path(tmp))
+            memory_dir = Path(tmp) / ".memory"
+            fill_store(module.MemoryManager(memory_dir), count=3)
+
+            store = module.SQLiteMemoryStore(memory_dir / "memory.db")
+            manager = module.MemoryManager(memory_dir, store=store)
+            manager.load_all()
+            self.assertEqual(len(manager.memories), 5)  # imported from Markdown on first load
+            self.assertEqual(store.conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+            manager.save_memory("deploy_freeze", "no deploys on fridays or weekends", "project", "Frozen.")
+            self.assertEqual(len(store.all()), 5)
+            self.assertEqual(store.search("weekends")[0][0], "deploy_freeze")
+
+            other = module.MemoryManager(memory_dir, store=module.SQLiteMemoryStore(memory_dir / "memory.db"))
+            other.load_all(quiet=True)
+            other.save_memory("oncall", "pager rota", "reference", "See the rota board.")
+            self.assertTrue(manager.refresh_if_changed())
+            self.assertIn("oncall", manager.search("rota"))
+
+            export_dir = Path(tmp) / "export"
+            self.assertEqual(manager.export_markdown(export_dir), 6)
+            self.assertIn("weekends", (export_dir / "deploy_freeze.md").read_text())
+            self.assertIn("- oncall: pager rota [reference]", (export_dir / "MEMORY.md").read_text())
+
+            with tempfile.TemporaryDirectory() as outside:
+                self.assertEqual(manager.export_markdown(Path(outside)), 6)
+                self.assertEqual(len(list(Path(outside).glob("*.md"))), 7)  # six memories plus MEMORY.md
+
+    def test_failed_archive_rolls_back_and_leaves_the_connection_usable(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_agent_module("s09_memory_system", Path(tmp))
+            store = module.SQLiteMemoryStore(Path(tmp) / "memory.db")
+            store.upsert("a", "first", "project", "body")
+            store.conn.execute("CREATE TABLE memories_archive (name TEXT)")  # drifted schema
+
+            with self.assertRaises(module.sqlite3.OperationalError):
+                store.archive("a")
+            self.assertFalse(store.conn.in_transaction)
+            store.upsert("b", "second", "project", "body")
+            self.assertEqual(sorted(store.all()), ["a", "b"])
+
+
+class DreamConsolidatorTests(unittest.TestCase):
+    def test_merges_duplicates_asks_about_overlaps_and_archives(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_agent_module("s09_memory_system", Path(tmp))
+            memory_dir = Path(tmp) / ".memory"
+            manager = module.MemoryManager(memory_dir)
+            text = "Run the integration suite with make itest before every release branch is cut"
+            manager.save_memory("itest_old", "integration tests", "project", text)
+            manager.save_memory("itest_new", "integration tests", "project", text + "\nIt needs docker.")
+            manager.save_memory("tabs", "user prefers tabs", "user", "Indent with tabs in Go files.")
+            manager.save_memory("spaces", "user prefers tabs in go", "user",
+                                "Indent with tabs in Go files, spaces in Python.")
+            manager.memories["itest_old"]["updated_at"] -= 60
+
+            dream = module.DreamConsolidator(memory_dir)
+            dream.session_count = dream.MIN_SESSION_COUNT
+            prompts = []
+            dream.llm = lambda prompt: prompts.append(prompt) or '{"merge": false}'
+            phases = dream.consolidate(manager)
+
+            self.assertEqual(len(phases), 4)
+            self.assertEqual(sorted(manager.memories), ["itest_new", "spaces", "tabs"])
+            self.assertIn("It needs docker.", manager.memories["itest_new"]["content"])
+            self.assertTrue((memory_dir / ".archive" / "itest_old.md").exists())
+            self.assertEqual(len(prompts), 1)
+            self.assertFalse(dream.lock_file.exists())
+            self.assertFalse(module.DreamConsolidator(memory_dir).should_consolidate()[0])
+
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                self.assertEqual(module.DreamConsolidator(memory_dir).consolidate(quiet=True), [])
+            self.assertEqual(out.getvalue(), "")
+
+    def test_index_truncates_only_past_what_prune_keeps(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_agent_module("s09_memory_system", Path(tmp))
+            manager = module.MemoryManager(Path(tmp) / ".memory")
+            capacity = module.MAX_INDEX_LINES - 2
+            for count, truncated in ((capacity, False), (capacity + 1, True)):
+                manager.memories = {f"m{i}": {"description": "d", "type": "project"} for i in range(count)}
+                manager._rebuild_index()
+                lines = (manager.memory_dir / "MEMORY.md").read_text().splitlines()
+                self.assertLessEqual(len(lines), module.MAX_INDEX_LINES)
+                self.assertEqual(lines[-1].startswith("... (truncated"), truncated)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from agent_loader import load_agent_module
+from test_s09_memory import fill_store
+
+
+class SystemPromptCacheTests(unittest.TestCase):
+    def test_static_prefix_is_stable_and_sections_invalidate_independently(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            skill = root / "skills" / "deploy"
+            skill.mkdir(parents=True)
+            (skill / "SKILL.md").write_text("---\nname: deploy\ndescription: ship it\n---\nSteps.")
+            (root / "CLAUDE.md").write_text("Use tabs.")
+            s09 = load_agent_module("s09_memory_system", root)
+            fill_store(s09.MemoryManager(root / ".memory"))
+            s10 = load_agent_module("s10_system_prompt", root)
+            builder = s10.SystemPromptBuilder(workdir=root, tools=s10.TOOLS)
+
+            first = builder.build("deploy on friday?")
+            second = builder.build("tabs or spaces?")
+            prefix = first.split(s10.DYNAMIC_BOUNDARY)[0]
+            self.assertEqual(prefix, second.split(s10.DYNAMIC_BOUNDARY)[0])
+            self.assertIn("- deploy: ship it", prefix)
+            self.assertNotIn("# Memories", prefix)
+            self.assertNotEqual(first, second)
+
+            skills_entry = builder._sections["skills"]
+            (root / "CLAUDE.md").write_text("Use spaces, not tabs.")
+            os.utime(root / "CLAUDE.md", ns=(1, 1))
+            self.assertIn("Use spaces", builder.build_static())
+            self.assertIs(builder._sections["skills"], skills_entry)
+
+    def test_claude_md_walks_to_repo_root_and_shares_identical_worktree_content(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp).resolve()
+            s10 = load_agent_module("s10_system_prompt", root)
+            repo, worktree = root / "repo", root / "repo" / ".worktrees" / "wt"
+            for checkout in (repo, worktree):
+                (checkout / "pkg" / "sub").mkdir(parents=True)
+                (checkout / "CLAUDE.md").write_text("Root rules.")
+                (checkout / "pkg" / "CLAUDE.md").write_text("Package rules.")
+            (repo / ".git").mkdir()
+            (worktree / ".git").write_text("gitdir: ../../.git/worktrees/wt")
+            (root / "CLAUDE.md").write_text("Outside the repo.")
+
+            cache = s10.CLAUDE_MD_CACHE
+            self.assertEqual(cache.chain(repo / "pkg" / "sub"), [repo, repo / "pkg", repo / "pkg" / "sub"])
+            sources = s10.SystemPromptBuilder(workdir=repo / "pkg" / "sub")._claude_md_sources()
+            labels = [label for label, _ in sources if not label.startswith("user global")]
+            self.assertEqual(labels, ["project root (CLAUDE.md)", "subdir (pkg/CLAUDE.md)"])
+
+            text_count = len(cache._texts)
+            wt_sources = s10.SystemPromptBuilder(workdir=worktree / "pkg")._claude_md_sources()
+            self.assertEqual(len(cache._texts), text_count)
+            self.assertEqual(wt_sources, sources)
+
+            (repo / "pkg" / "CLAUDE.md").write_text("Changed package rules!")
+            prompt = s10.SystemPromptBuilder(workdir=repo / "pkg").build_static()
+            self.assertIn("Changed package rules!", prompt)
+            self.assertNotIn("Outside the repo.", prompt)
+
+
+if __name__ == "__main__":
+    unittest.main()
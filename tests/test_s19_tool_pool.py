@@ -0,0 +1,67 @@
+import contextlib
+import io
+import tempfile
+import types
+import unittest
+from pathlib import Path
+
+from agent_loader import load_agent_module
+
+
+def fake_client(name, tools):
+    return types.SimpleNamespace(server_name=name, get_agent_tools=lambda: [
+        {"name": f"mcp__{name}__{tool}", "description": tool, "_mcp_server": name,
+         "input_schema": {"type": "object", "required": ["b", "a"],
+                          "properties": {"b": {"type": "string"}, "a": {"type": "string"}}}}
+        for tool in tools
+    ])
+
+
+class ToolPoolTests(unittest.TestCase):
+    def test_pool_is_canonical_memoized_and_logs_changes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_agent_module("s19_mcp_plugin", Path(tmp))
+            module.mcp_router.register_client(fake_client("zeta", ["run", "list"]))
+            module.mcp_router.register_client(fake_client("alpha", ["get"]))
+            first = module.build_tool_pool()
+
+            self.assertIs(module.build_tool_pool(), first)
+            names = [tool["name"] for tool in first]
+            self.assertEqual(names[5:], ["mcp__alpha__get", "mcp__zeta__list", "mcp__zeta__run"])
+            self.assertNotIn("_mcp_server", first[5])
+            self.assertEqual(list(first[5]["input_schema"]["properties"]), ["a", "b"])
+            self.assertEqual(first[5]["input_schema"]["required"], ["a", "b"])
+
+            digest = module._tool_pool["hash"]
+            module.mcp_router.clients = dict(reversed(module.mcp_router.clients.items()))
+            module.build_tool_pool()
+            self.assertEqual(module._tool_pool["hash"], digest)
+
+            module.mcp_router.register_client(fake_client("beta", ["put"]))
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                module.build_tool_pool()
+            self.assertIn(f"[tool pool changed: {digest[:12]} -> ", out.getvalue())
+
+    def test_large_pools_send_natives_until_tool_search_loads_more(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_agent_module("s19_mcp_plugin", Path(tmp))
+            module.mcp_router.register_client(fake_client("db", [f"query_table_{i}" for i in range(6)]))
+            module.mcp_router.register_client(fake_client("github", ["createIssue", "list_pulls"]))
+            pool = module.build_tool_pool()
+            selector = module.ToolSelector(threshold=8)
+
+            first = selector.active(pool)
+            self.assertEqual([t["name"] for t in first], [t["name"] for t in module.NATIVE_TOOLS])
+            self.assertIs(selector.active(pool), first)
+
+            result = selector.search("create issue", limit=1)
+            self.assertIn("mcp__github__createIssue", result)
+            names = [t["name"] for t in selector.active(pool)]
+            self.assertEqual(names[-1], "mcp__github__createIssue")
+            self.assertEqual(len(names), len(module.NATIVE_TOOLS) + 1)
+            self.assertEqual(module.permission_gate.check("tool_search", {})["behavior"], "allow")
+
+
+if __name__ == "__main__":
+    unittest.main()
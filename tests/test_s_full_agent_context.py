@@ -0,0 +1,39 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from agent_loader import load_s_full_module
+
+
+class AgentContextTests(unittest.TestCase):
+    def test_compaction_failure_shuts_the_teammate_down(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_s_full_module(Path(tmp))
+            module.TEAM.config["members"].append({"name": "w", "role": "dev", "status": "working"})
+
+            def broken_summarizer(messages, keep_recent):
+                raise RuntimeError("summarizer down")
+
+            module.microcompact = broken_summarizer
+            module.TEAM._loop("w", "dev", "do the thing")
+
+            self.assertEqual(module.TEAM._find("w")["status"], "shutdown")
+            self.assertNotIn("w", module.AGENT_CONTEXTS)
+
+    def test_keep_recent_follows_the_agent_kind(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_s_full_module(Path(tmp))
+            messages = [{"role": "user", "content": [
+                {"type": "tool_result", "tool_use_id": str(i), "content": "x" * 500}]} for i in range(4)]
+            calls = [{"role": "assistant", "content": [
+                {"type": "tool_use", "id": str(i), "name": "bash", "input": {}}]} for i in range(4)]
+            history = [m for pair in zip(calls, messages) for m in pair]
+
+            module.AgentContext("sub", "subagent").prepare(history)
+
+            kept = [m["content"][0]["content"] for m in messages if m["content"][0]["content"] == "x" * 500]
+            self.assertEqual(len(kept), module.AGENT_KEEP_RECENT["subagent"])
+
+
+if __name__ == "__main__":
+    unittest.main()
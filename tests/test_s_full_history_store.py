@@ -0,0 +1,51 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from agent_loader import load_s_full_module
+
+
+class HistoryStoreTests(unittest.TestCase):
+    def test_large_results_spill_and_materialize_for_requests(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_s_full_module(Path(tmp))
+            store = module.HistoryStore(Path(tmp) / "seg.bin", spill_chars=10)
+            big, small = "x" * 5000 + "tail", "ok"
+            messages = [{"role": "user", "content": [
+                {"type": "tool_result", "tool_use_id": "a", "content": store.spill(big)},
+                {"type": "tool_result", "tool_use_id": "b", "content": store.spill(small)},
+            ]}]
+
+            self.assertIsInstance(messages[0]["content"][0]["content"], module.SpilledText)
+            self.assertEqual(messages[0]["content"][1]["content"], "ok")
+            request = module.materialize(messages)
+            self.assertEqual(request[0]["content"][0]["content"], big)
+            self.assertIsInstance(messages[0]["content"][0]["content"], module.SpilledText)
+            self.assertEqual(module.estimate_tokens(messages), len(json.dumps(request)) // 4)
+            store.close()
+            self.assertFalse((Path(tmp) / "seg.bin").exists())
+
+    def test_segments_without_live_handles_are_reclaimed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_s_full_module(Path(tmp))
+            store = module.HistoryStore(Path(tmp) / "seg.bin", spill_chars=10, segment_bytes=1000)
+            old = [store.spill("a" * 600), store.spill("b" * 600)]
+            kept = store.spill("c" * 600)  # seg.bin is past 1000 bytes: rotate
+            self.assertTrue((Path(tmp) / "seg.1.bin").exists())
+
+            del old  # compaction dropped the messages holding these
+            store.spill("d" * 20)
+            self.assertFalse((Path(tmp) / "seg.bin").exists())
+            self.assertEqual(str(kept), "c" * 600)
+
+            del kept
+            fresh = store.spill("e" * 20)  # seg.1.bin is still current: truncated, not rotated
+            self.assertEqual((Path(tmp) / "seg.1.bin").stat().st_size, 20)
+            store.close()
+            with self.assertRaisesRegex(RuntimeError, "is closed"):
+                str(fresh)
+
+
+if __name__ == "__main__":
+    unittest.main()
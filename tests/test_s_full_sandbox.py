@@ -0,0 +1,63 @@
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from agent_loader import load_s_full_module
+
+
+class SandboxedRunTests(unittest.TestCase):
+    def test_timeout_kills_the_whole_group_and_reports_usage(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_s_full_module(Path(tmp))
+            started = time.monotonic()
+            result = module.run_sandboxed("echo start; sleep 30 & sleep 30", cwd=Path(tmp), timeout=1)
+
+            self.assertLess(time.monotonic() - started, 5)
+            self.assertTrue(result["timed_out"])
+            self.assertEqual(result["output"], "start\n")
+            self.assertGreaterEqual(result["wall_s"], 1)
+            self.assertIsNotNone(result["cpu_s"])
+            self.assertGreater(result["maxrss_kb"], 0)
+
+    def test_output_cap_stops_the_command(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_s_full_module(Path(tmp))
+            result = module.run_sandboxed("yes", cwd=Path(tmp), timeout=10, limits={"output_bytes": 1000})
+
+            self.assertTrue(result["truncated"])
+            self.assertEqual(len(result["output"]), 1000)
+            self.assertIn("output truncated", module.format_run_metadata(result))
+
+    def test_rlimits_reach_the_command_and_memory_is_opt_in(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_s_full_module(Path(tmp))
+            self.assertEqual(module.SANDBOX_LIMITS["memory_mb"], 0)
+            result = module.run_sandboxed("ulimit -t; ulimit -v", cwd=Path(tmp), timeout=10,
+                                          limits={"cpu_seconds": 7, "memory_mb": 512})
+
+            self.assertEqual(result["output"].split(), ["7", str(512 * 1024)])
+            self.assertIsInstance(module._sandbox_argv("ls", module.SANDBOX_LIMITS)[0], str)  # no extra interpreter
+
+
+class BackgroundCancelTests(unittest.TestCase):
+    def test_cancel_kills_the_task_tree_by_id(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_s_full_module(Path(tmp))
+            manager = module.BackgroundManager()
+            tid = manager.run("sleep 30 & sleep 30", timeout=60).split()[2]
+            deadline = time.monotonic() + 5
+            while tid not in manager._procs and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+            self.assertIn("Cancelled", manager.cancel(tid))
+            note = manager.notifications.get(timeout=5)
+
+            self.assertEqual(note["status"], "cancelled")
+            self.assertEqual(manager.tasks[tid]["status"], "cancelled")
+            self.assertNotIn(tid, manager._procs)
+            self.assertIn("is cancelled", manager.cancel(tid))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from agent_loader import load_s_full_module
+
+
+class ToolSelectorTests(unittest.TestCase):
+    def test_active_list_is_stable_until_tool_search_loads_a_deferred_tool(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_s_full_module(Path(tmp))
+            selector = module.TOOL_SELECTOR
+            self.assertGreater(len(module.TOOLS), selector.threshold)
+
+            first = selector.active()
+            self.assertEqual({t["name"] for t in first}, module.CORE_TOOLS)
+            self.assertIs(selector.active(), first)
+
+            result = module.TOOL_HANDLERS["tool_search"](query="spawn_teammate")
+            self.assertIn("- spawn_teammate:", result)
+            second = selector.active()
+            self.assertIsNot(second, first)
+            self.assertEqual({t["name"] for t in second} - module.CORE_TOOLS, {"spawn_teammate"})
+            self.assertIs(selector.active(), second)
+
+            selector.search("read_file")  # core tools are never "loaded"
+            self.assertIs(selector.active(), second)
+
+
+if __name__ == "__main__":
+    unittest.main()
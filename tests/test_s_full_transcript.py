@@ -0,0 +1,61 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from agent_loader import load_s_full_module
+
+
+class TranscriptLogTests(unittest.TestCase):
+    def test_sync_writes_each_message_once(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_s_full_module(Path(tmp))
+            log = module.TranscriptLog("s1", root=Path(tmp))
+            messages = [{"role": "user", "content": "hi"}]
+            self.assertEqual(log.sync(messages), 1)
+            messages.append({"role": "assistant", "content": "hello"})
+            self.assertEqual(log.sync(messages), 1)
+            self.assertEqual(log.sync(messages), 0)
+
+            self.assertEqual(log.count, 2)
+            self.assertEqual(log.read(1)["message"]["content"], "hello")
+
+    def test_rotation_gzip_and_reopen_keep_offsets(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_s_full_module(Path(tmp))
+            log = module.TranscriptLog("s2", root=Path(tmp), max_segment_bytes=200,
+                                       gzip_segments=True)
+            for i in range(10):
+                log.append("message", {"message": {"role": "user", "content": "x" * 50 + str(i)}})
+            log.record_compaction("summary text", kept=1)
+
+            self.assertTrue(list((Path(tmp) / "s2").glob("segment_*.jsonl.gz")))
+            reopened = module.TranscriptLog("s2", root=Path(tmp))
+            self.assertEqual(reopened.count, 11)
+            self.assertTrue(reopened.read(3)["message"]["content"].endswith("3"))
+            self.assertEqual(reopened.read(10)["summary"], "summary text")
+            self.assertEqual([r["seq"] for r in reopened.replay(8)], [8, 9, 10])
+
+    def test_resume_uses_latest_summary_tail_and_todos(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_s_full_module(Path(tmp))
+            log = module.TranscriptLog("s3")
+            log.sync([{"role": "user", "content": "old question"}])
+            log.record_compaction("the summary", kept=1, stats={"auto": 2, "manual": 1})
+            log.append("todos", {"items": [{"content": "a", "status": "pending", "activeForm": "A"}]})
+            log.sync([{"role": "user", "content": "continuation"},
+                      {"role": "user", "content": "new question"},
+                      {"role": "assistant", "content": [{"type": "tool_use", "id": "t1",
+                                                         "name": "bash", "input": {}}]}])
+
+            resumed, history = module.resume_session("latest")
+
+            self.assertEqual(resumed.session_id, "s3")
+            self.assertIn("the summary", history[0]["content"])
+            self.assertEqual([m["content"] for m in history[1:]], ["new question"])
+            self.assertEqual(module.COMPACT_STATS, {"auto": 2, "manual": 1})
+            self.assertEqual(module.TODO.items[0]["content"], "a")
+            self.assertEqual(resumed.synced, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()